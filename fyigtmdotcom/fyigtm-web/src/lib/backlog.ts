@@ -0,0 +1,23 @@
+// Mirrors normalize_tech_name() (migration 011): the unique name_key that
+// makes "HubSpot", "Hub-Spot" and "HubSpot: Breeze" the same tool.
+export function techNameKey(name: string): string {
+  return (name || '').split(':')[0].replace(/[^\p{L}\p{N}]+/gu, '').toLowerCase();
+}
+
+// Response for a unique name_key violation (Postgres 23505): 409 with the
+// existing row, so the admin UI can point at it instead of a generic failure.
+export async function duplicateTechResponse(supabase: any, name: string): Promise<Response> {
+  const { data: existing } = await supabase
+    .from('tech_backlog')
+    .select('*')
+    .eq('name_key', techNameKey(name))
+    .maybeSingle();
+
+  return new Response(JSON.stringify({
+    error: `"${name}" is already in the tech backlog${existing ? ` as "${existing.name}"` : ''}`,
+    existing: existing || null,
+  }), {
+    status: 409,
+    headers: { 'Content-Type': 'application/json' },
+  });
+}
@@ -1,6 +1,7 @@
 import type { APIRoute } from 'astro';
 import { getSupabaseAdmin } from '../../../lib/supabase';
 import { validateToken } from './auth';
+import { duplicateTechResponse } from '../../../lib/backlog';
 
 export const prerender = false;
 
@@ -60,7 +61,12 @@ export const POST: APIRoute = async ({ request, locals }) => {
       .select()
       .single();
 
-    if (error) throw error;
+    if (error) {
+      if (error.code === '23505') {
+        return duplicateTechResponse(supabase, body.name);
+      }
+      throw error;
+    }
 
     return new Response(JSON.stringify(data), {
       status: 201,
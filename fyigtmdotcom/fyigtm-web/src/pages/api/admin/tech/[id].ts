@@ -1,6 +1,7 @@
 import type { APIRoute } from 'astro';
 import { getSupabaseAdmin } from '../../../../lib/supabase';
 import { validateToken } from '../auth';
+import { duplicateTechResponse } from '../../../../lib/backlog';
 
 export const prerender = false;
 
@@ -34,7 +35,13 @@ export const PUT: APIRoute = async ({ params, request, locals }) => {
       .select()
       .single();
 
-    if (error) throw error;
+    if (error) {
+      // Renamed to a name another row already has (same name_key)
+      if (error.code === '23505' && updateData.name !== undefined) {
+        return duplicateTechResponse(supabase, body.name);
+      }
+      throw error;
+    }
 
     return new Response(JSON.stringify(data), {
       status: 200,
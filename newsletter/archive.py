@@ -0,0 +1,453 @@
+"""
+Archive export and import of past issues.
+
+    python -m newsletter.archive export                # everything so far
+    python -m newsletter.archive export --incremental  # only what is new since the last export
+    python -m newsletter.archive import archive/20261018T090000Z [more dirs...]
+
+An export is a directory under ARCHIVE_DIR with, per table in TABLES:
+
+- <table>.jsonl.gz: one JSON row per line (the format import reads)
+- <table>.parquet: the same rows as Parquet when pyarrow is installed, typed
+  by the declared column types (storage.SQLITE_SCHEMA); otherwise
+  <table>.columns/<column>.jsonl.gz, one file of values per column
+- manifest.json: row counts and the cursor each table ended at
+
+Rows are read with keyset pagination (db.keyset_pages) ARCHIVE_PAGE_SIZE at
+a time and written out page by page, so memory stays flat however many
+issues there are. Finished runs are paged by completed_at and used topics,
+tools and tips by used_at. After a successful export those cursors are saved
+as the watermark (ARCHIVE_DIR/watermark.json). The timestamps are stamped
+by whichever process wrote the row, so a row can commit after a later one was
+already exported; --incremental therefore starts ARCHIVE_WATERMARK_GRACE_SECONDS
+before the watermark and exports the rows in that window again. Topics, tools
+and tips an exported run references but the used_at export misses (claimed
+by a run that failed, or used before the export started) go to
+<table>.referenced.jsonl.gz, so the runs' foreign keys hold on import.
+
+Import upserts the rows by id into the configured storage (STORAGE_BACKEND),
+so it restores Supabase from a backup or seeds a local SQLite store, then
+raises each newsletter's issue counter past the imported issue numbers.
+Imports can be repeated; apply incremental exports oldest first.
+"""
+
+import argparse
+import functools
+import gzip
+import json
+import os
+import sys
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+
+from . import config
+from . import supabase_client as db
+from . import storage
+
+
+@dataclass(frozen=True)
+class ArchiveTable:
+    name: str
+    cursor: str  # column the export pages by; its last value is the watermark
+    incremental: bool = True  # False: exported in full every time
+
+
+# In import order (referenced rows first)
+TABLES = [
+    ArchiveTable("newsletter_config", "created_at", incremental=False),
+    ArchiveTable("newsletter_topics", "used_at"),
+    ArchiveTable("tech_backlog", "used_at"),
+    ArchiveTable("tips_backlog", "used_at"),
+    ArchiveTable("newsletter_runs", "completed_at"),
+]
+
+# Columns computed by the database, never written on import
+GENERATED_COLUMNS = {"tech_backlog": {"name_key"}}
+
+# newsletter_runs columns that reference backlog rows, and their tables
+RUN_REFERENCES = {"topic_id": "newsletter_topics", "tech_id": "tech_backlog", "tip_ids": "tips_backlog"}
+
+
+def watermark_path(archive_dir: str = None) -> str:
+    return os.path.join(archive_dir or config.ARCHIVE_DIR, "watermark.json")
+
+
+def load_watermark(archive_dir: str = None) -> dict:
+    """{table: [cursor value, id]} from the last successful export, or {}."""
+    try:
+        with open(watermark_path(archive_dir), encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def save_watermark(watermark: dict, archive_dir: str = None):
+    path = watermark_path(archive_dir)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(watermark, f, indent=2)
+    os.replace(tmp_path, path)
+
+
+# Columnar output
+
+# Declared column type -> columnar kind; anything else (UUID, TEXT, TIMESTAMPTZ,
+# JSONB, arrays) is written as a string
+COLUMN_KINDS = {"INTEGER": "int", "NUMERIC": "float", "BOOLEAN": "bool"}
+
+
+@functools.lru_cache(maxsize=None)
+def declared_kinds(table: str) -> dict:
+    """{column: kind} for a table, in schema order, from the schema the SQLite store mirrors."""
+    store = storage.SQLiteStorage(":memory:")
+    try:
+        return {column: COLUMN_KINDS.get(column_type, "string")
+                for column, (column_type, _) in store.types.get(table, {}).items()}
+    finally:
+        store.close()
+
+
+def _coerce(value, kind: str):
+    if value is None:
+        return None
+    if kind == "bool":
+        return bool(value)
+    if kind == "int":
+        return int(value)
+    if kind == "float":
+        return float(value)
+    return value if isinstance(value, str) else json.dumps(value)
+
+
+class ParquetWriter:
+    """
+    Parquet file written one row group per page. The schema comes from the
+    table's declared column types, so NUMERIC stays float64 even when the
+    first page only holds whole numbers; columns not in the schema are strings.
+    """
+
+    def __init__(self, path: str, table: str):
+        self.path = path
+        self.table = table
+        self.writer = None
+        self.kinds = None
+
+    def write(self, rows: list[dict]):
+        import pyarrow as pa
+
+        if self.writer is None:
+            import pyarrow.parquet as pq
+
+            self.kinds = dict(declared_kinds(self.table))
+            for column in dict.fromkeys(c for row in rows for c in row):
+                self.kinds.setdefault(column, "string")
+            types = {"bool": pa.bool_(), "int": pa.int64(), "float": pa.float64(), "string": pa.string()}
+            schema = pa.schema([(c, types[kind]) for c, kind in self.kinds.items()])
+            self.writer = pq.ParquetWriter(self.path, schema, compression="zstd")
+        data = {c: [_coerce(row.get(c), kind) for row in rows] for c, kind in self.kinds.items()}
+        self.writer.write_table(pa.Table.from_pydict(data, schema=self.writer.schema))
+
+    def close(self):
+        if self.writer is not None:
+            self.writer.close()
+
+
+class ColumnFilesWriter:
+    """Fallback columnar layout without pyarrow: one gzipped JSON-lines file of values per column."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.files = {}
+        self.rows = 0
+
+    def write(self, rows: list[dict]):
+        if not self.files:
+            os.makedirs(self.path, exist_ok=True)
+        for column in dict.fromkeys(c for row in rows for c in row):
+            if column not in self.files:
+                # A column first seen on a later page is null for the rows before it
+                self.files[column] = gzip.open(os.path.join(self.path, f"{column}.jsonl.gz"), "wt", encoding="utf-8")
+                self.files[column].write("null\n" * self.rows)
+        for column, f in self.files.items():
+            f.writelines(json.dumps(row.get(column), default=str) + "\n" for row in rows)
+        self.rows += len(rows)
+
+    def close(self):
+        for f in self.files.values():
+            f.close()
+
+
+def columnar_writer(directory: str, table: str):
+    try:
+        import pyarrow  # noqa: F401
+    except ImportError:
+        return ColumnFilesWriter(os.path.join(directory, f"{table}.columns"))
+    return ParquetWriter(os.path.join(directory, f"{table}.parquet"), table)
+
+
+class ReferencedRows:
+    """
+    Backlog rows the exported runs reference that their own table's export
+    leaves out: used_at is NULL (claimed by a run that failed) or before
+    that table's export started. Written to <table>.referenced.jsonl.gz.
+    """
+
+    def __init__(self, client, directory: str, starts: dict, page_size: int = None):
+        self.client = client
+        self.directory = directory
+        self.starts = starts  # {table: first used_at value exported, or None for all}
+        self.page_size = page_size or config.ARCHIVE_PAGE_SIZE
+        self.files = {}
+        self.written = {table: set() for table in RUN_REFERENCES.values()}
+
+    def _missed(self, table: str, row: dict) -> bool:
+        start = self.starts.get(table)
+        return row.get("used_at") is None or (start is not None and _parse_time(row["used_at"]) < _parse_time(start))
+
+    def add(self, runs: list[dict]):
+        """Write the rows a page of runs references that are not exported otherwise."""
+        for column, table in RUN_REFERENCES.items():
+            ids = set()
+            for run in runs:
+                value = run.get(column)
+                ids.update(value if isinstance(value, list) else [value] if value else [])
+            ids = sorted(ids - self.written[table])
+            for i in range(0, len(ids), self.page_size):
+                rows = db.execute(
+                    self.client.table(table).select("*").in_("id", ids[i:i + self.page_size])
+                ).data or []
+                missed = [row for row in rows if self._missed(table, row)]
+                if not missed:
+                    continue
+                if table not in self.files:
+                    path = os.path.join(self.directory, f"{table}.referenced.jsonl.gz")
+                    self.files[table] = gzip.open(path, "wt", encoding="utf-8")
+                self.files[table].writelines(json.dumps(row, default=str) + "\n" for row in missed)
+                self.written[table].update(row["id"] for row in missed)
+
+    def counts(self) -> dict:
+        return {table: len(ids) for table, ids in self.written.items() if ids}
+
+    def close(self):
+        for f in self.files.values():
+            f.close()
+
+
+def _parse_time(value: str) -> datetime:
+    parsed = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    return parsed if parsed.tzinfo else parsed.replace(tzinfo=timezone.utc)
+
+
+# Export / import
+
+def export_table(client, table: ArchiveTable, directory: str, after: tuple = None,
+                 page_size: int = None, columnar: bool = True, on_page=None) -> dict:
+    """
+    Stream one table's rows after the cursor to JSONL (and a columnar file),
+    calling on_page(page) for each page. Returns its manifest entry.
+    """
+    page_size = page_size or config.ARCHIVE_PAGE_SIZE
+    writer = columnar_writer(directory, table.name) if columnar else None
+    rows = 0
+    cursor = list(after) if after else None
+    try:
+        with gzip.open(os.path.join(directory, f"{table.name}.jsonl.gz"), "wt", encoding="utf-8") as out:
+            for page in db.keyset_pages(client, table.name, table.cursor, after, page_size):
+                out.writelines(json.dumps(row, default=str) + "\n" for row in page)
+                if writer:
+                    writer.write(page)
+                if on_page:
+                    on_page(page)
+                rows += len(page)
+                cursor = [page[-1][table.cursor], page[-1]["id"]]
+    finally:
+        if writer:
+            writer.close()
+    return {"rows": rows, "cursor": table.cursor, "after": list(after) if after else None, "until": cursor}
+
+
+def export(client, out_dir: str = None, incremental: bool = False, since: str = None,
+           page_size: int = None, columnar: bool = True) -> str:
+    """
+    Export TABLES into a new directory under ARCHIVE_DIR (or out_dir).
+    incremental starts each table at the saved watermark; since starts at
+    a timestamp instead. Returns the export directory.
+    """
+    archive_dir = config.ARCHIVE_DIR
+    stamp = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%SZ")
+    directory = out_dir or os.path.join(archive_dir, stamp)
+    suffix = 1
+    while not out_dir and os.path.exists(directory):
+        directory = os.path.join(archive_dir, f"{stamp}-{suffix}")
+        suffix += 1
+    os.makedirs(directory, exist_ok=True)
+    watermark = load_watermark(archive_dir)
+    manifest = {"exported_at": datetime.now(timezone.utc).isoformat(), "tables": {}}
+    starts = {}
+    referenced = None
+
+    for table in TABLES:
+        after = None
+        if table.incremental and since:
+            after = (since, None)
+        elif table.incremental and incremental and watermark.get(table.name):
+            # From a grace window before the watermark: a row stamped before it
+            # that committed after the last export is not skipped, and the
+            # repeated rows are harmless on import
+            start = _parse_time(watermark[table.name][0]) - timedelta(seconds=config.ARCHIVE_WATERMARK_GRACE_SECONDS)
+            after = (start.isoformat(), None)
+        starts[table.name] = after[0] if after else None
+        on_page = None
+        if table.name == "newsletter_runs":
+            referenced = ReferencedRows(client, directory, starts, page_size)
+            on_page = referenced.add
+        try:
+            entry = export_table(client, table, directory, after, page_size, columnar, on_page)
+        finally:
+            if referenced:
+                referenced.close()
+        manifest["tables"][table.name] = entry
+        print(f"  {table.name}: {entry['rows']} rows" + (f" after {after[0]}" if after else ""))
+        if table.incremental and entry["rows"] and not (
+            watermark.get(table.name) and _parse_time(entry["until"][0]) < _parse_time(watermark[table.name][0])
+        ):
+            watermark[table.name] = entry["until"]
+    if referenced and referenced.counts():
+        manifest["referenced"] = referenced.counts()
+        for name, rows in manifest["referenced"].items():
+            print(f"  {name}: {rows} more rows referenced by runs")
+
+    with open(os.path.join(directory, "manifest.json"), "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2)
+    if not out_dir:
+        save_watermark(watermark, archive_dir)
+    return directory
+
+
+def read_rows(path: str):
+    """Rows of a .jsonl.gz export file, one at a time."""
+    with gzip.open(path, "rt", encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                yield json.loads(line)
+
+
+def import_table(client, table: str, path: str, page_size: int = None) -> int:
+    """Upsert the rows of one export file, page_size at a time. Returns the row count."""
+    page_size = page_size or config.ARCHIVE_PAGE_SIZE
+    skip = GENERATED_COLUMNS.get(table, set())
+    total = 0
+    batch = []
+
+    def flush():
+        db.execute(client.table(table).upsert(batch, on_conflict="id"))
+
+    for row in read_rows(path):
+        batch.append({k: v for k, v in row.items() if k not in skip})
+        if len(batch) >= page_size:
+            flush()
+            total += len(batch)
+            batch = []
+    if batch:
+        flush()
+        total += len(batch)
+    return total
+
+
+def rebuild_issue_counters(client) -> dict:
+    """
+    Raise each newsletter's issue counter (newsletter_issue_counters) to its
+    highest run issue number, as migration 010's backfill does, so the next
+    run is numbered after the imported issues instead of colliding with
+    them. Counters already ahead are left alone. Returns {newsletter_id: last_issue}.
+    """
+    raised = {}
+    for newsletter in db.get_newsletter_configs(client):
+        latest = db.execute(
+            client.table("newsletter_runs")
+            .select("issue_number")
+            .eq("newsletter_id", newsletter["id"])
+            .not_.is_("issue_number", "null")
+            .order("issue_number", desc=True)
+            .limit(1)
+        ).data
+        if not latest:
+            continue
+        last_issue = latest[0]["issue_number"]
+        counter = db.execute(
+            client.table("newsletter_issue_counters")
+            .select("last_issue")
+            .eq("newsletter_id", newsletter["id"])
+        ).data
+        if counter and counter[0]["last_issue"] >= last_issue:
+            continue
+        db.execute(
+            client.table("newsletter_issue_counters").upsert({
+                "newsletter_id": newsletter["id"],
+                "last_issue": last_issue,
+                "updated_at": datetime.now(timezone.utc).isoformat(),
+            }, on_conflict="newsletter_id")
+        )
+        raised[newsletter["id"]] = last_issue
+    return raised
+
+
+def import_export(client, directory: str, page_size: int = None) -> dict:
+    """
+    Import every table found in an export directory (rows referenced by runs
+    before the runs themselves), then rebuild the issue counters. Returns {table: rows}.
+    """
+    counts = {}
+    for table in TABLES:
+        for path in (
+            os.path.join(directory, f"{table.name}.jsonl.gz"),
+            os.path.join(directory, f"{table.name}.referenced.jsonl.gz"),
+        ):
+            if os.path.exists(path):
+                rows = import_table(client, table.name, path, page_size)
+                counts[table.name] = counts.get(table.name, 0) + rows
+        if table.name in counts:
+            print(f"  {table.name}: {counts[table.name]} rows")
+    for newsletter_id, last_issue in rebuild_issue_counters(client).items():
+        print(f"  Issue counter for {newsletter_id} set to {last_issue}")
+    return counts
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Export past issues to an archive, or import one.")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    export_cmd = commands.add_parser("export", help="Export runs, topics, tools and tips")
+    export_cmd.add_argument("--incremental", action="store_true", help="Only rows after the saved watermark")
+    export_cmd.add_argument("--since", metavar="TIMESTAMP", help="Only rows completed/used at or after this ISO timestamp")
+    export_cmd.add_argument("--out", help="Export directory (default: a new timestamped one; no watermark is saved)")
+    export_cmd.add_argument("--page-size", type=int, default=config.ARCHIVE_PAGE_SIZE)
+    export_cmd.add_argument("--no-columnar", action="store_true", help="Write JSONL only")
+
+    import_cmd = commands.add_parser("import", help="Upsert exported rows into the configured storage")
+    import_cmd.add_argument("directories", nargs="+", help="Export directories, oldest first")
+    import_cmd.add_argument("--page-size", type=int, default=config.ARCHIVE_PAGE_SIZE)
+    return parser.parse_args(argv)
+
+
+def run(argv=None):
+    args = parse_args(argv)
+    client = storage.get_client()
+    if args.command == "export":
+        if args.incremental and args.since:
+            print("Use either --incremental or --since")
+            sys.exit(1)
+        print("Exporting archive...")
+        directory = export(
+            client, args.out, incremental=args.incremental, since=args.since,
+            page_size=args.page_size, columnar=not args.no_columnar,
+        )
+        print(f"Archive written to {directory}")
+    else:
+        for directory in args.directories:
+            print(f"Importing {directory}...")
+            import_export(client, directory, args.page_size)
+
+
+if __name__ == "__main__":
+    run()
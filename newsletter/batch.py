@@ -0,0 +1,100 @@
+"""
+Batch mode: generate one issue for every configured newsletter at once.
+
+Each newsletter_config row runs the full pipeline in its own worker thread,
+bounded by a concurrency limit. A failure in one newsletter is recorded in
+its result and never stops the others.
+"""
+
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from . import hedging
+from . import supabase_client as db
+from .main import BacklogReservations, generate_issue
+
+
+def _run_one(
+    supabase,
+    anthropic,
+    newsletter_config: dict,
+    reservations: BacklogReservations,
+    resume_failed: bool = False,
+    cache=None,
+    history=None,
+    runner=None,
+) -> dict:
+    """Run the pipeline for one newsletter, capturing any failure in the result."""
+    started = time.monotonic()
+    name = newsletter_config.get("name") or "FYI GTM"
+    try:
+        run_record = None
+        if resume_failed:
+            run_record = db.get_latest_failed_run(supabase, newsletter_config.get("id"))
+        result = generate_issue(
+            supabase, anthropic, newsletter_config, reservations, run_record, cache,
+            history=history, runner=runner,
+        )
+        result["status"] = "ok"
+    except Exception as e:
+        result = {"newsletter": name, "status": "failed", "error": str(e)}
+    result["seconds"] = round(time.monotonic() - started, 1)
+    return result
+
+
+def run_batch(
+    supabase,
+    anthropic,
+    max_concurrency: int = 4,
+    resume_failed: bool = False,
+    cache=None,
+    history=None,
+    runner=None,
+) -> list[dict]:
+    """
+    Generate an issue for every newsletter_config row concurrently.
+    With resume_failed, each newsletter continues its latest failed run if it has one.
+    runner (claude.AsyncRunner) is shared by all of them for their async Anthropic calls.
+    Returns one result dict per newsletter, in config order.
+    """
+    configs = db.get_newsletter_configs(supabase)
+    if not configs:
+        print("No newsletter configs found, nothing to do.")
+        return []
+
+    workers = max(1, min(max_concurrency, len(configs)))
+    print(f"Batch: {len(configs)} newsletters, concurrency {workers}")
+
+    reservations = BacklogReservations()
+    results = [None] * len(configs)
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="newsletter") as pool:
+        futures = {
+            pool.submit(_run_one, supabase, anthropic, cfg, reservations, resume_failed, cache, history, runner): i
+            for i, cfg in enumerate(configs)
+        }
+        for future in as_completed(futures):
+            results[futures[future]] = future.result()
+
+    print_summary(results)
+    return results
+
+
+def print_summary(results: list[dict]):
+    """Print a per-newsletter result table."""
+    print("\nBatch summary:")
+    for r in results:
+        if r["status"] == "ok":
+            print(
+                f"  OK      {r['newsletter']}: Issue #{r['issue_number']} "
+                f"({r['topic']}) -> broadcast {r['broadcast_id']} [{r['seconds']}s]"
+            )
+        else:
+            print(f"  FAILED  {r['newsletter']}: {r['error']} [{r['seconds']}s]")
+    ok = sum(1 for r in results if r["status"] == "ok")
+    print(f"  {ok}/{len(results)} newsletters generated")
+    for label, counts in hedging.stats().items():
+        if counts.get("hedged"):
+            print(
+                f"  Hedged {label}: {counts['hedged']}/{counts['calls']} calls, "
+                f"{counts.get('hedge_won', 0)} won by the hedge"
+            )
@@ -0,0 +1 @@
+"""Micro-benchmarks for the newsletter pipeline. Run each with python -m."""
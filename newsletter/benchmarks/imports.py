@@ -0,0 +1,94 @@
+"""
+Import-time regression check for the cold-start path.
+
+    python -m newsletter.benchmarks.imports
+    python -m newsletter.benchmarks.imports --runs 20 --max-ms 150
+
+Imports newsletter.main (and, separately, runs --preflight with no
+environment) in fresh interpreters. Reports the median and worst
+`python -X importtime` cumulative time, and fails if any SDK listed in HEAVY
+was loaded or the median exceeds --max-ms. Run it in CI to catch a
+module-level import that drags an SDK back onto the startup path.
+"""
+
+import argparse
+import os
+import re
+import statistics
+import subprocess
+import sys
+import time
+
+TARGET = "newsletter.main"
+HEAVY = ("anthropic", "supabase", "postgrest", "httpx", "httpx2", "markdown")
+
+_IMPORTTIME = re.compile(r"import time:\s+\d+ \|\s+(\d+) \|\s*(\S+)")
+_PROBE = (
+    "import sys, {target}; "
+    "print(','.join(m for m in {heavy!r} if m in sys.modules))"
+)
+
+
+def _env() -> dict:
+    root = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    return dict(os.environ, PYTHONPATH=root + os.pathsep + os.environ.get("PYTHONPATH", ""))
+
+
+def import_time_ms(module: str = TARGET) -> float:
+    """Cumulative import time of module in a fresh interpreter, from -X importtime."""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True, text=True, env=_env(), check=True,
+    )
+    for line in result.stderr.splitlines():
+        match = _IMPORTTIME.match(line)
+        if match and match.group(2) == module:
+            return int(match.group(1)) / 1000
+    raise RuntimeError(f"{module} not found in -X importtime output")
+
+
+def heavy_modules_loaded(module: str = TARGET) -> list[str]:
+    """SDKs from HEAVY that importing module pulls in."""
+    result = subprocess.run(
+        [sys.executable, "-c", _PROBE.format(target=module, heavy=HEAVY)],
+        capture_output=True, text=True, env=_env(), check=True,
+    )
+    return [name for name in result.stdout.strip().split(",") if name]
+
+
+def preflight_wall_ms() -> float:
+    """Wall time of `python -m newsletter.main --preflight` with no credentials (all checks fail fast)."""
+    env = {k: v for k, v in _env().items() if k not in (
+        "SUPABASE_URL", "SUPABASE_SERVICE_ROLE_KEY", "ANTHROPIC_API_KEY", "KIT_API_KEY",
+    )}
+    started = time.perf_counter()
+    subprocess.run([sys.executable, "-m", TARGET, "--preflight"], capture_output=True, env=env)
+    return (time.perf_counter() - started) * 1000
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description="Measure cold import time of the pipeline entry point")
+    parser.add_argument("--runs", type=int, default=10, help="Fresh interpreters to sample")
+    parser.add_argument("--max-ms", type=float, default=150.0, help="Fail if the median import exceeds this")
+    args = parser.parse_args()
+
+    samples = [import_time_ms() for _ in range(args.runs)]
+    preflight = [preflight_wall_ms() for _ in range(min(args.runs, 5))]
+    heavy = heavy_modules_loaded()
+
+    print(f"import {TARGET}: median {statistics.median(samples):.1f}ms, max {max(samples):.1f}ms ({args.runs} runs)")
+    print(f"--preflight without credentials: median {statistics.median(preflight):.0f}ms wall (incl. interpreter start)")
+    print(f"SDKs loaded at import: {', '.join(heavy) or 'none'}")
+
+    failures = []
+    if heavy:
+        failures.append(f"{', '.join(heavy)} imported at module load")
+    if statistics.median(samples) > args.max_ms:
+        failures.append(f"median import {statistics.median(samples):.1f}ms > {args.max_ms:.0f}ms")
+    if failures:
+        print("REGRESSION: " + "; ".join(failures))
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main_cli()
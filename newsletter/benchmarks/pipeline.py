@@ -0,0 +1,160 @@
+"""
+End-to-end pipeline benchmark against the offline fakes (or a cassette).
+
+    python -m newsletter.benchmarks.pipeline
+    python -m newsletter.benchmarks.pipeline --runs 20 --concurrency 1,4,8 --newsletters 8 \\
+        --latency anthropic=0.4,supabase=0.02,kit=0.05 --jitter 0.25
+    python -m newsletter.benchmarks.pipeline --cassette cassettes/weekly.json --runs 1
+
+Drives main.run() for single issues and main.run(["--batch", ...]) for each
+concurrency level, with per-request latency injected into the fake services.
+Reports p50/p95 per pipeline stage and throughput in issues per second.
+With zero latency the numbers measure orchestration overhead alone.
+"""
+
+import argparse
+import contextlib
+import io
+import threading
+import time
+from collections import defaultdict
+from functools import wraps
+from unittest import mock
+
+from .. import main
+from .. import claude_client as claude
+from .. import kit_client as kit
+from .. import document
+from ..devtools.cassette import Cassette
+from ..devtools.harness import offline
+
+# (label, owner, attribute) for every timed stage
+STAGES = [
+    ("backlog", main, "select_backlog"),
+    ("start_run", main, "start_run"),
+    ("topic", claude, "generate_topic"),
+    ("research", claude, "research_newsletter"),
+    ("writing", claude, "write_newsletter"),
+    ("render", document.NewsletterDocument, "to_html"),
+    ("kit", kit, "publish_broadcast"),
+    ("issue", main, "generate_issue"),
+]
+
+
+class StageTimer:
+    """Collects wall-clock durations per stage from any thread."""
+
+    def __init__(self):
+        self.samples = defaultdict(list)
+        self._lock = threading.Lock()
+
+    def wrap(self, label, func):
+        @wraps(func)
+        def timed(*args, **kwargs):
+            started = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                with self._lock:
+                    self.samples[label].append(time.perf_counter() - started)
+        return timed
+
+    @contextlib.contextmanager
+    def installed(self):
+        patches = [
+            mock.patch.object(owner, attr, self.wrap(label, getattr(owner, attr)))
+            for label, owner, attr in STAGES
+        ]
+        for patch in patches:
+            patch.start()
+        try:
+            yield self
+        finally:
+            for patch in reversed(patches):
+                patch.stop()
+
+
+def percentile(values: list[float], pct: float) -> float:
+    """Nearest-rank percentile."""
+    ordered = sorted(values)
+    rank = max(1, round(pct / 100 * len(ordered) + 0.5))
+    return ordered[min(rank, len(ordered)) - 1]
+
+
+def parse_latency(spec: str) -> dict:
+    """"anthropic=0.4,supabase=0.02" → {"anthropic": 0.4, "supabase": 0.02}"""
+    latency = {}
+    for part in filter(None, (spec or "").split(",")):
+        name, _, seconds = part.partition("=")
+        latency[name.strip()] = float(seconds)
+    return latency
+
+
+def run_main(argv: list[str], verbose: bool) -> bool:
+    """Run main.run(argv); True on success."""
+    output = contextlib.nullcontext() if verbose else contextlib.redirect_stdout(io.StringIO())
+    with output:
+        try:
+            main.run(argv)
+        except SystemExit as e:
+            return not e.code
+    return True
+
+
+def report(title: str, timer: StageTimer, issues: int, failures: int, elapsed: float):
+    print(f"\n{title}")
+    print(f"  {issues} issues in {elapsed:.2f}s → {issues / elapsed:.2f} issues/s" + (f", {failures} failed" if failures else ""))
+    print(f"  {'stage':<10} {'n':>4} {'p50':>9} {'p95':>9}")
+    for label, _, _ in STAGES:
+        values = timer.samples.get(label)
+        if values:
+            print(f"  {label:<10} {len(values):>4} {percentile(values, 50) * 1000:>7.1f}ms {percentile(values, 95) * 1000:>7.1f}ms")
+
+
+def bench_single(runs: int, verbose: bool, **offline_args):
+    timer = StageTimer()
+    failures = 0
+    with offline(**offline_args), timer.installed():
+        started = time.perf_counter()
+        for _ in range(runs):
+            failures += not run_main([], verbose)
+        elapsed = time.perf_counter() - started
+    report(f"Single runs (main.run), {runs} sequential", timer, runs, failures, elapsed)
+
+
+def bench_batch(newsletters: int, concurrency: int, verbose: bool, **offline_args):
+    timer = StageTimer()
+    with offline(newsletters=newsletters, **offline_args), timer.installed():
+        started = time.perf_counter()
+        ok = run_main(["--batch", "--concurrency", str(concurrency)], verbose)
+        elapsed = time.perf_counter() - started
+    failures = 0 if ok else newsletters - len(timer.samples.get("kit", []))
+    report(f"Batch, {newsletters} newsletters, concurrency {concurrency}", timer, newsletters, failures, elapsed)
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description="Benchmark the newsletter pipeline offline")
+    parser.add_argument("--runs", type=int, default=10, help="Sequential single runs")
+    parser.add_argument("--newsletters", type=int, default=8, help="Newsletters per batch run")
+    parser.add_argument("--concurrency", default="1,4", help="Comma-separated batch concurrency levels")
+    parser.add_argument("--latency", default="anthropic=0.2,supabase=0.01,kit=0.03",
+                        help="Seconds added per request, per service")
+    parser.add_argument("--jitter", type=float, default=0.2, help="Latency jitter as a fraction of the base")
+    parser.add_argument("--cassette", help="Replay this cassette instead of using the fakes (single runs only)")
+    parser.add_argument("--verbose", action="store_true", help="Show pipeline output")
+    args = parser.parse_args()
+
+    offline_args = {"latency": parse_latency(args.latency), "jitter": args.jitter}
+    if args.cassette:
+        offline_args["cassette"] = Cassette(args.cassette)
+    print(f"Latency per request: {offline_args['latency'] or 'none'} (jitter {args.jitter:.0%})")
+
+    if args.runs:
+        bench_single(args.runs, args.verbose, **offline_args)
+    if not args.cassette:
+        for level in filter(None, args.concurrency.split(",")):
+            bench_batch(args.newsletters, int(level), args.verbose, **offline_args)
+
+
+if __name__ == "__main__":
+    main_cli()
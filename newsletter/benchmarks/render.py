@@ -0,0 +1,128 @@
+"""
+Render a year of issues and compare converter strategies.
+
+    python -m newsletter.benchmarks.render            # 52 synthetic issues
+    python -m newsletter.benchmarks.render --from-db  # last 52 issues from newsletter_runs
+
+Strategies:
+- fresh:  a new Markdown instance per issue (the old markdown_to_html)
+- cached: renderer.render, one reset-between-calls converter per thread
+- email:  renderer.render(email=True), styles inlined and links tagged in the same pass
+"""
+
+import argparse
+import statistics
+import time
+
+import markdown
+
+from .. import renderer
+
+SAMPLE_ISSUE = """Pipeline reviews keep getting longer while forecasts get less accurate. This week is about {theme} and the tools that make it less painful.
+
+## One: Sales Tech Spotlight
+
+**[Acme {n}: Deal Desk](https://acme{n}.example.com)**
+
+**The problem** - Reps spend hours every week chasing approvals for non-standard deals.
+
+**What it is** - A deal desk workflow that routes pricing exceptions to the right approver inside the CRM.
+
+**Key capabilities**
+- Approval routing based on discount and term length
+- Slack and email approvals with a full audit trail
+- Margin guardrails surfaced before the quote goes out
+
+**Why now** - Average sales cycles grew {n}% this year, and approvals are a common bottleneck.
+
+**Best for** - Mid-market teams with more than {n} quoting reps.
+
+## Two: Tips to Try This Week
+
+1. **Run a "why now" check on every late-stage deal** - Ask what changes for the buyer if they wait a quarter. If nothing does, move the close date.
+2. **Send the mutual action plan before the demo** - Buyers who edit the plan are [far more likely](https://research.example.com/map?id={n}) to close.
+
+## Three: Takeaways
+
+1. Teams that review {theme} weekly see 18% better forecast accuracy.
+2. Multi-threaded deals close at twice the rate of single-threaded ones.
+3. "Smart" quotes -- with guardrails -- cut discounting by a third.
+
+That's it for this week. Hit reply if you have thoughts!
+
+-- FYI GTM Team
+"""
+
+THEMES = ["forecasting", "pipeline hygiene", "discount discipline", "multi-threading"]
+
+
+def synthetic_issues(count: int = 52) -> list[str]:
+    return [SAMPLE_ISSUE.format(n=n + 1, theme=THEMES[n % len(THEMES)]) for n in range(count)]
+
+
+def archived_issues(count: int = 52) -> list[str]:
+    from .. import supabase_client as db
+    client = db.get_client()
+    result = db.execute(
+        client.table("newsletter_runs")
+        .select("newsletter_content")
+        .not_.is_("newsletter_content", "null")
+        .order("created_at", desc=True)
+        .limit(count)
+    )
+    return [row["newsletter_content"] for row in result.data]
+
+
+def render_fresh(text: str) -> str:
+    return markdown.markdown(text, extensions=renderer.EXTENSIONS)
+
+
+def render_cached(text: str) -> str:
+    return renderer.render(text)
+
+
+def render_email(text: str) -> str:
+    return renderer.render(text, email=True)
+
+
+def measure(func, issues: list[str], repeat: int) -> list[float]:
+    """Seconds per full pass over the issues, one entry per repeat."""
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        for text in issues:
+            func(text)
+        timings.append(time.perf_counter() - started)
+    return timings
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark newsletter rendering")
+    parser.add_argument("--issues", type=int, default=52, help="Issues per pass (default: a year)")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--from-db", action="store_true", help="Use archived issues from Supabase")
+    args = parser.parse_args()
+
+    issues = archived_issues(args.issues) if args.from_db else synthetic_issues(args.issues)
+    if not issues:
+        raise SystemExit("No issues to render")
+
+    # Same HTML from both plain strategies, or the comparison is meaningless
+    assert all(render_fresh(t) == render_cached(t) for t in issues[:5])
+
+    print(f"Rendering {len(issues)} issues x {args.repeat} passes")
+    print(f"{'strategy':<8} {'best pass':>10} {'median':>10} {'per issue':>10}")
+    baseline = None
+    for name, func in (("fresh", render_fresh), ("cached", render_cached), ("email", render_email)):
+        func(issues[0])  # warm-up: imports and first converter build
+        timings = measure(func, issues, args.repeat)
+        best = min(timings)
+        baseline = baseline or best
+        print(
+            f"{name:<8} {best * 1000:>8.1f}ms {statistics.median(timings) * 1000:>8.1f}ms "
+            f"{best / len(issues) * 1000:>8.2f}ms  ({baseline / best:.1f}x)"
+        )
+
+
+if __name__ == "__main__":
+    main()
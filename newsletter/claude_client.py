@@ -1,7 +1,20 @@
-import time
-import anthropic
-
-from .config import ANTHROPIC_API_KEY, WRITING_MODEL, MAX_WRITING_TOKENS
+import asyncio
+import json
+import random
+import re
+import threading
+from datetime import datetime
+
+from . import research_cache
+from . import retry
+from . import hedging
+from . import telemetry
+from . import token_budget
+from . import document
+from .streaming import NewsletterStreamProcessor, DuplicateSpotlightError
+from .config import (
+    ANTHROPIC_API_KEY, WRITING_MODEL, WRITING_MAX_CONTINUATIONS, TOPIC_CANDIDATES, RESEARCH_FANOUT,
+)
 
 # Models for 2-step pipeline
 RESEARCH_MODEL = "claude-haiku-4-5-20251001"
@@ -41,16 +54,123 @@ Three quick insights, stats, or lessons relevant to the audience.
 Each takeaway should be 1-2 sentences max."""
 
 
+# Where research may come from (shared with the parallel sub-queries in research.py)
+RESEARCH_SOURCE_GUIDANCE = """   - Prefer signals from recent product launches, pricing changes, customer adoption patterns, acquisitions, platform policy shifts, or measurable behavior changes in buyer or seller workflows
+   - Use observable discussion from sources like LinkedIn posts by GTM operators, Reddit GTM communities, public earnings calls, or credible industry reporting
+   - Do NOT rely on vendor blogs, marketing pages, or press releases as primary sources. These may be used for factual product details only after independent signals confirm relevance.
+   - The tech must be a real, named product or platform that can be independently verified. Do not use generic category descriptions."""
+
+# Research task instructions. Identical for every run, so they lead the cached prompt prefix.
+RESEARCH_INSTRUCTIONS = f"""You are a research assistant gathering information for a weekly newsletter.
+
+YOUR TASK:
+1. Use web search to find current, relevant information:
+   - If a TECH TO SPOTLIGHT was provided, search for recent news, updates, or reviews about it
+   - If no tech was provided, search for a specific, named trending sales/GTM tool this week
+   - Search for current sales statistics, trends, or insights
+   - Look for timely, credible data points
+
+2. Research source guidance (follow strictly):
+{RESEARCH_SOURCE_GUIDANCE}
+
+3. Output a structured research summary with:
+   - Tech tool information (name, what it does, why it's relevant now, pricing if found)
+   - The specific GTM problem or pain point this tool addresses (e.g., pipeline visibility, forecast accuracy, rep productivity, data fragmentation)
+   - 3-4 key capabilities or features that connect to that problem — not a full feature list, just the ones that matter for the stated pain point
+   - The tool's primary website URL and domain
+   - Recent trigger: any product launch, update, pricing change, acquisition, or industry signal that makes this tool timely right now
+   - Best fit: what type of team, sales motion, or situation this tool is built for, and where it's not a fit
+   - 2-3 current statistics or trends relevant to sales/GTM with sources
+   - Any notable news or developments in the space
+   - Specific facts, quotes, or data points to include
+
+Be factual and concise. This research will be used to write the newsletter."""
+
+# Formatting rules for the writing step (part of the cached prompt prefix)
+WRITING_FORMATTING = """FORMATTING:
+- Follow the formatting rules in the NEWSLETTER STRUCTURE above exactly
+- In the Spotlight: link the tool name to its website using markdown (e.g., [Tool Name](https://tool.com))
+- Format in Markdown
+- End with a brief closing line and sign off with exactly: "-- FYI GTM Team" (use two hyphens)"""
+
+
 def get_client():
-    """Create and return Anthropic client."""
-    return anthropic.Anthropic(api_key=ANTHROPIC_API_KEY)
+    """
+    Create and return Anthropic client.
+    SDK-level retries are disabled; retry.call_with_retry owns the retry policy.
+    """
+    import anthropic  # deferred: the SDK is slow to import and not needed to fail fast on config
+
+    return anthropic.Anthropic(api_key=ANTHROPIC_API_KEY, max_retries=0)
+
+
+def get_async_client():
+    """AsyncAnthropic client for concurrent requests (same retry arrangement as get_client)."""
+    import anthropic
 
+    return anthropic.AsyncAnthropic(api_key=ANTHROPIC_API_KEY, max_retries=0)
 
-def generate_topic(client, config: dict | None = None, recent_topics: list[str] = None) -> dict:
+
+class AsyncRunner:
     """
-    Generate a newsletter topic based on current trends and the newsletter context.
-    Returns a dict with 'topic' (short title) and 'description' (context for content generation).
+    One event loop on a background thread with one AsyncAnthropic client,
+    kept for the life of the process. Pipeline threads hand it their async
+    steps (parallel research, topic search, hedged calls), which then reuse
+    the client's pooled connections instead of a new loop and client each.
     """
+
+    def __init__(self, client=None):
+        self.loop = asyncio.new_event_loop()
+        self.client = client or get_async_client()
+        self._thread = threading.Thread(target=self.loop.run_forever, name="anthropic-async", daemon=True)
+        self._thread.start()
+
+    def run(self, make_coro):
+        """Run make_coro(client) on the loop and block until it finishes (call from other threads)."""
+        return asyncio.run_coroutine_threadsafe(make_coro(self.client), self.loop).result()
+
+    def close(self):
+        if self.loop.is_closed():
+            return
+        asyncio.run_coroutine_threadsafe(self.client.close(), self.loop).result()
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self._thread.join()
+        self.loop.close()
+
+
+def run_async(make_coro, runner: AsyncRunner = None):
+    """
+    Run make_coro(async_client) from blocking code: on the runner's loop and
+    client when given, otherwise on a fresh loop with a client closed afterwards.
+    """
+    if runner is not None:
+        return runner.run(make_coro)
+
+    async def run():
+        client = get_async_client()
+        try:
+            return await make_coro(client)
+        finally:
+            await client.close()
+
+    return asyncio.run(run())
+
+
+GENERIC_TOPIC_PHRASES = ["this week in", "weekly roundup", "sales update", "gtm update", "weekly digest"]
+
+# Areas suggested when recent topics cluster on one theme (and used to spread
+# speculative candidates across different parts of GTM)
+TOPIC_AREAS = [
+    "pipeline management", "forecasting accuracy", "buyer behavior shifts",
+    "sales process design", "marketing-sales alignment", "pricing strategy",
+    "competitive positioning", "enablement programs", "new hire onboarding",
+    "customer retention", "expansion revenue", "channel partnerships",
+    "deal execution", "territory planning", "RevOps tooling",
+]
+
+
+def build_topic_prompt(config: dict | None = None, recent_topics: list[str] = None, focus: str = None) -> str:
+    """Prompt for one topic as JSON. focus optionally steers the model toward one GTM area."""
     context = ""
     if config:
         if config.get("description"):
@@ -73,15 +193,14 @@ PREVIOUSLY COVERED TOPICS (do NOT repeat or closely resemble any of these):
 
 Your topic must cover a DIFFERENT area of GTM than the topics above. If recent topics
 cluster on one area (e.g., AI, outbound, prospecting), deliberately choose a different
-GTM domain such as: pipeline management, forecasting accuracy, buyer behavior shifts,
-sales process design, marketing-sales alignment, pricing strategy, competitive positioning,
-enablement programs, new hire onboarding, customer retention, expansion revenue, channel
-partnerships, deal execution, territory planning, or RevOps tooling.
+GTM domain such as: {", ".join(TOPIC_AREAS)}.
 Do NOT default to AI or any single recurring theme.
 
 """
+    if focus:
+        avoidance += f"Focus this topic on {focus}.\n\n"
 
-    prompt = f"""You are helping generate a topic for a weekly GTM/sales newsletter.
+    return f"""You are helping generate a topic for a weekly GTM/sales newsletter.
 
 {context}
 {avoidance}Generate a fresh, timely topic for this week's newsletter.
@@ -101,50 +220,45 @@ Use web search to find what's currently trending in the GTM/sales/revenue space.
 Respond with ONLY a JSON object (no markdown, no code blocks, no explanation):
 {{"topic": "Specific Topic Title", "description": "1-2 sentences explaining the angle and why it's relevant now"}}"""
 
-    def make_request():
-        return client.messages.create(
-            model=RESEARCH_MODEL,
-            max_tokens=500,
-            tools=[{"type": "web_search_20250305", "name": "web_search", "max_uses": 3}],
-            messages=[{"role": "user", "content": prompt}],
-        )
 
-    print("  Calling Claude to generate topic...")
-    response = call_with_retry(make_request)
+def topic_request(prompt: str) -> dict:
+    """messages.create arguments for a topic prompt."""
+    return {
+        "model": RESEARCH_MODEL,
+        "max_tokens": 500,
+        "tools": [{"type": "web_search_20250305", "name": "web_search", "max_uses": 3}],
+        "messages": [{"role": "user", "content": prompt}],
+    }
+
 
-    # Extract text from response
+def parse_topic_response(response) -> dict | None:
+    """The {"topic", "description"} JSON object in a response, or None."""
     text_parts = [block.text for block in response.content if hasattr(block, "text")]
     response_text = "\n".join(text_parts).strip()
     print(f"  Raw response: {response_text[:200]}...")
 
-    # Parse JSON response
-    import json
-    import re
-
     # Try to extract JSON from the response
     json_match = re.search(r'\{[^{}]+\}', response_text)
-    if json_match:
-        try:
-            # Sanitize control characters the model puts inside JSON string values
-            raw_json = json_match.group()
-            raw_json = raw_json.replace("\n", " ").replace("\r", " ").replace("\t", " ")
-            result = json.loads(raw_json)
-            if "topic" in result:
-                # Reject generic topics
-                generic_phrases = ["this week in", "weekly roundup", "sales update", "gtm update", "weekly digest"]
-                if any(phrase in result["topic"].lower() for phrase in generic_phrases):
-                    print(f"  Rejected generic topic: {result['topic']}")
-                else:
-                    print(f"  Generated topic: {result['topic']}")
-                    return result
-        except json.JSONDecodeError as e:
-            print(f"  JSON parse error: {e}")
+    if not json_match:
+        return None
+    try:
+        # Sanitize control characters the model puts inside JSON string values
+        raw_json = json_match.group()
+        raw_json = raw_json.replace("\n", " ").replace("\r", " ").replace("\t", " ")
+        result = json.loads(raw_json)
+    except json.JSONDecodeError as e:
+        print(f"  JSON parse error: {e}")
+        return None
+    return result if isinstance(result, dict) and result.get("topic") else None
 
-    # Fallback - rotate through diverse topics so the same one never repeats
-    import random
-    from datetime import datetime
-    now = datetime.now()
-    month = now.strftime("%B")
+
+def is_generic_topic(topic: str) -> bool:
+    return any(phrase in topic.lower() for phrase in GENERIC_TOPIC_PHRASES)
+
+
+def fallback_topic(is_duplicate=None) -> dict:
+    """Pick one of the built-in topics, skipping any the history says were covered."""
+    month = datetime.now().strftime("%B")
     fallback_options = [
         {"topic": "Forecast Accuracy Under Pressure", "description": f"Why most teams still miss forecasts and what top orgs are doing differently in {month}."},
         {"topic": "Buyer Behavior Shifts in B2B", "description": f"How B2B buying committees are changing and what sellers need to adapt to in {month}."},
@@ -155,22 +269,105 @@ Respond with ONLY a JSON object (no markdown, no code blocks, no explanation):
         {"topic": "Pricing Strategy Rethink", "description": f"How usage-based and hybrid pricing models are reshaping GTM motions in {month}."},
         {"topic": "Territory Planning Pitfalls", "description": f"Common territory design mistakes that tank quota attainment and how to fix them in {month}."},
     ]
+    if is_duplicate:
+        fallback_options = [o for o in fallback_options if not is_duplicate(o["topic"])] or fallback_options
     fallback = random.choice(fallback_options)
     print(f"  Using fallback topic: {fallback['topic']}")
     return fallback
 
 
-def call_with_retry(func, max_retries=3):
-    """Call a function with exponential backoff on rate limit errors."""
-    for attempt in range(max_retries):
-        try:
-            return func()
-        except anthropic.RateLimitError as e:
-            if attempt == max_retries - 1:
-                raise
-            wait_time = 60 * (attempt + 1)  # 60s, 120s, 180s
-            print(f"Rate limited, waiting {wait_time}s before retry {attempt + 2}/{max_retries}...")
-            time.sleep(wait_time)
+def generate_topic(
+    client,
+    config: dict | None = None,
+    recent_topics: list[str] = None,
+    is_duplicate=None,
+    max_attempts: int = 2,
+    candidates: int = None,
+    runner: AsyncRunner = None,
+) -> dict:
+    """
+    Generate a newsletter topic based on current trends and the newsletter context.
+    is_duplicate(topic) returns the (past topic, score) a candidate repeats, or None;
+    repeats are sent back to the model (up to max_attempts) before falling back.
+    With candidates > 1 (default TOPIC_CANDIDATES), requests that many topics at
+    once and keeps the best-scoring one (see topic_search). runner, if given,
+    runs the concurrent and hedged requests (see AsyncRunner).
+    Returns a dict with 'topic' (short title) and 'description' (context for content generation).
+    """
+    candidates = TOPIC_CANDIDATES if candidates is None else candidates
+    if candidates > 1:
+        from . import topic_search
+        return topic_search.generate_topic_speculative(
+            config, recent_topics, is_duplicate=is_duplicate, candidates=candidates, runner=runner,
+        )
+
+    request = topic_request(build_topic_prompt(config, recent_topics))
+
+    def make_request():
+        return client.messages.create(**request)
+
+    print("  Calling Claude to generate topic...")
+    response = create_message("topic", request, make_request, runner)
+    log_usage("Topic", response)
+
+    result = parse_topic_response(response)
+    if result:
+        duplicate = is_duplicate(result["topic"]) if is_duplicate else None
+        if is_generic_topic(result["topic"]):
+            print(f"  Rejected generic topic: {result['topic']}")
+        elif duplicate:
+            print(f"  Rejected near-duplicate topic: {result['topic']} (~ {duplicate[0]}, {duplicate[1]:.2f})")
+            if max_attempts > 1:
+                avoid = (recent_topics or []) + [result["topic"], duplicate[0]]
+                return generate_topic(client, config, avoid, is_duplicate, max_attempts - 1, candidates, runner)
+        else:
+            print(f"  Generated topic: {result['topic']}")
+            return result
+
+    # Fallback - rotate through diverse topics so the same one never repeats
+    return fallback_topic(is_duplicate)
+
+
+def call_with_retry(func):
+    """Call an Anthropic request function under the shared retry policy."""
+    return retry.call_with_retry(func, service="anthropic")
+
+
+def create_message(label: str, request: dict, make_request, runner: AsyncRunner = None):
+    """
+    messages.create(**request) for a pipeline step: hedged when HEDGE_ENABLED
+    (see hedging; on runner's loop when given), otherwise make_request() under
+    the retry policy.
+    """
+    if not hedging.enabled():
+        return call_with_retry(make_request)
+
+    async def attempt(async_client, ready):
+        return await async_client.messages.create(**request)
+
+    return hedging.call(label, attempt, runner=runner)
+
+
+def cached_text_block(text: str) -> dict:
+    """
+    System prompt text block marked as a prompt-cache breakpoint.
+    Everything up to and including this block is cached by the API.
+    """
+    return {"type": "text", "text": text, "cache_control": {"type": "ephemeral"}}
+
+
+def log_usage(label: str, response):
+    """Print token usage for a response (including prompt cache reads/writes) and record it in telemetry."""
+    usage = getattr(response, "usage", None)
+    if usage is None:
+        return
+    telemetry.record_usage(label, response)
+    cache_read = getattr(usage, "cache_read_input_tokens", None) or 0
+    cache_write = getattr(usage, "cache_creation_input_tokens", None) or 0
+    print(
+        f"  {label} tokens: input {usage.input_tokens}, output {usage.output_tokens}, "
+        f"cache read {cache_read}, cache write {cache_write}"
+    )
 
 
 def build_context_section(config: dict | None) -> str:
@@ -254,42 +451,80 @@ def generate_newsletter(
 
     This mirrors the proven tool-research approach for reliable output.
     """
+    research_notes = research_newsletter(client, config, topic, tech, tips, recent_tech)
+    return write_newsletter(client, config, topic, tech, tips, research_notes)
+
+
+def research_newsletter(
+    client,
+    config: dict | None = None,
+    topic: dict | None = None,
+    tech: dict | None = None,
+    tips: list = None,
+    recent_tech: list[str] = None,
+    cache=None,
+    runner: AsyncRunner = None,
+) -> str:
+    """
+    Pipeline step 1: Haiku + web search → research notes (reused from cache when fresh).
+    With RESEARCH_FANOUT the tool, statistics and news are researched in parallel (see research);
+    if the tool research fails there, it falls back to the single combined request.
+    """
     context_section = build_context_section(config)
     backlog_section = build_backlog_section(topic, tech, tips or [])
-    structure_section = get_structure(config)
-    avoid_section = build_avoid_section(config)
 
-    # ========== STEP 1: RESEARCH WITH HAIKU ==========
     print("  Step 1: Researching with Haiku...")
-    research_notes = run_research_step(client, context_section, backlog_section, recent_tech)
+    research_notes = None
+    if RESEARCH_FANOUT:
+        from . import research
+        try:
+            research_notes = research.research(context_section, backlog_section, recent_tech, cache=cache, runner=runner)
+        except Exception as e:
+            print(f"  Parallel research failed ({e}), retrying as a single research request")
+    if research_notes is None:
+        research_notes = run_research_step(
+            client, context_section, backlog_section, recent_tech, cache=cache, runner=runner,
+        )
     print("  Research complete.")
+    return research_notes
+
+
+def write_newsletter(
+    client,
+    config: dict | None = None,
+    topic: dict | None = None,
+    tech: dict | None = None,
+    tips: list = None,
+    research_notes: str = "",
+    history=None,
+    runner: AsyncRunner = None,
+) -> str:
+    """
+    Pipeline step 2: Sonnet (no tools) → final newsletter.
+    With a similarity.HistoryIndex, a Spotlight on a previously featured tool is rejected mid-stream.
+    """
+    context_section = build_context_section(config)
+    backlog_section = build_backlog_section(topic, tech, tips or [])
+    structure_section = get_structure(config)
+    avoid_section = build_avoid_section(config)
 
-    # ========== STEP 2: WRITING WITH SONNET ==========
     print("  Step 2: Writing with Sonnet...")
     newsletter = run_writing_step(
         client, context_section, backlog_section, structure_section,
-        research_notes, avoid_section, tech
+        research_notes, avoid_section, tech,
+        is_duplicate_tech=history.find_tech_duplicate if history and not tech else None,
+        runner=runner,
     )
     print("  Writing complete.")
-
     return newsletter
 
 
-def run_research_step(
-    client,
-    context_section: str,
-    backlog_section: str,
-    recent_tech: list[str] = None,
-) -> str:
-    """
-    Step 1: Use Haiku with web search to gather current information.
-    Returns research notes to be used by the writing step.
-    """
-    # Build avoidance context from recently featured tools
-    tech_avoidance = ""
-    if recent_tech:
-        tech_list = "\n".join(f"  - {t}" for t in recent_tech)
-        tech_avoidance = f"""
+def build_tech_avoidance(recent_tech: list[str] = None) -> str:
+    """Avoidance context from recently featured tools (empty when there are none)."""
+    if not recent_tech:
+        return ""
+    tech_list = "\n".join(f"  - {t}" for t in recent_tech)
+    return f"""
 PREVIOUSLY FEATURED TOOLS (do NOT repeat or closely resemble any of these):
 {tech_list}
 
@@ -303,50 +538,55 @@ Do NOT default to any single tool or category.
 
 """
 
-    prompt = f"""You are a research assistant gathering information for a weekly newsletter.
-
-{context_section}
-
-{backlog_section}
-{tech_avoidance}YOUR TASK:
-1. Use web search to find current, relevant information:
-   - If a TECH TO SPOTLIGHT was provided, search for recent news, updates, or reviews about it
-   - If no tech was provided, search for a specific, named trending sales/GTM tool this week
-   - Search for current sales statistics, trends, or insights
-   - Look for timely, credible data points
-
-2. Research source guidance (follow strictly):
-   - Prefer signals from recent product launches, pricing changes, customer adoption patterns, acquisitions, platform policy shifts, or measurable behavior changes in buyer or seller workflows
-   - Use observable discussion from sources like LinkedIn posts by GTM operators, Reddit GTM communities, public earnings calls, or credible industry reporting
-   - Do NOT rely on vendor blogs, marketing pages, or press releases as primary sources. These may be used for factual product details only after independent signals confirm relevance.
-   - The tech must be a real, named product or platform that can be independently verified. Do not use generic category descriptions.
 
-3. Output a structured research summary with:
-   - Tech tool information (name, what it does, why it's relevant now, pricing if found)
-   - The specific GTM problem or pain point this tool addresses (e.g., pipeline visibility, forecast accuracy, rep productivity, data fragmentation)
-   - 3-4 key capabilities or features that connect to that problem — not a full feature list, just the ones that matter for the stated pain point
-   - The tool's primary website URL and domain
-   - Recent trigger: any product launch, update, pricing change, acquisition, or industry signal that makes this tool timely right now
-   - Best fit: what type of team, sales motion, or situation this tool is built for, and where it's not a fit
-   - 2-3 current statistics or trends relevant to sales/GTM with sources
-   - Any notable news or developments in the space
-   - Specific facts, quotes, or data points to include
+def run_research_step(
+    client,
+    context_section: str,
+    backlog_section: str,
+    recent_tech: list[str] = None,
+    cache=None,
+    runner: AsyncRunner = None,
+) -> str:
+    """
+    Step 1: Use Haiku with web search to gather current information.
+    Returns research notes to be used by the writing step.
+    With a research cache, identical prompts within the TTL skip the call.
+    """
+    tech_avoidance = build_tech_avoidance(recent_tech)
 
-Be factual and concise. This research will be used to write the newsletter."""
+    # Stable prefix (instructions + newsletter context) is cached; backlog varies per run
+    system = [
+        {"type": "text", "text": RESEARCH_INSTRUCTIONS},
+        cached_text_block(context_section),
+    ]
+    prompt = f"""{backlog_section}
+{tech_avoidance}
+Research this week's newsletter now, following the task above."""
+
+    key = research_cache.cache_key(RESEARCH_MODEL, RESEARCH_INSTRUCTIONS, context_section, prompt)
+    cached = research_cache.lookup(cache, key)
+    if cached:
+        return cached
+
+    request = {
+        "model": RESEARCH_MODEL,
+        "max_tokens": MAX_RESEARCH_TOKENS,
+        "tools": [{"type": "web_search_20250305", "name": "web_search", "max_uses": 3}],
+        "system": system,
+        "messages": [{"role": "user", "content": prompt}],
+    }
 
     def make_request():
-        return client.messages.create(
-            model=RESEARCH_MODEL,
-            max_tokens=MAX_RESEARCH_TOKENS,
-            tools=[{"type": "web_search_20250305", "name": "web_search", "max_uses": 3}],
-            messages=[{"role": "user", "content": prompt}],
-        )
+        return client.messages.create(**request)
 
-    response = call_with_retry(make_request)
+    response = create_message("research", request, make_request, runner)
+    log_usage("Research", response)
 
     # Extract all text from response (research notes can include all commentary)
     text_parts = [block.text for block in response.content if hasattr(block, "text")]
-    return "\n".join(text_parts)
+    research_notes = "\n".join(text_parts)
+    research_cache.store(cache, key, research_notes, model=RESEARCH_MODEL)
+    return research_notes
 
 
 def _extract_tech_domain(tech: dict | None) -> str | None:
@@ -368,10 +608,15 @@ def run_writing_step(
     research_notes: str,
     avoid_section: str = "",
     tech: dict | None = None,
+    is_duplicate_tech=None,
+    runner: AsyncRunner = None,
 ) -> str:
     """
     Step 2: Use Sonnet (NO tools) to write the final newsletter.
     No web search = no tool-use commentary = clean output.
+    Streams the response; raises StructureError early if the output goes off-structure.
+    is_duplicate_tech(name) returning a match aborts the stream as soon as the
+    Spotlight tool appears, and the step is retried once with that tool excluded.
     """
     # Images disabled - Unsplash IDs are unreliable and Clearbit logos
     # were not being used by the model. Can re-enable later with a
@@ -382,12 +627,9 @@ def run_writing_step(
     # Build the avoid section block
     avoid_block = f"\n\n{avoid_section}" if avoid_section else ""
 
-    prompt = f"""{context_section}
-
-{backlog_section}
-
-RESEARCH NOTES:
-{research_notes}
+    # Stable prefix: everything that only changes when the newsletter config does.
+    # Cached so repeated issues (and batch runs) skip re-reading it.
+    system = [cached_text_block(f"""{context_section}
 
 NEWSLETTER STRUCTURE:
 
@@ -395,35 +637,119 @@ NEWSLETTER STRUCTURE:
 
 ---
 
-FORMATTING:
-- Follow the formatting rules in the NEWSLETTER STRUCTURE above exactly
-- In the Spotlight: link the tool name to its website using markdown (e.g., [Tool Name](https://tool.com))
-- Format in Markdown
-- End with a brief closing line and sign off with exactly: "-- FYI GTM Team" (use two hyphens)
+{WRITING_FORMATTING}
 
-{image_instructions}{avoid_block}
+{image_instructions}{avoid_block}""")]
 
-Write the newsletter now. Start directly with the first section heading (## One:)."""
+    # Variable suffix: this issue's backlog items and research
+    def build_prompt(notes: str) -> str:
+        return f"""{backlog_section}
 
-    def make_request():
-        return client.messages.create(
-            model=WRITING_MODEL,
-            max_tokens=MAX_WRITING_TOKENS,
-            messages=[{"role": "user", "content": prompt}],
-        )
-
-    response = call_with_retry(make_request)
+RESEARCH NOTES:
+{notes}
 
-    # Extract text - should be clean since no tools were used
-    text_parts = [block.text for block in response.content if hasattr(block, "text")]
+Write the newsletter now. Start directly with the first section heading (## One:)."""
 
-    if not text_parts:
+    # Size the output from the structure and trim the notes to the input budget
+    max_tokens = token_budget.output_budget(structure_section)
+
+    def request_for(notes: str) -> dict:
+        return {
+            "model": WRITING_MODEL,
+            "max_tokens": max_tokens,
+            "system": system,
+            "messages": [{"role": "user", "content": build_prompt(notes)}],
+        }
+
+    prompt = build_prompt(token_budget.fit_notes(client, request_for, research_notes))
+
+    def on_featured_tech(name):
+        print(f"  Spotlight: {name}")
+        duplicate = is_duplicate_tech(name) if is_duplicate_tech else None
+        if duplicate:
+            raise DuplicateSpotlightError(name, duplicate[0])
+
+    def messages_after(generated: str) -> list[dict]:
+        # A continuation sends the text so far as an assistant prefill
+        messages = [{"role": "user", "content": prompt}]
+        if generated:
+            messages.append({"role": "assistant", "content": generated})
+        return messages
+
+    def should_continue(response, rounds: int) -> bool:
+        if response.stop_reason != "max_tokens":
+            return False
+        if rounds > WRITING_MAX_CONTINUATIONS:
+            print(f"  Warning: output still hit max_tokens after {WRITING_MAX_CONTINUATIONS} continuations; the issue may be cut off")
+            telemetry.incr("writing.truncated")
+            return False
+        print(f"  Output hit max_tokens ({max_tokens}), continuing from where it stopped...")
+        telemetry.incr("writing.continued")
+        return True
+
+    def stream_request():
+        # Stream so sections are processed as they arrive and a broken
+        # structure aborts the request early. Each attempt starts fresh.
+        processor = NewsletterStreamProcessor(on_featured_tech=on_featured_tech)
+        generated, responses = "", []
+        while True:
+            with client.messages.stream(
+                model=WRITING_MODEL,
+                max_tokens=max_tokens,
+                system=system,
+                messages=messages_after(generated),
+            ) as stream:
+                for delta in stream.text_stream:
+                    generated += delta
+                    processor.feed(delta)
+                responses.append(stream.get_final_message())
+            if not should_continue(responses[-1], len(responses)):
+                return processor.close(), processor.document, responses
+            generated = generated.rstrip()  # the API rejects a prefill ending in whitespace
+
+    async def hedged_stream(async_client, ready):
+        # Same as stream_request; the hedge race is decided by the first delta
+        processor = NewsletterStreamProcessor(on_featured_tech=on_featured_tech)
+        generated, responses = "", []
+        while True:
+            async with async_client.messages.stream(
+                model=WRITING_MODEL,
+                max_tokens=max_tokens,
+                system=system,
+                messages=messages_after(generated),
+            ) as stream:
+                async for delta in stream.text_stream:
+                    ready()
+                    generated += delta
+                    processor.feed(delta)
+                responses.append(await stream.get_final_message())
+            if not should_continue(responses[-1], len(responses)):
+                return processor.close(), processor.document, responses
+            generated = generated.rstrip()
+
+    def write():
+        if hedging.enabled():
+            return hedging.call("writing", hedged_stream, runner=runner)
+        return call_with_retry(stream_request)
+
+    try:
+        content, parsed, responses = write()
+    except DuplicateSpotlightError as e:
+        # Keep the cached system prefix; the exclusion goes in the user turn
+        print(f"  Aborted: {e}. Retrying with it excluded...")
+        is_duplicate_tech = None
+        prompt = f"""{prompt}
+
+Do NOT feature {e.name} in the Spotlight: it (or {e.match}) was featured in an earlier issue. Pick a different tool."""
+        content, parsed, responses = write()
+    for i, response in enumerate(responses):
+        log_usage("Writing" if i == 0 else "Writing (continued)", response)
+
+    if not content.strip():
         raise ValueError("No text content in response")
 
-    content = "\n".join(text_parts)
-
-    # Clean any preamble before first heading (safety measure)
-    return clean_newsletter_content(content)
+    # Normalize the sign-off from the document parsed while streaming
+    return parsed.to_markdown()
 
 
 def clean_newsletter_content(content: str) -> str:
@@ -432,53 +758,9 @@ def clean_newsletter_content(content: str) -> str:
     1. Remove any preamble before the first section heading
     2. Ensure sign-off is exactly "-- FYI GTM Team"
     """
-    import re
-
-    # Strip preamble: everything before the first ## heading
-    heading_match = re.search(r'^(.*?)(## )', content, re.DOTALL)
-    if heading_match:
-        before = heading_match.group(1).strip()
-        # Only strip if there's actual preamble (not just whitespace)
-        if before and not before.startswith('#'):
-            content = content[heading_match.start(2):]
-
-    content = content.strip()
-
-    # Ensure correct sign-off
-    # Look for common sign-off patterns and replace with correct one
-    signoff_patterns = [
-        r'(--|—)\s*The\s+\w+\s+Team\s*$',
-        r'(--|—)\s*\w+\s+Newsletter\s+Team\s*$',
-        r'(--|—)\s*The\s+GTM\s+Newsletter\s+Team\s*$',
-        r'(--|—)\s*GTM\s+Team\s*$',
-        r'-\s*The\s+\w+\s+Team\s*$',
-        r'-\s*FYI\s+GTM\s+Team\s*$',
-    ]
-
-    correct_signoff = "-- FYI GTM Team"
-
-    for pattern in signoff_patterns:
-        if re.search(pattern, content, re.IGNORECASE):
-            content = re.sub(pattern, correct_signoff, content, flags=re.IGNORECASE)
-            break
-
-    # If no sign-off found, add one
-    if not re.search(r'(--|—)\s*FYI\s+GTM\s+Team\s*$', content, re.IGNORECASE):
-        content = content.rstrip() + "\n\n-- FYI GTM Team"
-
-    return content
+    return document.parse(content).to_markdown()
 
 
 def extract_featured_tech(content: str) -> str | None:
     """Extract the featured tool name from the Spotlight section."""
-    import re
-    # Find the first bold text after the Spotlight heading
-    spotlight = re.search(r'## One.*?\n\*\*(.+?)\*\*', content, re.DOTALL)
-    if spotlight:
-        name = spotlight.group(1)
-        # Strip markdown links: [text](url) → text
-        name = re.sub(r'\[([^\]]+)\]\([^)]+\)', r'\1', name)
-        # Return just the company/product name (before any colon if present)
-        name = name.split(':')[0].strip()
-        return name
-    return None
+    return document.parse(content).featured_tech
@@ -6,23 +6,116 @@ SUPABASE_SERVICE_ROLE_KEY = os.environ.get("SUPABASE_SERVICE_ROLE_KEY")
 
 # Anthropic
 ANTHROPIC_API_KEY = os.environ.get("ANTHROPIC_API_KEY")
+ANTHROPIC_API_BASE = os.environ.get("ANTHROPIC_BASE_URL", "https://api.anthropic.com")
 
 # Kit.com (formerly ConvertKit)
 KIT_API_KEY = os.environ.get("KIT_API_KEY")
+KIT_API_BASE = os.environ.get("KIT_API_BASE", "https://api.kit.com/v4")
+KIT_TIMEOUT_SECONDS = float(os.environ.get("KIT_TIMEOUT_SECONDS", "30"))
+KIT_CONNECT_TIMEOUT_SECONDS = float(os.environ.get("KIT_CONNECT_TIMEOUT_SECONDS", "5"))
+# Pages of newest broadcasts (100 each) searched for one an earlier attempt created
+KIT_SEARCH_PAGES = int(os.environ.get("KIT_SEARCH_PAGES", "1"))
+
+# Render broadcasts as email-safe HTML (inline styles, UTM-tagged links)
+RENDER_EMAIL_SAFE = os.environ.get("RENDER_EMAIL_SAFE", "false").lower() in ("1", "true", "yes")
 
 # Newsletter settings
 WRITING_MODEL = "claude-sonnet-4-20250514"
-MAX_WRITING_TOKENS = 2000
+
+# Writing step token budgets (see token_budget): max_tokens is sized from the
+# number of sections in the structure, between MIN and MAX_WRITING_TOKENS;
+# output cut off at max_tokens is continued up to WRITING_MAX_CONTINUATIONS times
+MIN_WRITING_TOKENS = 1200
+MAX_WRITING_TOKENS = 4096
+WRITING_BASE_TOKENS = 300
+WRITING_TOKENS_PER_SECTION = int(os.environ.get("WRITING_TOKENS_PER_SECTION", "450"))
+WRITING_MAX_CONTINUATIONS = int(os.environ.get("WRITING_MAX_CONTINUATIONS", "2"))
+WRITING_INPUT_BUDGET = int(os.environ.get("WRITING_INPUT_BUDGET", "12000"))  # prompt tokens
+
+# Topic generation: with more than one candidate, that many topics are requested
+# at once, scored locally, and the rest cancelled once one scores good-enough
+TOPIC_CANDIDATES = int(os.environ.get("TOPIC_CANDIDATES", "1"))
+TOPIC_GOOD_ENOUGH_SCORE = float(os.environ.get("TOPIC_GOOD_ENOUGH_SCORE", "0.8"))
+TOPIC_MIN_SCORE = float(os.environ.get("TOPIC_MIN_SCORE", "0.5"))
+
+# Hedged Anthropic requests: a slow topic/research/writing call gets a duplicate
+# once it passes HEDGE_PERCENTILE of recent latencies; hedges are capped at
+# HEDGE_BUDGET_RATIO of recent calls. Both are saved in Supabase (hedge_stats)
+# or, with HEDGE_STATS_BACKEND=local, in the HEDGE_STATS_PATH file
+HEDGE_ENABLED = os.environ.get("HEDGE_ENABLED", "false").lower() in ("1", "true", "yes")
+HEDGE_PERCENTILE = float(os.environ.get("HEDGE_PERCENTILE", "95"))
+HEDGE_MIN_SAMPLES = int(os.environ.get("HEDGE_MIN_SAMPLES", "10"))
+HEDGE_BUDGET_RATIO = float(os.environ.get("HEDGE_BUDGET_RATIO", "0.1"))
+HEDGE_STATS_BACKEND = os.environ.get("HEDGE_STATS_BACKEND", "supabase")
+HEDGE_STATS_PATH = os.environ.get("HEDGE_STATS_PATH", ".cache/latency.json")
+
+# Batch mode (one issue per newsletter_config row, generated concurrently)
+BATCH_CONCURRENCY = int(os.environ.get("BATCH_CONCURRENCY", "4"))
+
+# Storage backend: "supabase", or "sqlite" (embedded database at SQLITE_PATH,
+# for offline development, tests and benchmarks). With STORAGE_WRITE_BEHIND,
+# stage status, checkpoint and metrics updates are written on a background
+# thread, coalesced over WRITE_BEHIND_INTERVAL_SECONDS (see storage)
+STORAGE_BACKEND = os.environ.get("STORAGE_BACKEND", "supabase")
+SQLITE_PATH = os.environ.get("SQLITE_PATH", ".cache/newsletter.db")
+STORAGE_WRITE_BEHIND = os.environ.get("STORAGE_WRITE_BEHIND", "false").lower() in ("1", "true", "yes")
+WRITE_BEHIND_INTERVAL_SECONDS = float(os.environ.get("WRITE_BEHIND_INTERVAL_SECONDS", "0.5"))
+
+# Worker mode (python -m newsletter.worker): queued runs claimed from
+# newsletter_runs, polled every WORKER_POLL_SECONDS (backing off to
+# WORKER_MAX_POLL_SECONDS when idle); a run whose heartbeat is older than
+# WORKER_STALE_SECONDS is reclaimed by another worker
+WORKER_CONCURRENCY = int(os.environ.get("WORKER_CONCURRENCY", "2"))
+WORKER_POLL_SECONDS = float(os.environ.get("WORKER_POLL_SECONDS", "2"))
+WORKER_MAX_POLL_SECONDS = float(os.environ.get("WORKER_MAX_POLL_SECONDS", "10"))
+WORKER_HEARTBEAT_SECONDS = float(os.environ.get("WORKER_HEARTBEAT_SECONDS", "15"))
+WORKER_STALE_SECONDS = int(os.environ.get("WORKER_STALE_SECONDS", "120"))
+WORKER_MAX_ATTEMPTS = int(os.environ.get("WORKER_MAX_ATTEMPTS", "3"))
+WORKER_SHUTDOWN_GRACE_SECONDS = float(os.environ.get("WORKER_SHUTDOWN_GRACE_SECONDS", "60"))
+
+# How long a run holds its claimed backlog items before they return to the pool
+BACKLOG_LEASE_MINUTES = int(os.environ.get("BACKLOG_LEASE_MINUTES", "60"))
+
+# Research as parallel sub-queries (tool, statistics, news) merged into one set
+# of notes; false sends the single combined research request
+RESEARCH_FANOUT = os.environ.get("RESEARCH_FANOUT", "true").lower() in ("1", "true", "yes")
+
+# Research notes cache: "supabase", "local" or "none"
+RESEARCH_CACHE_BACKEND = os.environ.get("RESEARCH_CACHE_BACKEND", "supabase")
+RESEARCH_CACHE_TTL_HOURS = float(os.environ.get("RESEARCH_CACHE_TTL_HOURS", "24"))
+RESEARCH_CACHE_DIR = os.environ.get("RESEARCH_CACHE_DIR", ".cache/research")
+
+# Near-duplicate index over all past topics and featured tools
+SIMILARITY_INDEX_ENABLED = os.environ.get("SIMILARITY_INDEX_ENABLED", "true").lower() in ("1", "true", "yes")
+SIMILARITY_INDEX_PATH = os.environ.get("SIMILARITY_INDEX_PATH", ".cache/similarity.json")
+SIMILARITY_TOPIC_THRESHOLD = float(os.environ.get("SIMILARITY_TOPIC_THRESHOLD", "0.4"))
+SIMILARITY_TECH_THRESHOLD = float(os.environ.get("SIMILARITY_TECH_THRESHOLD", "0.5"))
+
+# Archive exports (python -m newsletter.archive): one directory per export
+# under ARCHIVE_DIR, read ARCHIVE_PAGE_SIZE rows at a time
+ARCHIVE_DIR = os.environ.get("ARCHIVE_DIR", "archive")
+ARCHIVE_PAGE_SIZE = int(os.environ.get("ARCHIVE_PAGE_SIZE", "100"))
+# --incremental re-exports rows stamped this long before the watermark
+ARCHIVE_WATERMARK_GRACE_SECONDS = int(os.environ.get("ARCHIVE_WATERMARK_GRACE_SECONDS", "3600"))
+
+# Structured JSON telemetry log: "" (off), "-" (stderr) or a file path to append to
+TELEMETRY_JSON_LOG = os.environ.get("TELEMETRY_JSON_LOG", "")
+
+# Per-request timeout for --preflight checks
+PREFLIGHT_TIMEOUT_SECONDS = float(os.environ.get("PREFLIGHT_TIMEOUT_SECONDS", "5"))
 
 
 def validate_config():
     """Ensure all required environment variables are set."""
     required = [
-        ("SUPABASE_URL", SUPABASE_URL),
-        ("SUPABASE_SERVICE_ROLE_KEY", SUPABASE_SERVICE_ROLE_KEY),
         ("ANTHROPIC_API_KEY", ANTHROPIC_API_KEY),
         ("KIT_API_KEY", KIT_API_KEY),
     ]
+    if STORAGE_BACKEND == "supabase":
+        required[:0] = [
+            ("SUPABASE_URL", SUPABASE_URL),
+            ("SUPABASE_SERVICE_ROLE_KEY", SUPABASE_SERVICE_ROLE_KEY),
+        ]
     missing = [name for name, value in required if not value]
     if missing:
         raise ValueError(f"Missing required environment variables: {', '.join(missing)}")
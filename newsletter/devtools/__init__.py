@@ -0,0 +1 @@
+"""Local development helpers: stub services for exercising the pipeline offline."""
@@ -0,0 +1,108 @@
+"""
+Record and replay HTTP traffic for the Anthropic, Supabase and Kit clients.
+
+A Cassette sits in the SDKs' httpx transport. In record mode it forwards
+each request to a real transport and stores the response. In replay mode
+it answers from the stored interactions without touching the network.
+Interactions are matched by service, method and URL. Repeated requests
+replay in recorded order.
+
+    cassette = Cassette("cassettes/weekly.json", mode="record")
+    ... run the pipeline with harness.offline(cassette=cassette) ...
+    cassette.save()
+
+Only response headers that affect client behaviour are stored, and request
+headers are never stored, so API keys do not end up in cassette files.
+"""
+
+import json
+import os
+import threading
+from collections import defaultdict
+
+KEPT_RESPONSE_HEADERS = {
+    "content-type", "content-range", "retry-after", "retry-after-ms",
+    "request-id", "x-request-id",
+}
+
+
+class CassetteMiss(LookupError):
+    """Raised in replay mode when no recorded interaction matches a request."""
+
+
+class Cassette:
+    def __init__(self, path: str, mode: str = "replay"):
+        if mode not in ("record", "replay"):
+            raise ValueError("mode must be 'record' or 'replay'")
+        self.path = path
+        self.mode = mode
+        self.interactions: list[dict] = []
+        self._lock = threading.Lock()
+        self._queues = None
+        if mode == "replay":
+            with open(path, encoding="utf-8") as f:
+                self.interactions = json.load(f)["interactions"]
+            self._queues = defaultdict(list)
+            for interaction in self.interactions:
+                self._queues[self._key(interaction)].append(interaction)
+
+    @staticmethod
+    def _key(interaction: dict) -> tuple:
+        return interaction["service"], interaction["method"], interaction["url"]
+
+    @staticmethod
+    def _url(request) -> str:
+        query = request.url.query.decode()
+        return request.url.path + (f"?{query}" if query else "")
+
+    def handler(self, service: str, inner=None):
+        """
+        A fakes.transport() handler for one service. Record mode needs the
+        real transport to forward to (e.g. httpx.HTTPTransport()).
+        """
+        if self.mode == "record" and inner is None:
+            raise ValueError("record mode needs a real transport to forward to")
+
+        def handle(httpx, request):
+            url = self._url(request)
+            if self.mode == "replay":
+                key = (service, request.method, url)
+                with self._lock:
+                    queue = self._queues.get(key)
+                    if not queue:
+                        raise CassetteMiss(f"No recorded {service} response for {request.method} {url}")
+                    interaction = queue.pop(0) if len(queue) > 1 else queue[0]
+                return httpx.Response(
+                    interaction["status"],
+                    headers=interaction["headers"],
+                    content=interaction["body"].encode("utf-8"),
+                )
+
+            response = inner.handle_request(request)
+            content = response.read()
+            interaction = {
+                "service": service,
+                "method": request.method,
+                "url": url,
+                "request_body": request.content.decode("utf-8", "replace"),
+                "status": response.status_code,
+                "headers": {k: v for k, v in response.headers.items() if k.lower() in KEPT_RESPONSE_HEADERS},
+                "body": content.decode("utf-8", "replace"),
+            }
+            with self._lock:
+                self.interactions.append(interaction)
+            return httpx.Response(response.status_code, headers=interaction["headers"], content=content)
+
+        return handle
+
+    def save(self):
+        """Write recorded interactions (record mode only)."""
+        if self.mode != "record":
+            return
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with self._lock:
+            data = {"interactions": list(self.interactions)}
+        with open(self.path, "w", encoding="utf-8") as f:
+            json.dump(data, f, indent=1)
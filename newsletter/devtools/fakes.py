@@ -0,0 +1,390 @@
+"""
+In-process stand-ins for Supabase (PostgREST), Anthropic and Kit.
+
+Each fake is a request handler plugged into the real SDK clients through an
+httpx MockTransport, so the pipeline runs its normal code paths (query
+building, retries, streaming) with no network:
+
+- FakeSupabase: in-memory tables with the PostgREST filters this repo uses.
+  RPCs answer "function not found", which exercises the Python fallbacks.
+- FakeAnthropic: canned topic JSON, research notes, and a streamed
+  newsletter for the writing step.
+- KitStub (kit_stub.py): the broadcasts API.
+
+transport() and async_transport() wrap any handler with optional latency injection.
+"""
+
+import asyncio
+import itertools
+import json
+import random
+import re
+import threading
+import time
+import uuid
+from datetime import datetime, timezone
+from urllib.parse import parse_qsl, unquote
+
+from .kit_stub import KitStub
+
+
+def _now() -> str:
+    return datetime.now(timezone.utc).isoformat()
+
+
+class Latency:
+    """Injected delay per request: base seconds plus uniform jitter (a fraction of base)."""
+
+    def __init__(self, seconds: float = 0.0, jitter: float = 0.0, seed: int = None):
+        self.seconds = seconds
+        self.jitter = jitter
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def sample(self) -> float:
+        if self.seconds <= 0:
+            return 0.0
+        with self._lock:
+            spread = self._rng.uniform(-self.jitter, self.jitter)
+        return max(0.0, self.seconds * (1 + spread))
+
+    def wait(self):
+        delay = self.sample()
+        if delay:
+            time.sleep(delay)
+
+
+def transport(httpx_module, handler, latency: Latency = None):
+    """
+    A MockTransport for httpx_module (httpx or httpx2, which the Anthropic SDK
+    uses) that sleeps for the injected latency, then calls handler(request).
+    """
+    def handle(request):
+        if latency:
+            latency.wait()
+        return handler(httpx_module, request)
+    return httpx_module.MockTransport(handle)
+
+
+def async_transport(httpx_module, handler, latency: Latency = None):
+    """transport() for async clients: the latency is awaited, so concurrent requests overlap."""
+    async def handle(request):
+        if latency:
+            delay = latency.sample()
+            if delay:
+                await asyncio.sleep(delay)
+        return handler(httpx_module, request)
+    return httpx_module.MockTransport(handle)
+
+
+# --- Supabase -----------------------------------------------------------------
+
+def _coerce(value: str):
+    if value == "null":
+        return None
+    if value in ("true", "false"):
+        return value == "true"
+    return value
+
+
+def _compare_key(value):
+    """Order mixed row values: numbers numerically, everything else as strings."""
+    if isinstance(value, bool):
+        return (0, int(value))
+    if isinstance(value, (int, float)):
+        return (0, value)
+    return (1, str(value))
+
+
+def _matches(row: dict, column: str, expression: str) -> bool:
+    negate = expression.startswith("not.")
+    if negate:
+        expression = expression[4:]
+    op, _, raw = expression.partition(".")
+    value = row.get(column)
+    if op == "is":
+        result = value is _coerce(raw)
+    elif op == "in":
+        options = [v.strip().strip('"') for v in raw.strip("()").split(",") if v.strip()]
+        result = str(value) in options
+    elif op in ("eq", "neq"):
+        expected = _coerce(raw)
+        equal = value == expected if isinstance(expected, bool) or expected is None else str(value) == raw
+        result = equal if op == "eq" else not equal
+    elif op in ("gt", "gte", "lt", "lte"):
+        if value is None:
+            result = False
+        else:
+            try:
+                left, right = float(value), float(raw)
+            except (TypeError, ValueError):
+                left, right = str(value), raw
+            result = {
+                "gt": left > right, "gte": left >= right,
+                "lt": left < right, "lte": left <= right,
+            }[op]
+    elif op in ("like", "ilike"):
+        pattern = "^" + re.escape(raw).replace(r"\*", ".*").replace("%", ".*") + "$"
+        flags = re.IGNORECASE if op == "ilike" else 0
+        result = value is not None and re.match(pattern, str(value), flags) is not None
+    else:
+        raise ValueError(f"FakeSupabase does not support operator {op!r}")
+    return not result if negate else result
+
+
+class FakeSupabase:
+    """In-memory PostgREST: select/insert/update/upsert/delete with filters, order, limit, count."""
+
+    RESERVED = {"select", "order", "limit", "offset", "on_conflict", "columns"}
+
+    def __init__(self, tables: dict[str, list[dict]] = None):
+        self.tables: dict[str, list[dict]] = {name: [dict(r) for r in rows] for name, rows in (tables or {}).items()}
+        self.lock = threading.Lock()
+        self.requests: list[tuple[str, str]] = []
+
+    def __call__(self, httpx, request):
+        path = request.url.path
+        with self.lock:
+            self.requests.append((request.method, path))
+        if "/rpc/" in path:
+            name = path.rsplit("/", 1)[-1]
+            return httpx.Response(404, json={
+                "code": "PGRST202",
+                "message": f"Could not find the function public.{name} in the schema cache",
+                "details": None,
+                "hint": None,
+            })
+
+        table = unquote(path.rsplit("/", 1)[-1])
+        params = parse_qsl(request.url.query.decode())
+        prefer = request.headers.get("prefer", "")
+        body = json.loads(request.content) if request.content else None
+
+        with self.lock:
+            rows = self.tables.setdefault(table, [])
+            if request.method == "GET":
+                result = self._select(rows, params)
+            elif request.method == "POST":
+                records = body if isinstance(body, list) else [body]
+                if "resolution=merge-duplicates" in prefer:
+                    result = self._upsert(rows, records, dict(params).get("on_conflict"))
+                else:
+                    result = [self._insert(rows, r) for r in records]
+            elif request.method == "PATCH":
+                result = [row for row in rows if self._filtered(row, params)]
+                for row in result:
+                    row.update(body or {})
+            elif request.method == "DELETE":
+                result = [row for row in rows if self._filtered(row, params)]
+                deleted = {id(row) for row in result}
+                rows[:] = [row for row in rows if id(row) not in deleted]
+            else:
+                return httpx.Response(405, json={"message": "Method not allowed"})
+            total = len(result)
+            if request.method == "GET":
+                result = self._page(result, params)
+            result = [self._project(row, params) for row in result]
+
+        headers = {}
+        if "count=exact" in prefer:
+            headers["content-range"] = f"0-{max(len(result) - 1, 0)}/{total}" if result else f"*/{total}"
+        return httpx.Response(200, json=result, headers=headers)
+
+    def _filtered(self, row: dict, params) -> bool:
+        return all(_matches(row, col, expr) for col, expr in params if col not in self.RESERVED)
+
+    def _select(self, rows, params) -> list[dict]:
+        result = [row for row in rows if self._filtered(row, params)]
+        order = dict(params).get("order")
+        if order:
+            for term in reversed(order.split(",")):
+                column, *mods = term.split(".")
+                present = [r for r in result if r.get(column) is not None]
+                missing = [r for r in result if r.get(column) is None]
+                present.sort(key=lambda r: _compare_key(r[column]), reverse="desc" in mods)
+                result = present + missing if "nullsfirst" not in mods else missing + present
+        return result
+
+    @staticmethod
+    def _page(rows, params) -> list[dict]:
+        params = dict(params)
+        offset = int(params.get("offset", 0))
+        limit = params.get("limit")
+        return rows[offset:offset + int(limit)] if limit is not None else rows[offset:]
+
+    @staticmethod
+    def _project(row: dict, params) -> dict:
+        select = dict(params).get("select", "*")
+        if select == "*" or "*" in select:
+            return dict(row)
+        columns = [c.strip() for c in select.split(",")]
+        return {c: row.get(c) for c in columns}
+
+    @staticmethod
+    def _insert(rows, record: dict) -> dict:
+        row = {"id": str(uuid.uuid4()), "created_at": _now(), **record}
+        rows.append(row)
+        return row
+
+    def _upsert(self, rows, records, on_conflict: str = None) -> list[dict]:
+        key = on_conflict or ("key" if records and "key" in records[0] else "id")
+        result = []
+        for record in records:
+            existing = next((r for r in rows if key in record and r.get(key) == record[key]), None)
+            if existing:
+                existing.update(record)
+                result.append(existing)
+            else:
+                result.append(self._insert(rows, record))
+        return result
+
+
+def seed_tables(newsletters: int = 1, topics: int = 50, tech: int = 50, tips: int = 100) -> dict[str, list[dict]]:
+    """Backlog and config rows for a fake Supabase: enough for many runs."""
+    def row(**fields):
+        return {"id": str(uuid.uuid4()), "created_at": _now(), **fields}
+
+    return {
+        "newsletter_config": [
+            row(name=f"Newsletter {n + 1}", description="A weekly newsletter for GTM teams.",
+                audience="Sales leaders", starting_issue=1)
+            for n in range(newsletters)
+        ],
+        "newsletter_topics": [
+            row(topic=f"Backlog topic {n}", description="Seeded topic", priority=0, active=True, used_at=None)
+            for n in range(topics)
+        ],
+        "tech_backlog": [row(name=f"Tool {n}", used_at=None) for n in range(tech)],
+        "tips_backlog": [row(tip=f"Seeded tip {n}", used_at=None) for n in range(tips)],
+        "newsletter_runs": [],
+        "research_cache": [],
+    }
+
+
+# --- Anthropic ----------------------------------------------------------------
+
+NEWSLETTER_TEXT = """## One: Sales Tech Spotlight
+
+**[{tool}](https://example.com/{slug}): Deal Desk**
+
+**The problem** - Approvals for non-standard deals stall late-stage pipeline.
+
+**What it is** - A deal desk workflow inside the CRM.
+
+**Key capabilities**
+- Approval routing by discount and term
+- Slack approvals with an audit trail
+- Margin guardrails before quoting
+
+**Why now** - Sales cycles keep stretching.
+
+**Best for** - Mid-market teams.
+
+## Two: Tips to Try This Week
+
+1. **Run a "why now" check** - Ask what changes if the buyer waits a quarter.
+2. **Send the mutual action plan early** - Buyers who edit it close more often.
+
+## Three: Takeaways
+
+1. Weekly pipeline reviews improve forecast accuracy.
+2. Multi-threaded deals close at twice the rate.
+3. Guardrails cut discounting by a third.
+
+That's it for this week.
+
+-- FYI GTM Team"""
+
+
+def _sse(events) -> bytes:
+    return "".join(f"event: {name}\ndata: {json.dumps(data)}\n\n" for name, data in events).encode("utf-8")
+
+
+class FakeAnthropic:
+    """Messages API stand-in: topic JSON, research notes, or a streamed newsletter."""
+
+    def __init__(self, chunk_size: int = 40):
+        self.chunk_size = chunk_size
+        self.requests: list[dict] = []
+        self._counter = itertools.count(1)
+        self._lock = threading.Lock()
+
+    def _message(self, model: str, text: str, usage: dict) -> dict:
+        return {
+            "id": f"msg_fake_{next(self._counter)}",
+            "type": "message",
+            "role": "assistant",
+            "model": model,
+            "content": [{"type": "text", "text": text}],
+            "stop_reason": "end_turn",
+            "stop_sequence": None,
+            "usage": usage,
+        }
+
+    def __call__(self, httpx, request):
+        body = json.loads(request.content)
+        with self._lock:
+            self.requests.append(body)
+            n = next(self._counter)
+        prompt = json.dumps(body.get("messages", []))
+        if request.url.path.endswith("/count_tokens"):
+            return httpx.Response(200, json={"input_tokens": (len(prompt) + len(json.dumps(body.get("system")))) // 4})
+        usage = {
+            "input_tokens": len(prompt) // 4,
+            "output_tokens": 0,
+            "cache_read_input_tokens": 0,
+            "cache_creation_input_tokens": 0,
+        }
+
+        if body.get("stream"):
+            text = NEWSLETTER_TEXT.format(tool=f"Fake Tool {n}", slug=f"tool-{n}")
+            # An assistant prefill continues the same issue; output stops at max_tokens (4 chars each)
+            messages = body.get("messages", [])
+            prefill = messages[-1]["content"] if messages and messages[-1]["role"] == "assistant" else ""
+            if prefill:
+                tool = re.search(r"Fake Tool (\d+)", prefill)
+                number = tool.group(1) if tool else n
+                text = NEWSLETTER_TEXT.format(tool=f"Fake Tool {number}", slug=f"tool-{number}")[len(prefill):]
+            stop_reason = "end_turn"
+            if len(text) > body.get("max_tokens", 4096) * 4:
+                text, stop_reason = text[:body["max_tokens"] * 4], "max_tokens"
+            usage["output_tokens"] = len(text) // 4
+            message = self._message(body["model"], "", {**usage, "output_tokens": 1})
+            message["content"] = []
+            events = [
+                ("message_start", {"type": "message_start", "message": message}),
+                ("content_block_start", {"type": "content_block_start", "index": 0,
+                                         "content_block": {"type": "text", "text": ""}}),
+            ]
+            for i in range(0, len(text), self.chunk_size):
+                events.append(("content_block_delta", {"type": "content_block_delta", "index": 0,
+                                                       "delta": {"type": "text_delta", "text": text[i:i + self.chunk_size]}}))
+            events += [
+                ("content_block_stop", {"type": "content_block_stop", "index": 0}),
+                ("message_delta", {"type": "message_delta",
+                                   "delta": {"stop_reason": stop_reason, "stop_sequence": None},
+                                   "usage": {"output_tokens": usage["output_tokens"]}}),
+                ("message_stop", {"type": "message_stop"}),
+            ]
+            return httpx.Response(200, headers={"content-type": "text/event-stream"}, content=_sse(events))
+
+        if "Respond with ONLY a JSON object" in prompt:
+            text = json.dumps({"topic": f"Generated Topic {n}", "description": "A synthetic topic."})
+        else:
+            text = f"RESEARCH NOTES {n}\n- Fake Tool {n} launched a deal desk product.\n- Stat: 42% of deals slip."
+        if body.get("tools"):
+            usage["server_tool_use"] = {"web_search_requests": 1}
+        usage["output_tokens"] = len(text) // 4
+        return httpx.Response(200, json=self._message(body["model"], text, usage))
+
+
+def kit_handler(stub: KitStub):
+    """Adapt a KitStub to the transport() handler signature."""
+    def handle(httpx, request):
+        status, body, headers = stub.handle(
+            request.method, request.url.path, request.url.query.decode(), request.headers, request.content,
+        )
+        if body is None:
+            return httpx.Response(status, headers=headers)
+        return httpx.Response(status, json=body, headers=headers)
+    return handle
@@ -0,0 +1,163 @@
+"""
+Run the real pipeline against fakes or a cassette instead of live services.
+
+    with offline() as services:           # in-memory Supabase, Anthropic and Kit
+        main.run([])
+    with offline(cassette=Cassette("weekly.json")):   # replay a recording
+        main.run([])
+    with recording(Cassette("weekly.json", mode="record")):  # live, recorded
+        main.run([])
+
+The context managers swap the client factories (db.get_client,
+claude.get_client, claude.get_async_client and the shared Kit client) for SDK clients whose httpx
+transport is a fake, a cassette or a recorder. Everything above the
+transport runs unchanged.
+"""
+
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from unittest import mock
+
+import anthropic
+import anthropic._base_client
+import httpx
+from supabase import create_client, ClientOptions
+
+from .. import config
+from .. import supabase_client as db
+from .. import claude_client as claude
+from .. import kit_client as kit
+from . import fakes
+from .cassette import Cassette
+from .kit_stub import KitStub
+
+OFFLINE_SUPABASE_URL = "http://supabase.local"
+OFFLINE_KIT_BASE = "http://kit.local/v4"
+OFFLINE_KEY = "offline-" + "0" * 32
+
+# The HTTP library the installed Anthropic SDK is built on: httpx2 in newer
+# releases, httpx before that. Its clients only accept that library's transports.
+anthropic_httpx = getattr(anthropic._base_client, "httpx2", None) or anthropic._base_client.httpx
+
+
+@dataclass
+class Services:
+    """The fakes behind an offline() block, for inspection after a run."""
+    supabase: fakes.FakeSupabase | None = None
+    anthropic: fakes.FakeAnthropic | None = None
+    kit: KitStub | None = None
+    latency: dict = field(default_factory=dict)
+
+
+def _patch_clients(supabase_url, supabase_key, supabase_transport, anthropic_key, anthropic_transport,
+                   kit_key, kit_base, kit_transport, anthropic_async_transport=None):
+    def supabase_client():
+        return create_client(
+            supabase_url, supabase_key,
+            options=ClientOptions(httpx_client=httpx.Client(transport=supabase_transport)),
+        )
+
+    def anthropic_client():
+        return anthropic.Anthropic(
+            api_key=anthropic_key, max_retries=0,
+            http_client=anthropic_httpx.Client(transport=anthropic_transport),
+        )
+
+    def anthropic_async_client():
+        return anthropic.AsyncAnthropic(
+            api_key=anthropic_key, max_retries=0,
+            http_client=anthropic_httpx.AsyncClient(transport=anthropic_async_transport),
+        )
+
+    kit_client = kit.KitClient(api_key=kit_key, base_url=kit_base, transport=kit_transport)
+    return [
+        mock.patch.object(db, "get_client", supabase_client),
+        mock.patch.object(claude, "get_client", anthropic_client),
+        mock.patch.object(claude, "get_async_client", anthropic_async_client),
+        mock.patch.object(kit, "_default_client", kit_client),
+    ]
+
+
+@contextmanager
+def _applied(patches):
+    for patch in patches:
+        patch.start()
+    try:
+        yield
+    finally:
+        for patch in reversed(patches):
+            patch.stop()
+
+
+@contextmanager
+def offline(
+    cassette: Cassette = None,
+    latency: dict = None,
+    jitter: float = 0.0,
+    newsletters: int = 1,
+    backlog: int = 50,
+    research_cache: str = "none",
+):
+    """
+    Route all three services to in-process fakes (or replay `cassette`).
+    latency maps "supabase" / "anthropic" / "kit" to seconds added per request.
+    Yields a Services with the fakes.
+    """
+    latency = latency or {}
+    services = Services(latency=latency)
+    if cassette is not None:
+        handlers = {name: cassette.handler(name) for name in ("supabase", "anthropic", "kit")}
+    else:
+        services.supabase = fakes.FakeSupabase(fakes.seed_tables(
+            newsletters=newsletters, topics=backlog, tech=backlog, tips=backlog * 2,
+        ))
+        services.anthropic = fakes.FakeAnthropic()
+        services.kit = KitStub(api_key=OFFLINE_KEY)
+        handlers = {
+            "supabase": services.supabase,
+            "anthropic": services.anthropic,
+            "kit": fakes.kit_handler(services.kit),
+        }
+
+    def wire(module, name, make=fakes.transport):
+        return make(module, handlers[name], fakes.Latency(latency.get(name, 0.0), jitter))
+
+    patches = _patch_clients(
+        OFFLINE_SUPABASE_URL, OFFLINE_KEY, wire(httpx, "supabase"),
+        OFFLINE_KEY, wire(anthropic_httpx, "anthropic"),
+        OFFLINE_KEY, OFFLINE_KIT_BASE, wire(httpx, "kit"),
+        wire(anthropic_httpx, "anthropic", fakes.async_transport),
+    )
+    patches += [
+        mock.patch.object(config, "SUPABASE_URL", OFFLINE_SUPABASE_URL),
+        mock.patch.object(config, "SUPABASE_SERVICE_ROLE_KEY", OFFLINE_KEY),
+        mock.patch.object(config, "ANTHROPIC_API_KEY", OFFLINE_KEY),
+        mock.patch.object(config, "KIT_API_KEY", OFFLINE_KEY),
+        mock.patch.object(config, "RESEARCH_CACHE_BACKEND", research_cache),
+        mock.patch.object(config, "SIMILARITY_INDEX_ENABLED", False),
+    ]
+    with _applied(patches):
+        yield services
+
+
+@contextmanager
+def recording(cassette: Cassette):
+    """Run against the live services configured in the environment, recording every response."""
+    if cassette.mode != "record":
+        raise ValueError("recording() needs a cassette in record mode")
+    anthropic_handler = cassette.handler("anthropic", anthropic_httpx.HTTPTransport())
+    patches = _patch_clients(
+        config.SUPABASE_URL, config.SUPABASE_SERVICE_ROLE_KEY,
+        fakes.transport(httpx, cassette.handler("supabase", httpx.HTTPTransport())),
+        config.ANTHROPIC_API_KEY,
+        fakes.transport(anthropic_httpx, anthropic_handler),
+        config.KIT_API_KEY, config.KIT_API_BASE,
+        fakes.transport(httpx, cassette.handler("kit", httpx.HTTPTransport())),
+        # Concurrent async requests are recorded one at a time through the sync transport
+        fakes.async_transport(anthropic_httpx, anthropic_handler),
+    )
+    try:
+        with _applied(patches):
+            yield cassette
+    finally:
+        cassette.save()
@@ -0,0 +1,225 @@
+"""
+In-memory stand-in for the Kit v4 broadcasts API.
+
+Serves create/get/list/update/delete (and GET /account, for preflight) over
+HTTP/1.1 keep-alive and can inject failures, so KitClient's pooling and
+retry behaviour can be exercised without touching the real account:
+
+    python -m newsletter.devtools.kit_stub --port 8765
+    KIT_API_BASE=http://127.0.0.1:8765/v4 KIT_API_KEY=stub python -m newsletter.main
+
+KitStub alone (no HTTP server) backs the in-process fakes in fakes.py.
+
+From Python:
+
+    with KitStubServer() as stub:
+        stub.fail_next(429, times=2, retry_after=1)
+        stub.fail_next(504, applied=True)   # created, but the client sees a 504
+        KitClient(api_key="stub", base_url=stub.base_url).create_broadcast({...})
+"""
+
+import argparse
+import itertools
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+
+API_PREFIX = "/v4"
+
+
+class KitStub:
+    """In-memory Kit broadcasts API. handle() serves one request; see KitStubServer for HTTP."""
+
+    def __init__(self, api_key: str = "stub"):
+        self.api_key = api_key
+        self.lock = threading.Lock()
+        self.broadcasts: dict[str, dict] = {}
+        self.requests: list[tuple[str, str]] = []
+        self._faults: list[tuple[int, float | None, bool]] = []
+        self._ids = itertools.count(1)
+
+    def fail_next(self, status: int = 503, times: int = 1, retry_after: float = None, applied: bool = False):
+        """
+        Answer the next `times` requests with `status` (and Retry-After if given).
+        With applied, each request is carried out before the error is returned,
+        like a gateway timeout after the API already did the work.
+        """
+        with self.lock:
+            self._faults.extend([(status, retry_after, applied)] * times)
+
+    def take_fault(self):
+        with self.lock:
+            return self._faults.pop(0) if self._faults else None
+
+    def create(self, payload: dict) -> dict:
+        with self.lock:
+            broadcast_id = str(next(self._ids))
+            broadcast = {"id": int(broadcast_id), **payload}
+            self.broadcasts[broadcast_id] = broadcast
+            return dict(broadcast)
+
+    def page(self, per_page: int, after: str = None) -> dict:
+        with self.lock:
+            # Newest first, as Kit lists them
+            ids = sorted(self.broadcasts, key=int, reverse=True)
+            if after:
+                ids = [i for i in ids if int(i) < int(after)]
+            chunk = ids[:per_page]
+            broadcasts = [dict(self.broadcasts[i]) for i in chunk]
+        return {
+            "broadcasts": broadcasts,
+            "pagination": {
+                "has_next_page": len(ids) > per_page,
+                "end_cursor": chunk[-1] if chunk else None,
+                "per_page": per_page,
+            },
+        }
+
+    def handle(self, method: str, path: str, query: str, headers, body: bytes) -> tuple[int, dict | None, dict]:
+        """Serve one request. Returns (status, JSON body or None, extra headers)."""
+        with self.lock:
+            self.requests.append((method, path))
+
+        if headers.get("X-Kit-Api-Key") != self.api_key:
+            return 401, {"errors": ["The access token is invalid"]}, {}
+
+        fault = self.take_fault()
+        if fault:
+            status, retry_after, applied = fault
+            if applied:
+                self.serve(method, path, query, body)
+            extra = {"Retry-After": str(retry_after)} if retry_after is not None else {}
+            return status, {"errors": [f"Injected {status}"]}, extra
+        return self.serve(method, path, query, body)
+
+    def serve(self, method: str, path: str, query: str, body: bytes) -> tuple[int, dict | None, dict]:
+        """Carry out an authenticated request (no fault injection)."""
+        parts = path[len(API_PREFIX):].strip("/").split("/") if path.startswith(API_PREFIX) else []
+        if parts == ["account"] and method == "GET":
+            return 200, {"account": {"id": 1, "name": "Kit Stub", "plan_type": "creator"}}, {}
+        if not parts or parts[0] != "broadcasts" or len(parts) > 2:
+            return 404, {"errors": ["Not Found"]}, {}
+
+        try:
+            payload = json.loads(body) if body else {}
+        except ValueError:
+            return 400, {"errors": ["Invalid JSON"]}, {}
+
+        if len(parts) == 1:
+            if method == "POST":
+                return 201, {"broadcast": self.create(payload)}, {}
+            if method == "GET":
+                params = parse_qs(query)
+                per_page = int(params.get("per_page", ["50"])[0])
+                after = params.get("after", [None])[0]
+                return 200, self.page(per_page, after), {}
+            return 405, {"errors": ["Method Not Allowed"]}, {}
+
+        broadcast_id = parts[1]
+        with self.lock:
+            broadcast = self.broadcasts.get(broadcast_id)
+            if broadcast is None:
+                return 404, {"errors": ["Not Found"]}, {}
+            if method == "GET":
+                return 200, {"broadcast": dict(broadcast)}, {}
+            if method == "PUT":
+                broadcast.update(payload)
+                return 200, {"broadcast": dict(broadcast)}, {}
+            if method == "DELETE":
+                del self.broadcasts[broadcast_id]
+                return 204, None, {}
+        return 405, {"errors": ["Method Not Allowed"]}, {}
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep connections open between requests
+
+    def log_message(self, format, *args):
+        if self.server.stub.verbose:
+            super().log_message(format, *args)
+
+    def do_GET(self):
+        self._dispatch("GET")
+
+    def do_POST(self):
+        self._dispatch("POST")
+
+    def do_PUT(self):
+        self._dispatch("PUT")
+
+    def do_DELETE(self):
+        self._dispatch("DELETE")
+
+    def _dispatch(self, method: str):
+        stub = self.server.stub
+        with stub.lock:
+            stub.connections.add(self.client_address)
+        length = int(self.headers.get("Content-Length") or 0)
+        raw = self.rfile.read(length) if length else b""
+        url = urlparse(self.path)
+        status, body, headers = stub.handle(method, url.path, url.query, self.headers, raw)
+
+        data = b"" if body is None else json.dumps(body).encode("utf-8")
+        self.send_response(status)
+        for name, value in headers.items():
+            self.send_header(name, value)
+        if data:
+            self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+
+class KitStubServer(KitStub):
+    """Threaded local Kit API stub over HTTP. Use as a context manager or call start()/stop()."""
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0, api_key: str = "stub", verbose: bool = False):
+        super().__init__(api_key)
+        self.verbose = verbose
+        self.connections: set = set()
+        self._server = ThreadingHTTPServer((host, port), _Handler)
+        self._server.daemon_threads = True
+        self._server.stub = self
+        self._thread = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}{API_PREFIX}"
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run a local Kit API stub")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--api-key", default="stub")
+    args = parser.parse_args()
+
+    stub = KitStubServer(args.host, args.port, api_key=args.api_key, verbose=True)
+    print(f"Kit stub listening on {stub.base_url} (api key: {args.api_key})")
+    try:
+        stub._server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        stub._server.server_close()
+
+
+if __name__ == "__main__":
+    main()
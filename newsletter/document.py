@@ -0,0 +1,279 @@
+"""
+Structured model of a generated newsletter.
+
+DocumentParser reads the markdown once, line by line, and builds a
+NewsletterDocument: intro, sections, the Spotlight tool (name and URL),
+tips, takeaways, closing and sign-off. Cleaning, featured-tech extraction,
+preview text and HTML rendering all read from the document instead of
+re-scanning the text. The parser also accepts lines as they stream in
+(see streaming.NewsletterStreamProcessor).
+"""
+
+import re
+from dataclasses import dataclass, field
+
+from . import config
+
+SIGNOFF = "-- FYI GTM Team"
+
+_HEADING = re.compile(r'^##\s+(.+?)\s*$')
+_TITLE = re.compile(r'^#\s+')
+_BOLD_LINE = re.compile(r'^\*\*(.+?)\*\*')
+_MD_LINK = re.compile(r'\[([^\]]+)\]\(([^)\s]+)[^)]*\)')
+_LIST_ITEM = re.compile(r'^\s*(?:\d+[.)]|[-*+])\s+(.*)$')
+_ORDINAL_WORD = re.compile(r'[\s:.\-—]+')
+_ORDINALS = {"one": 1, "two": 2, "three": 3, "four": 4, "five": 5}
+
+# Sign-offs the model tends to produce instead of the exact SIGNOFF
+_SIGNOFF_LINE = re.compile(
+    r'(?:--|—|-)\s*(?:FYI\s+GTM\s+Team|The\s+GTM\s+Newsletter\s+Team|\w+\s+Newsletter\s+Team'
+    r'|The\s+\w+\s+Team|GTM\s+Team)\s*$',
+    re.IGNORECASE,
+)
+
+
+def section_ordinal(heading: str) -> int | None:
+    """Return 1 for "One: ...", 2 for "Two: ...", etc. None for unnumbered headings."""
+    first = _ORDINAL_WORD.split(heading.strip(), maxsplit=1)[0].lower()
+    return _ORDINALS.get(first)
+
+
+def section_kind(heading: str, ordinal: int | None) -> str | None:
+    """Classify a section as "spotlight", "tips" or "takeaways" by number or name."""
+    lowered = heading.lower()
+    if ordinal == 1 or "spotlight" in lowered:
+        return "spotlight"
+    if ordinal == 2 or "tip" in lowered:
+        return "tips"
+    if ordinal == 3 or "takeaway" in lowered:
+        return "takeaways"
+    return None
+
+
+def strip_links(text: str) -> str:
+    """[text](url) → text"""
+    return _MD_LINK.sub(r'\1', text)
+
+
+@dataclass
+class Spotlight:
+    name: str
+    url: str | None = None
+    headline: str = ""  # the full bold line, links stripped
+
+
+@dataclass
+class Section:
+    heading: str
+    ordinal: int | None = None
+    kind: str | None = None
+    lines: list[str] = field(default_factory=list)
+    items: list[str] = field(default_factory=list)       # list items, continuation lines joined
+    paragraphs: list[str] = field(default_factory=list)  # non-list text blocks
+    trailing: list[str] = field(default_factory=list)    # paragraphs after the list ends
+
+    @property
+    def body(self) -> str:
+        return "\n".join(self.lines).strip()
+
+
+@dataclass
+class NewsletterDocument:
+    preamble: str = ""  # model chatter before the first heading (dropped)
+    title: str | None = None
+    intro: str = ""
+    sections: list[Section] = field(default_factory=list)
+    spotlight: Spotlight | None = None
+    closing: str = ""
+    signoff: str | None = None  # the sign-off line as written, if any
+    lines: list[str] = field(default_factory=list)  # kept content, preamble removed
+    first_text: str | None = None  # first line of readable text, for preview
+    _signoff_index: int | None = None
+    _signoff_start: int = 0
+
+    def section(self, kind: str) -> Section | None:
+        return next((s for s in self.sections if s.kind == kind), None)
+
+    @property
+    def featured_tech(self) -> str | None:
+        return self.spotlight.name if self.spotlight else None
+
+    @property
+    def tips(self) -> list[str]:
+        section = self.section("tips")
+        return (section.items or section.paragraphs) if section else []
+
+    @property
+    def takeaways(self) -> list[str]:
+        section = self.section("takeaways")
+        return (section.items or section.paragraphs) if section else []
+
+    def to_markdown(self) -> str:
+        """Content without preamble, ending with exactly SIGNOFF."""
+        lines = list(self.lines)
+        if self._signoff_index is not None:
+            line = lines[self._signoff_index]
+            lines[self._signoff_index] = line[:self._signoff_start] + SIGNOFF
+            return "\n".join(lines).strip()
+        return "\n".join(lines).strip() + "\n\n" + SIGNOFF
+
+    def preview_text(self, max_length: int = 100) -> str:
+        """First line of readable text with formatting removed, truncated at a word boundary."""
+        if not self.first_text:
+            return ""
+        preview = strip_links(self.first_text.replace("**", "").replace("*", ""))
+        if len(preview) > max_length:
+            preview = preview[:max_length - 3].rsplit(" ", 1)[0] + "..."
+        return preview
+
+    def to_html(self, email: bool = None) -> str:
+        """Render the cleaned content; email defaults to config.RENDER_EMAIL_SAFE."""
+        from . import renderer  # deferred: loads the markdown package
+
+        if email is None:
+            email = config.RENDER_EMAIL_SAFE
+        return renderer.render(self.to_markdown(), email=email)
+
+
+class DocumentParser:
+    """
+    Builds a NewsletterDocument from lines fed in order.
+    on_section(section) and on_spotlight(spotlight) fire as soon as each is seen.
+    """
+
+    def __init__(self, on_section=None, on_spotlight=None):
+        self.doc = NewsletterDocument()
+        self.on_section = on_section
+        self.on_spotlight = on_spotlight
+        self.lead: list[str] = []  # lines before the first heading
+        self.lead_chars = 0
+        self.started = False
+        self._current: Section | None = None
+        self._item: list[str] | None = None
+        self._paragraph: list[str] = []
+        self._last_text_index: int | None = None
+
+    def feed_line(self, line: str):
+        heading = _HEADING.match(line)
+
+        if not self.started:
+            if not heading:
+                self.lead.append(line)
+                self.lead_chars += len(line) + 1
+                return
+            self._start(line)
+
+        doc = self.doc
+        doc.lines.append(line)
+        stripped = line.strip()
+        if stripped:
+            self._last_text_index = len(doc.lines) - 1
+
+        if heading:
+            self._flush_block()
+            ordinal = section_ordinal(heading.group(1))
+            self._current = Section(heading.group(1), ordinal, section_kind(heading.group(1), ordinal))
+            doc.sections.append(self._current)
+            if self.on_section:
+                self.on_section(self._current)
+            return
+
+        section = self._current
+        section.lines.append(line)
+        if doc.first_text is None and self._is_text(stripped):
+            doc.first_text = stripped
+
+        if section.kind == "spotlight" and doc.spotlight is None:
+            bold = _BOLD_LINE.match(stripped)
+            if bold:
+                headline = strip_links(bold.group(1))
+                link = _MD_LINK.search(stripped)
+                doc.spotlight = Spotlight(
+                    name=headline.split(":")[0].strip(),
+                    url=link.group(2) if link else None,
+                    headline=headline.strip(),
+                )
+                if self.on_spotlight:
+                    self.on_spotlight(doc.spotlight)
+
+        if not stripped:
+            self._flush_block()
+            return
+        item = _LIST_ITEM.match(line)
+        if item:
+            self._flush_block()
+            self._item = [item.group(1).strip()]
+        elif self._item is not None:
+            self._item.append(stripped)
+        else:
+            self._paragraph.append(stripped)
+
+    def finish(self) -> NewsletterDocument:
+        """Close open blocks, locate the sign-off and closing, and return the document."""
+        doc = self.doc
+        if not self.started:
+            # No headings at all: treat everything as content so nothing is lost
+            doc.lines = list(self.lead)
+            doc.first_text = next((l.strip() for l in self.lead if self._is_text(l.strip())), None)
+            self._last_text_index = max((i for i, l in enumerate(self.lead) if l.strip()), default=None)
+        self._flush_block()
+
+        if self._last_text_index is not None:
+            last = doc.lines[self._last_text_index]
+            match = _SIGNOFF_LINE.search(last)
+            if match:
+                doc.signoff = last[match.start():].strip()
+                doc._signoff_index = self._last_text_index
+                doc._signoff_start = match.start()
+
+        if doc.sections:
+            closing = [_SIGNOFF_LINE.sub("", p).strip() for p in doc.sections[-1].trailing]
+            doc.closing = "\n\n".join(p for p in closing if p and p != "---")
+        return doc
+
+    def _start(self, first_heading: str):
+        """First heading: keep the lead only if it is itself markdown heading, else it is preamble."""
+        doc = self.doc
+        self.started = True
+        before = "\n".join(self.lead).strip()
+        if not before.startswith("#"):
+            doc.preamble = before
+            return
+        doc.lines = list(self.lead)
+        intro = []
+        for i, line in enumerate(self.lead):
+            stripped = line.strip()
+            if stripped:
+                self._last_text_index = i
+            if doc.title is None and _TITLE.match(stripped):
+                doc.title = _TITLE.sub("", stripped)
+            elif stripped or intro:
+                intro.append(line)
+            if doc.first_text is None and self._is_text(stripped):
+                doc.first_text = stripped
+        doc.intro = "\n".join(intro).strip()
+
+    def _flush_block(self):
+        section = self._current
+        if section is not None:
+            if self._item is not None:
+                section.items.append(" ".join(self._item))
+            if self._paragraph:
+                paragraph = " ".join(self._paragraph)
+                section.paragraphs.append(paragraph)
+                if section.items:
+                    section.trailing.append(paragraph)
+        self._item = None
+        self._paragraph = []
+
+    @staticmethod
+    def _is_text(stripped: str) -> bool:
+        return bool(stripped) and not stripped.startswith(("#", "!", "---"))
+
+
+def parse(content: str) -> NewsletterDocument:
+    """Parse newsletter markdown into a NewsletterDocument in one pass."""
+    parser = DocumentParser()
+    for line in content.strip().split("\n"):
+        parser.feed_line(line)
+    return parser.finish()
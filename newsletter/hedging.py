@@ -0,0 +1,320 @@
+"""
+Hedged Anthropic requests for the topic, research and writing calls.
+
+A call that has not answered by the time a typical call would have (the
+HEDGE_PERCENTILE of recent latencies for that step) gets a duplicate
+request. Whichever request answers first wins and the other is cancelled.
+For the streamed writing step "answers" means the first text delta, so the
+hedge fires on time-to-first-token rather than on the whole issue.
+
+Latencies are kept per step so thresholds carry over between runs; until a
+step has HEDGE_MIN_SAMPLES the DEFAULT_DELAYS apply. With
+HEDGE_STATS_BACKEND=supabase (the default) they live in one hedge_stats row,
+so every runner shares them, including GitHub Actions runners that start with
+an empty disk; the row is read at startup (configure) and written after each
+issue (flush). With "local" they are a JSON file at HEDGE_STATS_PATH, written
+as they change. When the hedge wins, the time the original request had been
+waiting is recorded too, as a lower bound on its latency, so slow calls still
+raise the threshold.
+
+The budget keeps hedges to HEDGE_BUDGET_RATIO of the last BUDGET_WINDOW
+calls, which caps the extra spend. Those calls are saved with the latencies,
+so the cap holds across runs rather than restarting with every process. A
+budget with little history is measured as if it had 1/HEDGE_BUDGET_RATIO
+calls, so a cold start can still hedge its first slow call.
+"""
+
+import asyncio
+import json
+import math
+import os
+import threading
+import time
+from collections import defaultdict, deque
+from datetime import datetime, timezone
+
+from . import config
+from . import retry
+from . import telemetry
+
+# Seconds before hedging while a step has too few samples
+DEFAULT_DELAYS = {
+    "topic": 20.0,
+    "research": 45.0,
+    "research.tool": 40.0,
+    "research.stats": 30.0,
+    "research.news": 30.0,
+    "writing": 10.0,
+}
+WINDOW = 200  # samples kept per step
+STATS_ROW = "default"  # hedge_stats row shared by every runner
+BUDGET_WINDOW = 200  # recent calls the hedge budget is measured over
+
+
+def percentile(values, pct: float) -> float:
+    """Nearest-rank percentile."""
+    ordered = sorted(values)
+    rank = max(1, round(pct / 100 * len(ordered) + 0.5))
+    return ordered[min(rank, len(ordered)) - 1]
+
+
+class LatencyTracker:
+    """
+    Recent latencies per step and recent hedge decisions. Persisted as JSON to
+    a local file, or to the hedge_stats table when given a Supabase client.
+    """
+
+    def __init__(self, path: str = None, client=None):
+        self.path = path or config.HEDGE_STATS_PATH
+        self.client = client
+        self.samples: dict[str, deque] = defaultdict(lambda: deque(maxlen=WINDOW))
+        self.calls: deque = deque(maxlen=BUDGET_WINDOW)  # per call: 1 if it was hedged, else 0
+        self.lock = threading.Lock()
+        self._loaded = False
+        self._dirty = False
+
+    def use(self, client):
+        """Switch to the hedge_stats table and load it (before any call is made)."""
+        with self.lock:
+            self.client = client
+            self.samples.clear()
+            self.calls.clear()
+            self._loaded = False
+            self._load()
+
+    def _read(self) -> dict | None:
+        if self.client is not None:
+            from .supabase_client import execute
+
+            result = execute(self.client.table("hedge_stats").select("stats").eq("name", STATS_ROW).limit(1))
+            return result.data[0]["stats"] if result.data else None
+        with open(self.path, encoding="utf-8") as f:
+            return json.load(f)
+
+    def _load(self):
+        """Read the saved stats (caller holds the lock)."""
+        if self._loaded:
+            return
+        self._loaded = True
+        try:
+            saved = self._read()
+        except (OSError, ValueError):
+            return
+        except Exception as e:
+            print(f"  Could not load latency stats ({e}), starting without them")
+            return
+        if not saved:
+            return
+        if "latency" not in saved:
+            saved = {"latency": saved}  # written before the budget was saved
+        for label, values in saved["latency"].items():
+            self.samples[label].extend(values)
+        self.calls.extend(saved.get("calls", []))
+
+    def changed(self):
+        """Stats changed: the local file is written now, the Supabase row by flush()."""
+        if self.client is None:
+            self.save()
+        else:
+            with self.lock:
+                self._dirty = True
+
+    def threshold(self, label: str) -> float:
+        """Seconds to wait before hedging a call of this step."""
+        with self.lock:
+            self._load()
+            values = list(self.samples[label])
+        if len(values) < config.HEDGE_MIN_SAMPLES:
+            return DEFAULT_DELAYS.get(label, 30.0)
+        return percentile(values, config.HEDGE_PERCENTILE)
+
+    def record(self, label: str, seconds: float):
+        with self.lock:
+            self._load()
+            self.samples[label].append(round(seconds, 3))
+        self.changed()
+
+    def flush(self):
+        """Write the stats if they changed since the last save."""
+        with self.lock:
+            dirty = self._dirty
+        if dirty:
+            self.save()
+
+    def save(self):
+        with self.lock:
+            data = {
+                "latency": {name: list(values) for name, values in self.samples.items()},
+                "calls": list(self.calls),
+            }
+            self._dirty = False
+        if self.client is not None:
+            from .supabase_client import execute
+
+            try:
+                execute(self.client.table("hedge_stats").upsert({
+                    "name": STATS_ROW,
+                    "stats": data,
+                    "updated_at": datetime.now(timezone.utc).isoformat(),
+                }, on_conflict="name"))
+            except Exception as e:
+                print(f"  Could not save latency stats ({e})")
+            return
+        try:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            tmp_path = f"{self.path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(data, f)
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            print(f"  Could not save latency stats ({e})")
+
+
+class HedgeBudget:
+    """
+    Allows a hedge while hedges stay within `ratio` of the tracker's recent
+    calls. Fewer than 1/ratio calls count as 1/ratio, so with no history the
+    first slow call may still be hedged.
+    """
+
+    def __init__(self, ratio: float, tracker: LatencyTracker):
+        self.ratio = ratio
+        self.tracker = tracker
+
+    def record_call(self):
+        with self.tracker.lock:
+            self.tracker._load()
+            self.tracker.calls.append(0)
+
+    def try_acquire(self) -> bool:
+        with self.tracker.lock:
+            self.tracker._load()
+            calls = self.tracker.calls
+            if self.ratio <= 0 or sum(calls) + 1 > self.ratio * max(len(calls), math.ceil(1 / self.ratio)):
+                return False
+            # Mark the newest call not already hedged as hedged
+            for index in range(len(calls) - 1, -1, -1):
+                if not calls[index]:
+                    calls[index] = 1
+                    break
+        self.tracker.changed()
+        return True
+
+
+tracker = LatencyTracker()
+budget = HedgeBudget(config.HEDGE_BUDGET_RATIO, tracker)
+_stats = defaultdict(lambda: defaultdict(int))
+_stats_lock = threading.Lock()
+
+
+def _count(label: str, event: str):
+    with _stats_lock:
+        _stats[label][event] += 1
+    telemetry.incr(f"hedge.{label}.{event}")
+
+
+def stats() -> dict:
+    """Per step: calls, hedges sent, hedges that won, hedges refused by the budget."""
+    with _stats_lock:
+        return {label: dict(events) for label, events in _stats.items()}
+
+
+def enabled() -> bool:
+    return config.HEDGE_ENABLED
+
+
+def configure(supabase=None, backend: str = None):
+    """Keep the stats in Supabase when HEDGE_STATS_BACKEND is "supabase" (else the local file)."""
+    backend = backend or config.HEDGE_STATS_BACKEND
+    if backend not in ("supabase", "local"):
+        raise ValueError(f"Unknown hedge stats backend: {backend}")
+    if enabled() and backend == "supabase" and supabase is not None:
+        tracker.use(supabase)
+
+
+def flush():
+    """Save the stats gathered since the last flush (call after each issue)."""
+    tracker.flush()
+
+
+async def race(label: str, attempt, client, delay: float = None):
+    """
+    Run attempt(client, ready) and, if it has not called ready() (or returned)
+    within `delay` seconds, a second copy; return the first to get there.
+    attempt makes one request; each copy runs under the anthropic retry policy.
+    """
+    delay = tracker.threshold(label) if delay is None else delay
+    budget.record_call()
+    _count(label, "calls")
+    ready_event = asyncio.Event()
+    winner = None
+
+    started = []
+
+    def start_leg(index: int):
+        started.append(time.monotonic())
+
+        def ready() -> bool:
+            nonlocal winner
+            if winner is None:
+                winner = index
+                ready_event.set()
+                now = time.monotonic()
+                tracker.record(label, now - started[index])
+                if index:
+                    # The original is still waiting: its latency is at least this long
+                    tracker.record(label, now - started[0])
+            return winner == index
+
+        async def run():
+            result = await retry.call_with_retry_async(lambda: attempt(client, ready), service="anthropic")
+            ready()
+            return result
+
+        return asyncio.create_task(run())
+
+    legs = [start_leg(0)]
+    ready_wait = asyncio.create_task(ready_event.wait())
+    try:
+        done, _ = await asyncio.wait([legs[0], ready_wait], timeout=delay, return_when=asyncio.FIRST_COMPLETED)
+        if not done:
+            if budget.try_acquire():
+                print(f"  {label}: no response after {delay:.1f}s, sending a hedged request")
+                _count(label, "hedged")
+                legs.append(start_leg(1))
+            else:
+                _count(label, "budget_denied")
+
+        while winner is None:
+            pending = [leg for leg in legs if not leg.done()]
+            if not pending:
+                break
+            await asyncio.wait(pending + [ready_wait], return_when=asyncio.FIRST_COMPLETED)
+        if winner is None:
+            return legs[0].result()  # every leg failed: raise the primary's error
+
+        if len(legs) > 1:
+            if winner == 1:
+                _count(label, "hedge_won")
+            print(f"  {label}: {'hedged' if winner else 'original'} request answered first")
+        for index, leg in enumerate(legs):
+            if index != winner:
+                leg.cancel()
+        return await legs[winner]
+    finally:
+        pending = [task for task in legs + [ready_wait] if not task.done()]
+        for task in pending:
+            task.cancel()
+        await asyncio.gather(*pending, return_exceptions=True)
+
+
+def call(label: str, attempt, delay: float = None, runner=None):
+    """
+    Blocking race() for the threaded pipeline: on runner's loop and client
+    (claude_client.AsyncRunner) when given, else with a fresh async client.
+    """
+    from . import claude_client as claude
+
+    return claude.run_async(lambda client: race(label, attempt, client, delay), runner)
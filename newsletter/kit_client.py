@@ -1,9 +1,248 @@
-import requests
+"""
+Kit.com (ConvertKit) v4 API client.
+
+KitClient and AsyncKitClient keep one pooled keep-alive connection per host,
+send the auth headers configured once, and run every request under the
+shared "kit" retry policy (429 and 5xx are retried, honoring Retry-After).
+"""
+
+import hashlib
+import itertools
+import threading
 from datetime import datetime, timezone, timedelta
+from typing import TYPE_CHECKING
+
+from . import retry
+from . import config
+from . import document
+
+if TYPE_CHECKING:
+    import httpx
+
+
+def _timeout(timeout: float = None, connect_timeout: float = None) -> "httpx.Timeout":
+    import httpx  # deferred with the client; see newsletter.preflight
+
+    return httpx.Timeout(
+        timeout if timeout is not None else config.KIT_TIMEOUT_SECONDS,
+        connect=connect_timeout if connect_timeout is not None else config.KIT_CONNECT_TIMEOUT_SECONDS,
+    )
+
+
+def _headers(api_key: str) -> dict:
+    return {
+        "X-Kit-Api-Key": api_key or "",
+        "Content-Type": "application/json",
+        "Accept": "application/json",
+    }
+
+
+def _check(response: "httpx.Response") -> dict | None:
+    """Raise on error responses (after logging the body); return the JSON body."""
+    if response.is_error:
+        print(f"Kit API error: {response.status_code}")
+        print(f"Response: {response.text}")
+        response.raise_for_status()
+    if response.status_code == 204 or not response.content:
+        return None
+    return response.json()
+
+
+class KitClient:
+    """Synchronous Kit client backed by a pooled httpx.Client. Safe to share across threads."""
+
+    def __init__(
+        self,
+        api_key: str = None,
+        base_url: str = None,
+        timeout: float = None,
+        connect_timeout: float = None,
+        max_connections: int = 10,
+        transport: "httpx.BaseTransport" = None,
+    ):
+        import httpx
+
+        self._http = httpx.Client(
+            base_url=base_url or config.KIT_API_BASE,
+            headers=_headers(api_key or config.KIT_API_KEY),
+            timeout=_timeout(timeout, connect_timeout),
+            limits=httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_connections),
+            transport=transport,
+        )
+
+    def request(self, method: str, path: str, **kwargs) -> dict | None:
+        """Send a request under the kit retry policy and return the JSON body."""
+        return retry.call_with_retry(
+            lambda: _check(self._http.request(method, path, **kwargs)),
+            service="kit",
+        )
+
+    def create_broadcast(self, payload: dict) -> dict:
+        """
+        POST a new broadcast. A timeout or 5xx may arrive after Kit created it,
+        so before each retry the broadcasts are searched for the subject and a
+        match is returned instead of posting a duplicate.
+        """
+        attempts = 0
+
+        def attempt():
+            nonlocal attempts
+            attempts += 1
+            if attempts > 1:
+                existing = self.find_broadcast(lambda b: b.get("subject") == payload["subject"])
+                if existing:
+                    print(f"  Kit broadcast {existing.get('id')} was created by the failed attempt")
+                    return {"broadcast": existing}
+            return _check(self._http.request("POST", "/broadcasts", json=payload))
+
+        return retry.call_with_retry(attempt, service="kit")
+
+    def get_broadcast(self, broadcast_id) -> dict:
+        return self.request("GET", f"/broadcasts/{broadcast_id}")
+
+    def find_broadcast(self, match, pages: int = None) -> dict | None:
+        """
+        The newest broadcast for which match(broadcast) is true, or None.
+        Only the newest `pages` pages (default KIT_SEARCH_PAGES) are searched:
+        an earlier attempt at the current issue is recent, and scanning the
+        whole account history before every create would cost a call per page.
+        """
+        pages = pages or config.KIT_SEARCH_PAGES
+        return next((b for b in self.iter_broadcasts(per_page=100, pages=pages) if match(b)), None)
+
+    def list_broadcasts(self, per_page: int = 50, after: str = None) -> dict:
+        """One page of broadcasts, newest first; pass pagination.end_cursor as after for the next."""
+        params = {"per_page": per_page}
+        if after:
+            params["after"] = after
+        return self.request("GET", "/broadcasts", params=params)
+
+    def iter_broadcasts(self, per_page: int = 50, pages: int = None):
+        """Yield broadcasts newest first, following the cursor pagination (at most `pages` pages)."""
+        after = None
+        for _ in itertools.count() if pages is None else range(pages):
+            page = self.list_broadcasts(per_page=per_page, after=after)
+            yield from page.get("broadcasts", [])
+            pagination = page.get("pagination") or {}
+            if not pagination.get("has_next_page"):
+                return
+            after = pagination.get("end_cursor")
+
+    def update_broadcast(self, broadcast_id, payload: dict) -> dict:
+        return self.request("PUT", f"/broadcasts/{broadcast_id}", json=payload)
+
+    def delete_broadcast(self, broadcast_id):
+        self.request("DELETE", f"/broadcasts/{broadcast_id}")
+
+    def close(self):
+        self._http.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class AsyncKitClient:
+    """asyncio Kit client backed by a pooled httpx.AsyncClient."""
+
+    def __init__(
+        self,
+        api_key: str = None,
+        base_url: str = None,
+        timeout: float = None,
+        connect_timeout: float = None,
+        max_connections: int = 10,
+        transport: "httpx.AsyncBaseTransport" = None,
+    ):
+        import httpx
+
+        self._http = httpx.AsyncClient(
+            base_url=base_url or config.KIT_API_BASE,
+            headers=_headers(api_key or config.KIT_API_KEY),
+            timeout=_timeout(timeout, connect_timeout),
+            limits=httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_connections),
+            transport=transport,
+        )
+
+    async def request(self, method: str, path: str, **kwargs) -> dict | None:
+        """Send a request under the kit retry policy and return the JSON body."""
+        async def send():
+            return _check(await self._http.request(method, path, **kwargs))
+        return await retry.call_with_retry_async(send, service="kit")
 
-from .config import KIT_API_KEY
+    async def create_broadcast(self, payload: dict) -> dict:
+        """POST a new broadcast, searching for it by subject before any retry (see KitClient)."""
+        attempts = 0
 
-KIT_API_BASE = "https://api.kit.com/v4"
+        async def attempt():
+            nonlocal attempts
+            attempts += 1
+            if attempts > 1:
+                existing = await self.find_broadcast(lambda b: b.get("subject") == payload["subject"])
+                if existing:
+                    print(f"  Kit broadcast {existing.get('id')} was created by the failed attempt")
+                    return {"broadcast": existing}
+            return _check(await self._http.request("POST", "/broadcasts", json=payload))
+
+        return await retry.call_with_retry_async(attempt, service="kit")
+
+    async def get_broadcast(self, broadcast_id) -> dict:
+        return await self.request("GET", f"/broadcasts/{broadcast_id}")
+
+    async def find_broadcast(self, match, pages: int = None) -> dict | None:
+        """The newest broadcast for which match(broadcast) is true, or None (see KitClient)."""
+        pages = pages or config.KIT_SEARCH_PAGES
+        async for broadcast in self.iter_broadcasts(per_page=100, pages=pages):
+            if match(broadcast):
+                return broadcast
+        return None
+
+    async def list_broadcasts(self, per_page: int = 50, after: str = None) -> dict:
+        params = {"per_page": per_page}
+        if after:
+            params["after"] = after
+        return await self.request("GET", "/broadcasts", params=params)
+
+    async def iter_broadcasts(self, per_page: int = 50, pages: int = None):
+        after = None
+        for _ in itertools.count() if pages is None else range(pages):
+            page = await self.list_broadcasts(per_page=per_page, after=after)
+            for broadcast in page.get("broadcasts", []):
+                yield broadcast
+            pagination = page.get("pagination") or {}
+            if not pagination.get("has_next_page"):
+                return
+            after = pagination.get("end_cursor")
+
+    async def update_broadcast(self, broadcast_id, payload: dict) -> dict:
+        return await self.request("PUT", f"/broadcasts/{broadcast_id}", json=payload)
+
+    async def delete_broadcast(self, broadcast_id):
+        await self.request("DELETE", f"/broadcasts/{broadcast_id}")
+
+    async def aclose(self):
+        await self._http.aclose()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.aclose()
+
+
+_default_client = None
+_default_lock = threading.Lock()
+
+
+def get_client() -> KitClient:
+    """Return the process-wide KitClient, so every call reuses one connection pool."""
+    global _default_client
+    with _default_lock:
+        if _default_client is None:
+            _default_client = KitClient()
+        return _default_client
 
 
 def get_next_friday_10am_et() -> str:
@@ -34,46 +273,30 @@ def extract_preview_text(content: str, max_length: int = 100) -> str:
     Extract preview text from the newsletter content.
     Gets the first meaningful sentence/paragraph, skipping headings and images.
     """
-    lines = content.strip().split("\n")
-    for line in lines:
-        line = line.strip()
-        # Skip empty lines, headings, and images
-        if not line or line.startswith("#") or line.startswith("!") or line.startswith("---"):
-            continue
-        # Found a content line - clean it up and truncate
-        import re
-        preview = line.replace("**", "").replace("*", "")
-        # Strip markdown links: [text](url) → text
-        preview = re.sub(r'\[([^\]]+)\]\([^)]+\)', r'\1', preview)
-        if len(preview) > max_length:
-            preview = preview[:max_length-3].rsplit(" ", 1)[0] + "..."
-        return preview
-    return ""
-
-
-def create_draft_broadcast(subject: str, content: str, description: str = None, schedule: bool = True) -> dict:
-    """
-    Create a broadcast in Kit.com, optionally scheduled.
-    Returns the API response including the broadcast ID.
-    """
-    url = f"{KIT_API_BASE}/broadcasts"
+    return document.parse(content).preview_text(max_length)
 
-    headers = {
-        "X-Kit-Api-Key": KIT_API_KEY,
-        "Content-Type": "application/json",
-        "Accept": "application/json",
-    }
 
+def build_broadcast_payload(
+    subject: str,
+    content: str,
+    description: str = None,
+    schedule: bool = True,
+    html_content: str = None,
+    preview_text: str = None,
+) -> dict:
+    """Build the Kit broadcast body for a newsletter issue."""
     # Convert markdown to HTML
-    html_content = markdown_to_html(content)
+    if html_content is None:
+        html_content = markdown_to_html(content)
 
     # Extract preview text from first paragraph
-    preview_text = extract_preview_text(content)
+    if preview_text is None:
+        preview_text = extract_preview_text(content)
 
     # Schedule for next Friday 10 AM ET, or leave as draft
     send_at = get_next_friday_10am_et() if schedule else None
 
-    payload = {
+    return {
         "subject": subject,
         "content": html_content,
         "description": description or subject,
@@ -84,26 +307,96 @@ def create_draft_broadcast(subject: str, content: str, description: str = None,
         "subscriber_filter": [{"all": [], "any": None, "none": None}],
     }
 
-    response = requests.post(url, json=payload, headers=headers, timeout=30)
 
-    if not response.ok:
-        print(f"Kit API error: {response.status_code}")
-        print(f"Response: {response.text}")
-        response.raise_for_status()
+def create_draft_broadcast(
+    subject: str,
+    content: str,
+    description: str = None,
+    schedule: bool = True,
+    html_content: str = None,
+    client: KitClient = None,
+) -> dict:
+    """
+    Create a broadcast in Kit.com, optionally scheduled.
+    Pass html_content to reuse an already-rendered body instead of converting content.
+    Returns the API response including the broadcast ID.
+    """
+    payload = build_broadcast_payload(subject, content, description, schedule, html_content)
+    return (client or get_client()).create_broadcast(payload)
 
-    return response.json()
+
+def broadcast_key(subject: str, html_content: str) -> str:
+    """Idempotency key for a broadcast: hash of its subject and rendered HTML."""
+    digest = hashlib.sha256()
+    digest.update((subject or "").encode("utf-8"))
+    digest.update(b"\0")
+    digest.update((html_content or "").encode("utf-8"))
+    return digest.hexdigest()
 
 
-def markdown_to_html(markdown_text: str) -> str:
+def find_broadcast(client: KitClient, broadcast_id=None, subject_prefix: str = None) -> dict | None:
+    """
+    Look up an existing broadcast by id, or else by the start of its subject
+    among the newest KIT_SEARCH_PAGES pages. None if not found.
+    """
+    import httpx
+
+    if broadcast_id and str(broadcast_id) != "unknown":
+        try:
+            return client.get_broadcast(broadcast_id).get("broadcast")
+        except httpx.HTTPStatusError as e:
+            if e.response.status_code != 404:
+                raise
+    if subject_prefix:
+        return client.find_broadcast(lambda b: (b.get("subject") or "").startswith(subject_prefix))
+    return None
+
+
+def publish_broadcast(
+    subject: str,
+    content: str,
+    description: str = None,
+    schedule: bool = True,
+    html_content: str = None,
+    broadcast_id=None,
+    subject_prefix: str = None,
+    preview_text: str = None,
+    client: KitClient = None,
+) -> dict:
+    """
+    Create the broadcast, or update it if it already exists in Kit.
+
+    An existing broadcast is found by broadcast_id, or else by subject_prefix:
+    pass the part of the subject that identifies the issue (newsletter and
+    issue number), so a broadcast created by an earlier run for the same
+    issue is found even when that run never recorded its id or used another
+    topic. The subject search reads only the newest broadcasts (one request
+    with the default KIT_SEARCH_PAGES), so it is cheap on a first attempt.
+    Unchanged broadcasts are left alone. Returns the broadcast dict.
+    """
+    client = client or get_client()
+    payload = build_broadcast_payload(subject, content, description, schedule, html_content, preview_text)
+
+    existing = None
+    if broadcast_id or subject_prefix:
+        existing = find_broadcast(client, broadcast_id, subject_prefix)
+    if existing is None:
+        return client.create_broadcast(payload).get("broadcast", {})
+    if existing.get("subject") == payload["subject"] and existing.get("content") == payload["content"]:
+        print(f"  Kit broadcast {existing.get('id')} already up to date")
+        return existing
+    print(f"  Updating existing Kit broadcast {existing.get('id')}")
+    return client.update_broadcast(existing["id"], payload).get("broadcast", existing)
+
+
+def markdown_to_html(markdown_text: str, email: bool = None) -> str:
     """
     Convert markdown to HTML for Kit.
+    email=True produces email-safe HTML (inline styles, tagged links);
+    defaults to config.RENDER_EMAIL_SAFE.
     """
-    try:
-        import markdown
-        return markdown.markdown(
-            markdown_text,
-            extensions=["extra", "smarty", "sane_lists"],
-        )
-    except ImportError:
-        # Fallback if markdown library not available
-        return f"<div>{markdown_text}</div>"
+    from . import renderer  # deferred: loads the markdown package
+
+    if email is None:
+        email = config.RENDER_EMAIL_SAFE
+    return renderer.render(markdown_text, email=email)
@@ -7,18 +7,435 @@ Runs weekly via GitHub Actions to:
 2. Generate a newsletter with available items or fresh content
 3. Save content to Supabase
 4. Create a draft broadcast in Kit.com
+
+With --batch, runs the pipeline for every newsletter_config row concurrently.
+With --resume, continues a failed run from its first unfinished stage.
+With --preflight, only checks configuration and connectivity (see preflight).
 """
 
+import argparse
 import sys
+import threading
+from contextlib import nullcontext
 
 from . import config
 from . import supabase_client as db
 from . import claude_client as claude
+from . import hedging
 from . import kit_client as kit
+from . import research_cache
+from . import similarity
+from . import storage
+from . import document
+from . import telemetry
+
+
+class RunCancelled(Exception):
+    """The worker no longer holds the run (released, or taken over); its row is left alone."""
+
+
+class BacklogReservations:
+    """
+    Backlog items handed out to in-flight runs within this process.
+    Batch runs share one instance so concurrent newsletters preview different
+    items; db.claim_backlog is what makes the reservation atomic across workers.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.topic_ids = set()
+        self.tech_ids = set()
+        self.tip_ids = set()
+
+
+def select_backlog(supabase, newsletter_id: str = None, reservations: BacklogReservations | None = None) -> dict:
+    """
+    Load the run snapshot (config, next topic/tech/tips, recent names, next issue
+    number) in one round-trip, skipping backlog items reserved by other runs.
+    """
+    with reservations.lock if reservations else nullcontext():
+        snapshot = db.load_run_snapshot(
+            supabase,
+            newsletter_id,
+            exclude_topic_ids=reservations.topic_ids if reservations else None,
+            exclude_tech_ids=reservations.tech_ids if reservations else None,
+            exclude_tip_ids=reservations.tip_ids if reservations else None,
+        )
+        if reservations:
+            if snapshot["topic"]:
+                reservations.topic_ids.add(snapshot["topic"]["id"])
+            if snapshot["tech"]:
+                reservations.tech_ids.add(snapshot["tech"]["id"])
+            reservations.tip_ids.update(t["id"] for t in snapshot["tips"])
+    return snapshot
+
+
+def start_run(
+    supabase,
+    newsletter_config: dict | None,
+    reservations: BacklogReservations | None = None,
+    snapshot: dict | None = None,
+):
+    """
+    Pick backlog items and create a fresh run record for them.
+    Returns (run_record, snapshot).
+    """
+    newsletter_name = (newsletter_config or {}).get("name") or "FYI GTM"
+    newsletter_id = (newsletter_config or {}).get("id")
+
+    # Check backlogs for available items
+    if snapshot is None:
+        print(f"[{newsletter_name}] Checking backlogs...")
+        snapshot = select_backlog(supabase, newsletter_id, reservations)
+    topic, tech, tips = snapshot["topic"], snapshot["tech"], snapshot["tips"]
+
+    print(f"  Topic: {topic['topic'] if topic else 'None (will generate)'}")
+    print(f"  Tech: {tech['name'] if tech else 'None (will generate)'}")
+    print(f"  Tips: {len(tips)} available")
+
+    # Create run record; the issue number is allocated atomically with it
+    run_fields = {
+        "topic_id": topic["id"] if topic else None,
+        "tech_id": tech["id"] if tech else None,
+        "tip_ids": [t["id"] for t in tips],
+    }
+    if newsletter_id:
+        run_record = db.create_numbered_run(
+            supabase, newsletter_id, next_issue_number=snapshot["next_issue_number"], **run_fields
+        )
+    else:
+        run_record = db.create_run(
+            supabase,
+            issue_number=snapshot["next_issue_number"],
+            newsletter_id=newsletter_id,
+            **run_fields,
+        )
+    print(f"[{newsletter_name}] Created run: {run_record['id']} (Issue #{run_record['issue_number']})")
+
+    # Atomically claim backlog items so concurrent workers never share them.
+    # The snapshot items above are only a preview (and, for a single run,
+    # the fallback if claiming fails).
+    try:
+        claimed = db.claim_backlog(
+            supabase, run_record["id"], lease_seconds=config.BACKLOG_LEASE_MINUTES * 60
+        )
+    except Exception as e:
+        if reservations is not None:
+            # Batch mode: other runs could pick the same unclaimed snapshot items
+            db.fail_run(supabase, run_record["id"], f"Backlog claiming failed: {e}")
+            raise
+        print(f"  Warning: backlog claiming failed ({e}), using snapshot items without a claim")
+    else:
+        snapshot = {**snapshot, **claimed}
+        print(
+            f"  Claimed: topic {claimed['topic']['topic'] if claimed['topic'] else 'None'}, "
+            f"tech {claimed['tech']['name'] if claimed['tech'] else 'None'}, "
+            f"{len(claimed['tips'])} tips"
+        )
+    return run_record, snapshot
+
+
+def release_claims(supabase, run_id: str):
+    """Return a failed run's unused backlog claims to the pool (best effort)."""
+    try:
+        db.release_backlog_claims(supabase, run_id)
+    except Exception as e:
+        print(f"  Could not release backlog claims ({e})")
+
+
+def load_run_backlog(supabase, run_record: dict) -> dict:
+    """Reload the topic, tech and tips a run was started with, as a partial snapshot."""
+    return {
+        "topic": db.get_topic(supabase, run_record["topic_id"]) if run_record.get("topic_id") else None,
+        "tech": db.get_tech(supabase, run_record["tech_id"]) if run_record.get("tech_id") else None,
+        "tips": db.get_tips(supabase, run_record.get("tip_ids") or []),
+    }
+
+
+def find_resumable_run(supabase, resume: str, newsletter_id: str = None) -> dict | None:
+    """Resolve --resume: a run id, or "latest" for the most recent failed run."""
+    if resume == "latest":
+        return db.get_latest_failed_run(supabase, newsletter_id)
+    run_record = db.get_run(supabase, resume)
+    if not run_record:
+        raise ValueError(f"Run not found: {resume}")
+    if run_record.get("status") == "failed" and run_record.get("newsletter_id") and not run_record.get("issue_number"):
+        raise ValueError(f"Run {resume} gave up its issue number to a newer run; start a new run instead")
+    return run_record
+
+
+def generate_issue(
+    supabase,
+    anthropic,
+    newsletter_config: dict | None,
+    reservations: BacklogReservations | None = None,
+    run_record: dict | None = None,
+    cache=None,
+    snapshot: dict | None = None,
+    history=None,
+    cancelled: threading.Event | None = None,
+    runner: claude.AsyncRunner | None = None,
+) -> dict:
+    """
+    Run the full pipeline for one newsletter.
+
+    Each stage checkpoints its output on the run row. Passing an existing
+    run_record resumes it from the first stage that did not finish, so a
+    retry never pays for the same model calls twice. cache is an optional
+    research notes cache (see research_cache.get_cache); snapshot is a
+    preloaded db.load_run_snapshot result for new runs; history is a
+    similarity.HistoryIndex used to reject repeats of past topics and tools.
+    cancelled is set by the worker when it loses the run to another worker;
+    the pipeline then stops before its next stage with RunCancelled.
+    runner is a claude.AsyncRunner shared by the process, so the async
+    Anthropic calls reuse one client and its connections across runs.
+    Returns a summary dict; raises after marking the run failed on error.
+    """
+    newsletter_name = (newsletter_config or {}).get("name") or "FYI GTM"
+    try:
+        with telemetry.collect(newsletter=newsletter_name, resumed=run_record is not None) as metrics:
+            return _run_stages(
+                supabase, anthropic, newsletter_config, newsletter_name, metrics,
+                reservations, run_record, cache, snapshot, history, cancelled, runner,
+            )
+    finally:
+        hedging.flush()
+
+
+def _run_stages(
+    supabase,
+    anthropic,
+    newsletter_config: dict | None,
+    newsletter_name: str,
+    metrics: telemetry.RunTelemetry,
+    reservations: BacklogReservations | None,
+    run_record: dict | None,
+    cache,
+    snapshot: dict | None,
+    history,
+    cancelled: threading.Event | None = None,
+    runner: claude.AsyncRunner | None = None,
+) -> dict:
+    """The pipeline behind generate_issue, with each stage timed as a telemetry span."""
+    def check_cancelled(stage: str):
+        if cancelled is not None and cancelled.is_set():
+            raise RunCancelled(f"Run {run_id} is no longer held by this worker, stopped before {stage}")
 
+    if run_record is None:
+        with telemetry.span("start_run"):
+            run_record, snapshot = start_run(supabase, newsletter_config, reservations, snapshot)
+    else:
+        print(f"[{newsletter_name}] Resuming run: {run_record['id']} (Issue #{run_record.get('issue_number')})")
+        with telemetry.span("start_run"):
+            snapshot = load_run_backlog(supabase, run_record)
+    topic, tech, tips = snapshot["topic"], snapshot["tech"], snapshot["tips"]
+    run_id = run_record["id"]
+    issue_number = run_record.get("issue_number")
+    metrics.labels.update(run_id=run_id, issue_number=issue_number)
+    research_notes = run_record.get("research_brief")
+
+    try:
+        # Stage 1: Topic — generate one if the backlog had none
+        if not topic:
+            print("  No topic in backlog, generating one...")
+            with telemetry.span("topic"):
+                recent_topics = snapshot.get("recent_topics")
+                if recent_topics is None:
+                    recent_topics = db.get_recent_topic_names(supabase, limit=8)
+                generated = claude.generate_topic(
+                    anthropic, newsletter_config, recent_topics,
+                    is_duplicate=history.find_topic_duplicate if history else None,
+                    runner=runner,
+                )
+                topic = db.create_topic(
+                    supabase,
+                    topic=generated["topic"],
+                    description=generated.get("description"),
+                    auto_generated=True
+                )
+                db.update_run(supabase, run_id, topic_id=topic["id"])
+            print(f"  Generated topic: {topic['topic']}")
+
+        # Stage 2: Research
+        check_cancelled("research")
+        if research_notes:
+            print(f"[{newsletter_name}] Research: reusing checkpoint")
+        else:
+            print(f"[{newsletter_name}] Researching newsletter...")
+            with telemetry.span("research"):
+                db.update_run(supabase, run_id, status="research", error_message=None)
+                recent_tech = snapshot.get("recent_tech")
+                if recent_tech is None:
+                    recent_tech = db.get_recent_tech_names(supabase, limit=8)
+                research_notes = claude.research_newsletter(
+                    anthropic,
+                    config=newsletter_config,
+                    topic=topic,
+                    tech=tech,
+                    tips=tips,
+                    recent_tech=recent_tech,
+                    cache=cache,
+                    runner=runner,
+                )
+                db.update_run(supabase, run_id, research_brief=research_notes)
+
+        # Stage 3: Writing
+        check_cancelled("writing")
+        newsletter_content = run_record.get("newsletter_content")
+        if newsletter_content:
+            print(f"[{newsletter_name}] Writing: reusing checkpoint")
+        else:
+            print(f"[{newsletter_name}] Generating newsletter...")
+            with telemetry.span("writing"):
+                db.update_run(supabase, run_id, status="writing", error_message=None)
+                newsletter_content = claude.write_newsletter(
+                    anthropic,
+                    config=newsletter_config,
+                    topic=topic,
+                    tech=tech,
+                    tips=tips,
+                    research_notes=research_notes,
+                    history=history,
+                    runner=runner,
+                )
+                db.update_run(supabase, run_id, newsletter_content=newsletter_content)
+            print(f"[{newsletter_name}] Newsletter generated.")
+
+        # Parse once; featured tech, preview text and HTML all read from the document
+        doc = document.parse(newsletter_content)
+
+        check_cancelled("marking items used")
+        with telemetry.span("mark_used"):
+            # Record which tool was actually featured (for avoidance in future runs)
+            # (skipped when it is the backlog tech, which is marked used below)
+            featured_tech = doc.featured_tech
+            is_backlog_tech = bool(featured_tech and tech) and (
+                db.normalize_tech_name(featured_tech) == db.normalize_tech_name(tech["name"])
+            )
+            if featured_tech and not is_backlog_tech:
+                db.record_featured_tech(supabase, featured_tech)
+                print(f"  Recorded featured tech: {featured_tech}")
+
+            # Mark backlog items as used
+            if topic:
+                db.mark_topic_used(supabase, topic["id"])
+                print(f"  Marked topic used: {topic['topic']}")
+            if tech:
+                db.mark_tech_used(supabase, tech["id"])
+                print(f"  Marked tech used: {tech['name']}")
+            if tips:
+                db.mark_tips_used(supabase, [t["id"] for t in tips])
+                print(f"  Marked {len(tips)} tips used")
+
+            # Add this issue to the near-duplicate index
+            if history is not None:
+                history.add_topic(topic["topic"])
+                if featured_tech or tech:
+                    history.add_tech(featured_tech or tech["name"])
+                try:
+                    history.save()
+                except OSError as e:
+                    print(f"  Similarity index save failed ({e})")
+
+        # Stage 4: Render HTML
+        html_content = run_record.get("html_content")
+        if not html_content:
+            with telemetry.span("render"):
+                html_content = doc.to_html()
+                db.update_run(supabase, run_id, html_content=html_content)
+
+        # Stage 5: Create Kit.com draft broadcast (idempotent)
+        check_cancelled("creating the Kit broadcast")
+        # Build subject line with newsletter name, issue number and topic
+        subject = f"{newsletter_name} #{issue_number}: {topic['topic']}"
+        broadcast_key = kit.broadcast_key(subject, html_content)
+        broadcast_id = run_record.get("beehiiv_post_id")
+        stored_key = run_record.get("broadcast_key")
+        if broadcast_id and stored_key in (None, broadcast_key):
+            print(f"[{newsletter_name}] Kit.com draft already created: {broadcast_id}")
+        else:
+            print(f"[{newsletter_name}] Creating draft broadcast in Kit.com...")
+            with telemetry.span("kit"):
+                if not broadcast_id:
+                    broadcast_id = db.get_broadcast_id_by_key(supabase, broadcast_key)
+
+                # Record the key before calling Kit, so a later resume can tell
+                # whether the content changed since the broadcast was made
+                db.update_run(supabase, run_id, broadcast_key=broadcast_key)
+                # Any earlier run for this issue (a failed attempt, a fresh run
+                # that took over its number) may have created the broadcast
+                # without saving its id: look for it by newsletter and issue
+                broadcast = kit.publish_broadcast(
+                    subject=subject,
+                    content=newsletter_content,
+                    description=topic.get("description") if topic else None,
+                    html_content=html_content,
+                    broadcast_id=broadcast_id,
+                    subject_prefix=f"{newsletter_name} #{issue_number}:" if issue_number else None,
+                    preview_text=doc.preview_text(),
+                )
+                broadcast_id = broadcast.get("id", "unknown")
+                db.update_run(supabase, run_id, beehiiv_post_id=str(broadcast_id))
+            print(f"[{newsletter_name}] Kit.com draft ready: {broadcast_id}")
+
+        # Mark run complete
+        print(f"[{newsletter_name}] Timing: {metrics.describe()}")
+        telemetry.persist(supabase, run_id, metrics, status="published")
+        db.complete_run(supabase, run_id, str(broadcast_id))
+
+    except RunCancelled as e:
+        print(f"[{newsletter_name}] {e}")
+        raise
+    except Exception as e:
+        print(f"[{newsletter_name}] Error during newsletter generation: {e}")
+        telemetry.persist(supabase, run_id, metrics, status="failed", error=type(e).__name__)
+        if not research_notes:
+            # Nothing checkpointed, so nothing worth resuming: hand the claimed
+            # items back now instead of holding them until the lease runs out
+            release_claims(supabase, run_id)
+        db.fail_run(supabase, run_id, str(e))
+        raise
+
+    return {
+        "newsletter": newsletter_name,
+        "run_id": run_id,
+        "issue_number": issue_number,
+        "topic": topic["topic"],
+        "broadcast_id": str(broadcast_id),
+    }
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Generate and schedule newsletters.")
+    parser.add_argument(
+        "--batch", action="store_true",
+        help="Generate an issue for every newsletter_config row concurrently",
+    )
+    parser.add_argument(
+        "--concurrency", type=int, default=config.BATCH_CONCURRENCY,
+        help=f"Maximum newsletters generated at once in batch mode (default {config.BATCH_CONCURRENCY})",
+    )
+    parser.add_argument(
+        "--resume", metavar="RUN_ID",
+        help='Resume a run from its first unfinished stage ("latest" = most recent failed run)',
+    )
+    parser.add_argument(
+        "--no-cache", action="store_true",
+        help="Always run the research step instead of reusing cached research notes",
+    )
+    parser.add_argument(
+        "--preflight", action="store_true",
+        help="Check configuration, Supabase, the backlog and Kit/Anthropic credentials, then exit",
+    )
+    return parser.parse_args(argv)
 
-def run():
+
+def run(argv=None):
     """Main workflow execution."""
+    args = parse_args(argv)
+    if args.preflight:
+        from . import preflight
+        sys.exit(preflight.main())
     print("Starting newsletter automation...")
 
     # Validate configuration
@@ -29,105 +446,76 @@ def run():
         sys.exit(1)
 
     # Initialize clients
-    supabase = db.get_client()
+    supabase = storage.get_client()
     anthropic = claude.get_client()
+    cache = None if args.no_cache else research_cache.get_cache(supabase)
+    history = similarity.load_history(supabase)
+    hedging.configure(supabase)
+
+    if args.batch:
+        from . import batch
+        if args.resume and args.resume != "latest":
+            print("Configuration error: --batch only supports --resume latest")
+            sys.exit(1)
+        runner = claude.AsyncRunner()
+        try:
+            results = batch.run_batch(
+                supabase, anthropic,
+                max_concurrency=args.concurrency,
+                resume_failed=args.resume == "latest",
+                cache=cache,
+                history=history,
+                runner=runner,
+            )
+        finally:
+            runner.close()
+        if any(r["status"] != "ok" for r in results):
+            sys.exit(1)
+        return
+
+    # Find the run to resume, if any
+    run_record = None
+    if args.resume:
+        try:
+            run_record = find_resumable_run(supabase, args.resume)
+        except ValueError as e:
+            print(f"Resume error: {e}")
+            sys.exit(1)
+        if run_record and run_record.get("status") == "published":
+            print(f"Run {run_record['id']} is already published, nothing to resume.")
+            return
+        if not run_record:
+            print("No failed run to resume, starting a new one.")
 
-    # Step 1: Load newsletter config
+    # Load newsletter config (new runs get it with the backlog in one snapshot)
     print("Loading newsletter config...")
-    newsletter_config = db.get_newsletter_config(supabase)
+    snapshot = None
+    if run_record and run_record.get("newsletter_id"):
+        newsletter_config = db.get_newsletter_config_by_id(supabase, run_record["newsletter_id"])
+    elif run_record:
+        newsletter_config = db.get_newsletter_config(supabase)
+    else:
+        snapshot = select_backlog(supabase)
+        newsletter_config = snapshot["config"]
     if newsletter_config:
         print(f"  Newsletter: {newsletter_config.get('name', 'FYI GTM')}")
     else:
         print("  No config found, using defaults")
 
-    # Step 2: Check backlogs for available items
-    print("Checking backlogs...")
-    topic = db.get_next_topic(supabase)
-    tech = db.get_next_tech(supabase)
-    tips = db.get_next_tips(supabase, count=2)
-
-    # If no topic available, generate one
-    if not topic:
-        print("  No topic in backlog, generating one...")
-        recent_topics = db.get_recent_topic_names(supabase, limit=8)
-        generated = claude.generate_topic(anthropic, newsletter_config, recent_topics)
-        topic = db.create_topic(
-            supabase,
-            topic=generated["topic"],
-            description=generated.get("description"),
-            auto_generated=True
-        )
-        print(f"  Generated topic: {topic['topic']}")
-
-    print(f"  Topic: {topic['topic'] if topic else 'None'}")
-    print(f"  Tech: {tech['name'] if tech else 'None (will generate)'}")
-    print(f"  Tips: {len(tips)} available")
-
-    # Step 3: Get issue number and create run record
-    issue_number = db.get_next_issue_number(supabase)
-    run_record = db.create_run(supabase, topic["id"], issue_number)
-    run_id = run_record["id"]
-    print(f"Created run: {run_id} (Issue #{issue_number})")
-
+    runner = claude.AsyncRunner()
     try:
-        # Step 4: Generate newsletter
-        print("Generating newsletter...")
-        db.update_run(supabase, run_id, status="writing")
-
-        recent_tech = db.get_recent_tech_names(supabase, limit=8)
-        newsletter_content = claude.generate_newsletter(
-            anthropic,
-            config=newsletter_config,
-            topic=topic,
-            tech=tech,
-            tips=tips,
-            recent_tech=recent_tech,
-        )
-        db.update_run(supabase, run_id, newsletter_content=newsletter_content)
-        print("Newsletter generated.")
-
-        # Record which tool was actually featured (for avoidance in future runs)
-        featured_tech = claude.extract_featured_tech(newsletter_content)
-        if featured_tech:
-            db.record_featured_tech(supabase, featured_tech)
-            print(f"  Recorded featured tech: {featured_tech}")
-
-        # Step 5: Mark backlog items as used
-        if topic:
-            db.mark_topic_used(supabase, topic["id"])
-            print(f"  Marked topic used: {topic['topic']}")
-        if tech:
-            db.mark_tech_used(supabase, tech["id"])
-            print(f"  Marked tech used: {tech['name']}")
-        if tips:
-            db.mark_tips_used(supabase, [t["id"] for t in tips])
-            print(f"  Marked {len(tips)} tips used")
-
-        # Step 6: Create Kit.com draft broadcast
-        print("Creating draft broadcast in Kit.com...")
-
-        # Build subject line with issue number and topic
-        subject = f"FYI GTM #{issue_number}: {topic['topic']}"
-
-        kit_response = kit.create_draft_broadcast(
-            subject=subject,
-            content=newsletter_content,
-            description=topic.get("description") if topic else None,
+        result = generate_issue(
+            supabase, anthropic, newsletter_config,
+            run_record=run_record, cache=cache, snapshot=snapshot, history=history, runner=runner,
         )
-        broadcast_id = kit_response.get("broadcast", {}).get("id", "unknown")
-        print(f"Created Kit.com draft: {broadcast_id}")
-
-        # Step 7: Mark run complete
-        db.complete_run(supabase, run_id, str(broadcast_id))
-
-        print("Newsletter automation complete!")
-        print(f"  Run ID: {run_id}")
-        print(f"  Kit Broadcast ID: {broadcast_id}")
-
-    except Exception as e:
-        print(f"Error during newsletter generation: {e}")
-        db.fail_run(supabase, run_id, str(e))
+    except Exception:
         sys.exit(1)
+    finally:
+        runner.close()
+
+    print("Newsletter automation complete!")
+    print(f"  Run ID: {result['run_id']}")
+    print(f"  Kit Broadcast ID: {result['broadcast_id']}")
 
 
 if __name__ == "__main__":
@@ -0,0 +1,148 @@
+"""
+Fast pre-run checks: python -m newsletter.main --preflight
+
+Checks the environment, Supabase reachability, backlog availability, and
+the Kit and Anthropic credentials, all at once, with plain urllib requests.
+None of the SDKs are imported, so a misconfigured run fails in a fraction
+of a second instead of after loading supabase and anthropic.
+
+Each check returns (status, detail), where status is "ok", "warn" or
+"fail". Only a "fail" makes the preflight fail.
+"""
+
+import json
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+from . import config
+
+# Unused-backlog queries: (label, table, PostgREST filters)
+BACKLOG_QUERIES = [
+    ("topics", "newsletter_topics", "active=eq.true&used_at=is.null"),
+    ("tools", "tech_backlog", "used_at=is.null"),
+    ("tips", "tips_backlog", "used_at=is.null"),
+]
+
+
+def _get(url: str, headers: dict) -> tuple[int, dict, bytes]:
+    """GET url; returns (status, headers, body) for any HTTP response, raises on network errors."""
+    request = urllib.request.Request(url, headers={"Accept": "application/json", **headers})
+    try:
+        with urllib.request.urlopen(request, timeout=config.PREFLIGHT_TIMEOUT_SECONDS) as response:
+            return response.status, dict(response.headers), response.read()
+    except urllib.error.HTTPError as e:
+        return e.code, dict(e.headers or {}), e.read()
+
+
+def _supabase_headers() -> dict:
+    key = config.SUPABASE_SERVICE_ROLE_KEY
+    return {"apikey": key, "Authorization": f"Bearer {key}"}
+
+
+def check_env() -> tuple[str, str]:
+    try:
+        config.validate_config()
+    except ValueError as e:
+        return "fail", str(e)
+    return "ok", "all required variables set"
+
+
+def check_supabase() -> tuple[str, str]:
+    if not (config.SUPABASE_URL and config.SUPABASE_SERVICE_ROLE_KEY):
+        return "fail", "SUPABASE_URL / SUPABASE_SERVICE_ROLE_KEY not set"
+    status, _, body = _get(
+        f"{config.SUPABASE_URL.rstrip('/')}/rest/v1/newsletter_config?select=id&limit=1",
+        _supabase_headers(),
+    )
+    if status != 200:
+        return "fail", f"HTTP {status}: {body[:200].decode('utf-8', 'replace')}"
+    return "ok", f"reachable, {len(json.loads(body or b'[]'))} newsletter config row(s) visible"
+
+
+def check_backlog() -> tuple[str, str]:
+    if not (config.SUPABASE_URL and config.SUPABASE_SERVICE_ROLE_KEY):
+        return "fail", "Supabase not configured"
+    counts = {}
+    headers = {**_supabase_headers(), "Prefer": "count=exact", "Range": "0-0"}
+    for label, table, filters in BACKLOG_QUERIES:
+        status, response_headers, body = _get(
+            f"{config.SUPABASE_URL.rstrip('/')}/rest/v1/{table}?select=id&{filters}", headers,
+        )
+        if status not in (200, 206):
+            return "fail", f"{table}: HTTP {status}"
+        content_range = {k.lower(): v for k, v in response_headers.items()}.get("content-range", "*/0")
+        total = content_range.rsplit("/", 1)[-1]
+        counts[label] = int(total) if total.isdigit() else 0
+    detail = ", ".join(f"{n} {label}" for label, n in counts.items()) + " unused"
+    # Empty backlogs are survivable: topics are generated and tools found by research
+    return ("ok" if all(counts.values()) else "warn"), detail
+
+
+def check_kit() -> tuple[str, str]:
+    if not config.KIT_API_KEY:
+        return "fail", "KIT_API_KEY not set"
+    status, _, body = _get(f"{config.KIT_API_BASE.rstrip('/')}/account", {"X-Kit-Api-Key": config.KIT_API_KEY})
+    if status == 200:
+        account = json.loads(body or b"{}").get("account") or {}
+        return "ok", f"credentials accepted ({account.get('name') or 'account'})"
+    if status in (401, 403):
+        return "fail", "credentials rejected"
+    return "fail", f"HTTP {status}"
+
+
+def check_anthropic() -> tuple[str, str]:
+    if not config.ANTHROPIC_API_KEY:
+        return "fail", "ANTHROPIC_API_KEY not set"
+    status, _, _ = _get(
+        f"{config.ANTHROPIC_API_BASE.rstrip('/')}/v1/models?limit=1",
+        {"x-api-key": config.ANTHROPIC_API_KEY, "anthropic-version": "2023-06-01"},
+    )
+    if status == 200:
+        return "ok", "key accepted"
+    if status in (401, 403):
+        return "fail", "key rejected"
+    return "warn", f"HTTP {status}"
+
+
+CHECKS = [
+    ("env", check_env),
+    ("supabase", check_supabase),
+    ("backlog", check_backlog),
+    ("kit", check_kit),
+    ("anthropic", check_anthropic),
+]
+
+
+def _timed(check) -> tuple[str, str, float]:
+    started = time.perf_counter()
+    try:
+        status, detail = check()
+    except Exception as e:
+        status, detail = "fail", f"{type(e).__name__}: {e}"
+    return status, detail, time.perf_counter() - started
+
+
+def run_checks(checks=None) -> list[tuple[str, str, str, float]]:
+    """Run every check concurrently. Returns (name, status, detail, seconds) in check order."""
+    checks = checks or CHECKS
+    with ThreadPoolExecutor(max_workers=len(checks)) as pool:
+        futures = [(name, pool.submit(_timed, check)) for name, check in checks]
+        return [(name, *future.result()) for name, future in futures]
+
+
+def main() -> int:
+    """Print the results; returns the process exit code."""
+    started = time.perf_counter()
+    results = run_checks()
+    print("Preflight:")
+    for name, status, detail, seconds in results:
+        print(f"  {status.upper():<5} {name:<10} {detail} [{seconds * 1000:.0f}ms]")
+    failed = [name for name, status, _, _ in results if status == "fail"]
+    elapsed = time.perf_counter() - started
+    if failed:
+        print(f"Preflight failed ({', '.join(failed)}) in {elapsed:.2f}s")
+        return 1
+    print(f"Preflight passed in {elapsed:.2f}s")
+    return 0
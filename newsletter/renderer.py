@@ -0,0 +1,114 @@
+"""
+Markdown to HTML rendering for newsletter issues.
+
+Building a Markdown instance (and loading its extensions) costs far more than
+converting one issue, so each thread keeps one converter per output mode and
+resets it between calls.
+
+Email mode adds a tree processor that, in the same pass over the document,
+inlines CSS on each element (most email clients drop <style> blocks) and
+rewrites http(s) links with tracking parameters.
+"""
+
+import threading
+from urllib.parse import urlsplit, urlunsplit, parse_qsl, urlencode
+
+import markdown
+from markdown.extensions import Extension
+from markdown.treeprocessors import Treeprocessor
+
+EXTENSIONS = ["extra", "smarty", "sane_lists"]
+
+FONT = "font-family:-apple-system,BlinkMacSystemFont,'Segoe UI',Helvetica,Arial,sans-serif"
+
+EMAIL_STYLES = {
+    "h1": f"{FONT};font-size:26px;line-height:1.3;margin:0 0 16px;color:#111111",
+    "h2": f"{FONT};font-size:21px;line-height:1.3;margin:28px 0 12px;color:#111111",
+    "h3": f"{FONT};font-size:17px;line-height:1.4;margin:20px 0 8px;color:#111111",
+    "p": f"{FONT};font-size:16px;line-height:1.6;margin:0 0 16px;color:#222222",
+    "ul": f"{FONT};font-size:16px;line-height:1.6;margin:0 0 16px;padding-left:24px;color:#222222",
+    "ol": f"{FONT};font-size:16px;line-height:1.6;margin:0 0 16px;padding-left:24px;color:#222222",
+    "li": "margin:0 0 6px",
+    "a": "color:#1a5fd0;text-decoration:underline",
+    "strong": "font-weight:700",
+    "blockquote": "margin:0 0 16px;padding:0 0 0 12px;border-left:3px solid #dddddd;color:#555555",
+    "hr": "border:0;border-top:1px solid #e5e5e5;margin:28px 0",
+    "img": "display:block;max-width:100%;height:auto;border:0",
+    "code": "font-family:Menlo,Consolas,monospace;font-size:14px;background:#f4f4f4;padding:1px 4px",
+}
+
+DEFAULT_LINK_PARAMS = {"utm_source": "fyi-gtm", "utm_medium": "email"}
+
+
+def rewrite_link(href: str, params: dict) -> str:
+    """Add tracking params to an http(s) URL, keeping any it already has."""
+    if not params or not href.startswith(("http://", "https://")):
+        return href
+    parts = urlsplit(href.strip())
+    query = parse_qsl(parts.query, keep_blank_values=True)
+    present = {key for key, _ in query}
+    query += [(key, value) for key, value in params.items() if key not in present]
+    return urlunsplit(parts._replace(query=urlencode(query)))
+
+
+class _EmailTreeprocessor(Treeprocessor):
+    def __init__(self, md, styles: dict, link_params: dict):
+        super().__init__(md)
+        self.styles = styles
+        self.link_params = link_params
+
+    def run(self, root):
+        for element in root.iter():
+            style = self.styles.get(element.tag)
+            if style:
+                existing = element.get("style")
+                element.set("style", f"{style};{existing}" if existing else style)
+            if element.tag == "a":
+                href = element.get("href")
+                if href:
+                    element.set("href", rewrite_link(href, self.link_params))
+
+
+class EmailExtension(Extension):
+    """Inline styles and rewrite links once the inline patterns have run."""
+
+    def __init__(self, styles: dict = None, link_params: dict = None, **kwargs):
+        self.styles = EMAIL_STYLES if styles is None else styles
+        self.link_params = DEFAULT_LINK_PARAMS if link_params is None else link_params
+        super().__init__(**kwargs)
+
+    def extendMarkdown(self, md):
+        # Priority below "inline" (20) so links and emphasis already exist as elements
+        md.treeprocessors.register(
+            _EmailTreeprocessor(md, self.styles, self.link_params), "email", 5
+        )
+
+
+_local = threading.local()
+
+
+def get_converter(email: bool = False, link_params: dict = None) -> markdown.Markdown:
+    """Return this thread's converter for the mode, building it on first use."""
+    converters = getattr(_local, "converters", None)
+    if converters is None:
+        converters = _local.converters = {}
+    key = (email, tuple(sorted((link_params or {}).items())) if link_params is not None else None)
+    md = converters.get(key)
+    if md is None:
+        extensions = list(EXTENSIONS)
+        if email:
+            extensions.append(EmailExtension(link_params=link_params))
+        md = converters[key] = markdown.Markdown(extensions=extensions)
+    return md
+
+
+def render(markdown_text: str, email: bool = False, link_params: dict = None) -> str:
+    """
+    Render newsletter markdown to HTML.
+    email=True inlines styles and adds link_params (default DEFAULT_LINK_PARAMS) to links.
+    """
+    md = get_converter(email, link_params)
+    try:
+        return md.convert(markdown_text)
+    finally:
+        md.reset()
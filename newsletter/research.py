@@ -0,0 +1,231 @@
+"""
+Parallel research: independent sub-queries merged into one set of notes.
+
+The single research call asks Haiku to cover the tool, statistics and news,
+and its web searches run one after another. Here each area is its own
+request (SUBQUERIES), all sent at once on an AsyncAnthropic client, so
+research takes about as long as the slowest sub-query. Each sub-query is
+cached on its own, so a partial cache hit only re-runs what is missing.
+
+merge_notes() puts the answers under one heading per sub-query, drops facts
+that repeat an earlier one (near-duplicate lines, see similarity), and ends
+with the sources cited, each attributed to the sub-queries that used it.
+"""
+
+import asyncio
+import re
+from dataclasses import dataclass
+
+from . import claude_client as claude
+from . import hedging
+from . import research_cache
+from . import retry
+from . import telemetry
+from .similarity import SimilarityIndex
+
+FACT_DUPLICATE_THRESHOLD = 0.7
+MIN_FACT_WORDS = 5  # shorter lines (labels, headings) are never deduplicated
+_URL = re.compile(r'https?://[^\s)\]>"\']+')
+
+
+@dataclass(frozen=True)
+class SubQuery:
+    name: str
+    title: str
+    task: str
+    max_searches: int = 1
+    uses_tech_history: bool = False
+    required: bool = False  # the issue cannot be written without it
+
+
+SUBQUERIES = [
+    SubQuery(
+        name="tool",
+        title="Tech Spotlight",
+        max_searches=2,
+        uses_tech_history=True,
+        required=True,
+        task="""Research the sales tech tool for this week's Spotlight:
+- If a TECH TO SPOTLIGHT was provided, search for recent news, updates, or reviews about it
+- If no tech was provided, search for a specific, named trending sales/GTM tool this week
+Report:
+- Tool name, what it does, why it's relevant now, pricing if found
+- The specific GTM problem or pain point this tool addresses
+- 3-4 key capabilities that connect to that problem
+- The tool's primary website URL and domain
+- Recent trigger: launch, update, pricing change, acquisition, or industry signal
+- Best fit: the team, sales motion, or situation it is built for, and where it's not a fit""",
+    ),
+    SubQuery(
+        name="stats",
+        title="GTM Statistics",
+        task="""Find 2-3 current statistics or trends relevant to sales/GTM and this week's topic.
+Report each as one line: the number or finding, what it means for GTM teams, and its source.""",
+    ),
+    SubQuery(
+        name="news",
+        title="Industry News",
+        task="""Find notable news or developments in the sales/GTM space from the last few weeks
+that relate to this week's topic. Report each as one line with the specific fact,
+quote or data point worth including, and its source.""",
+    ),
+]
+
+
+def subquery_instructions(query: SubQuery) -> str:
+    return f"""You are a research assistant gathering one part of the research for a weekly newsletter.
+Other assistants cover the remaining parts, so stay on this task.
+
+YOUR TASK:
+{query.task}
+
+Research source guidance (follow strictly):
+{claude.RESEARCH_SOURCE_GUIDANCE}
+
+Be factual and concise. Use short bullet points, one fact per line."""
+
+
+def subquery_request(query: SubQuery, context_section: str, backlog_section: str, recent_tech: list[str] = None) -> dict:
+    tech_avoidance = claude.build_tech_avoidance(recent_tech) if query.uses_tech_history else ""
+    return {
+        "model": claude.RESEARCH_MODEL,
+        "max_tokens": claude.MAX_RESEARCH_TOKENS,
+        "tools": [{"type": "web_search_20250305", "name": "web_search", "max_uses": query.max_searches}],
+        "system": [
+            {"type": "text", "text": subquery_instructions(query)},
+            claude.cached_text_block(context_section),
+        ],
+        "messages": [{"role": "user", "content": f"""{backlog_section}
+{tech_avoidance}
+Research your part now."""}],
+    }
+
+
+def notes_from_response(response) -> str:
+    """The response text, with the URLs each cited passage came from appended to it."""
+    parts = []
+    for block in response.content:
+        text = getattr(block, "text", None)
+        if text is None:
+            continue
+        urls = []
+        for citation in getattr(block, "citations", None) or []:
+            url = getattr(citation, "url", None)
+            if url and url not in urls and url not in text:
+                urls.append(url)
+        parts.append(text + "".join(f" ({url})" for url in urls))
+    return "".join(parts).strip()
+
+
+def merge_notes(results: list[tuple[SubQuery, str]]) -> str:
+    """Combine sub-query notes: one section each, repeated facts dropped, sources listed last."""
+    seen = SimilarityIndex(FACT_DUPLICATE_THRESHOLD)
+    sources: dict[str, list[str]] = {}
+    sections = []
+    dropped = 0
+    for query, notes in results:
+        kept = []
+        for line in notes.splitlines():
+            stripped = line.strip()
+            if not stripped:
+                if kept and kept[-1]:
+                    kept.append("")
+                continue
+            if len(stripped.split()) >= MIN_FACT_WORDS:
+                if seen.find_duplicate(stripped):
+                    dropped += 1
+                    continue
+                seen.add(stripped)
+            for url in _URL.findall(stripped):
+                url = url.rstrip(".,;")
+                users = sources.setdefault(url, [])
+                if query.name not in users:
+                    users.append(query.name)
+            kept.append(line.rstrip())
+        body = "\n".join(kept).strip()
+        if body:
+            sections.append(f"## {query.title} (source: {query.name} research)\n\n{body}")
+
+    merged = "\n\n".join(sections)
+    if sources:
+        listing = "\n".join(f"- {url} ({', '.join(users)})" for url, users in sources.items())
+        merged += f"\n\n## Sources\n\n{listing}"
+    if dropped:
+        print(f"  Merged research: dropped {dropped} repeated fact(s)")
+    return merged
+
+
+async def _run_subquery(client, query: SubQuery, request: dict) -> str:
+    async def attempt(async_client, ready):
+        return await async_client.messages.create(**request)
+
+    with telemetry.span(f"research.{query.name}"):
+        if hedging.enabled():
+            response = await hedging.race(f"research.{query.name}", attempt, client)
+        else:
+            response = await retry.call_with_retry_async(lambda: attempt(client, None), service="anthropic")
+    claude.log_usage(f"Research ({query.name})", response)
+    return notes_from_response(response)
+
+
+async def research_async(
+    context_section: str,
+    backlog_section: str,
+    recent_tech: list[str] = None,
+    cache=None,
+    queries: list[SubQuery] = None,
+    client=None,
+) -> str:
+    """
+    Run the sub-queries concurrently (cached ones are reused) and return merged notes.
+    A failed optional sub-query is left out; raises if a required one (the
+    tool) fails.
+    """
+    queries = queries or SUBQUERIES
+    requests = [subquery_request(q, context_section, backlog_section, recent_tech) for q in queries]
+    keys = [
+        research_cache.cache_key(r["model"], r["system"][0]["text"], context_section, r["messages"][0]["content"])
+        for r in requests
+    ]
+    notes = [research_cache.lookup(cache, key) for key in keys]
+    missing = [i for i, n in enumerate(notes) if not n]
+
+    if missing:
+        print(f"  Researching {', '.join(queries[i].name for i in missing)} in parallel...")
+        own_client = client is None
+        client = client or claude.get_async_client()
+        try:
+            answers = await asyncio.gather(
+                *(_run_subquery(client, queries[i], requests[i]) for i in missing),
+                return_exceptions=True,
+            )
+        finally:
+            if own_client:
+                await client.close()
+        required_error = None
+        for i, answer in zip(missing, answers):
+            if isinstance(answer, BaseException):
+                print(f"  Research ({queries[i].name}) failed: {answer}")
+                if queries[i].required and required_error is None:
+                    required_error = answer
+                continue
+            notes[i] = answer
+            research_cache.store(cache, keys[i], answer, model=requests[i]["model"])
+        if required_error is not None or not any(notes):
+            raise required_error or next(a for a in answers if isinstance(a, BaseException))
+
+    return merge_notes([(q, n) for q, n in zip(queries, notes) if n])
+
+
+def research(
+    context_section: str,
+    backlog_section: str,
+    recent_tech: list[str] = None,
+    cache=None,
+    runner=None,
+) -> str:
+    """Blocking research_async for the threaded pipeline (on runner's loop and client when given)."""
+    return claude.run_async(
+        lambda client: research_async(context_section, backlog_section, recent_tech, cache, client=client),
+        runner,
+    )
@@ -0,0 +1,141 @@
+"""
+Content-addressed cache for research notes.
+
+The research step (Haiku + web search) is the slowest and most expensive
+stage. Its output depends only on the model and the exact prompt, so notes
+are cached under a hash of both and reused until they go stale.
+
+Two backends share the same get/set interface:
+- LocalResearchCache: one JSON file per key in a directory
+- SupabaseResearchCache: rows in the research_cache table
+"""
+
+import hashlib
+import json
+import os
+import threading
+from datetime import datetime, timezone, timedelta
+
+from . import config
+from .supabase_client import execute
+
+
+def cache_key(model: str, *parts: str) -> str:
+    """Hash the model and exact prompt inputs into a cache key."""
+    digest = hashlib.sha256()
+    for part in (model, *parts):
+        digest.update((part or "").encode("utf-8"))
+        digest.update(b"\0")
+    return digest.hexdigest()
+
+
+def _age_hours(created_at: str) -> float:
+    created = datetime.fromisoformat(created_at.replace("Z", "+00:00"))
+    return (datetime.now(timezone.utc) - created).total_seconds() / 3600
+
+
+class LocalResearchCache:
+    """Research notes stored as JSON files under a local directory."""
+
+    def __init__(self, directory: str, ttl_hours: float):
+        self.directory = directory
+        self.ttl_hours = ttl_hours
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, key[:2], f"{key}.json")
+
+    def get(self, key: str) -> str | None:
+        """Return cached notes for key, or None if missing or stale."""
+        try:
+            with open(self._path(key), encoding="utf-8") as f:
+                entry = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if _age_hours(entry["created_at"]) > self.ttl_hours:
+            return None
+        return entry["notes"]
+
+    def set(self, key: str, notes: str, model: str = None):
+        """Store notes under key (atomic replace)."""
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        entry = {
+            "model": model,
+            "created_at": datetime.now(timezone.utc).isoformat(),
+            "notes": notes,
+        }
+        # Unique per thread: concurrent runs in one process may store the same key
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(entry, f)
+        os.replace(tmp_path, path)
+
+
+class SupabaseResearchCache:
+    """Research notes stored in the research_cache table."""
+
+    def __init__(self, client, ttl_hours: float):
+        self.client = client
+        self.ttl_hours = ttl_hours
+
+    def get(self, key: str) -> str | None:
+        """Return cached notes for key, or None if missing or stale."""
+        cutoff = datetime.now(timezone.utc) - timedelta(hours=self.ttl_hours)
+        result = execute(
+            self.client.table("research_cache")
+            .select("notes")
+            .eq("key", key)
+            .gte("created_at", cutoff.isoformat())
+            .limit(1)
+        )
+        return result.data[0]["notes"] if result.data else None
+
+    def set(self, key: str, notes: str, model: str = None):
+        """Store notes under key, replacing any stale entry."""
+        execute(self.client.table("research_cache").upsert({
+            "key": key,
+            "model": model,
+            "notes": notes,
+            "created_at": datetime.now(timezone.utc).isoformat(),
+        }))
+
+
+def get_cache(supabase=None, backend: str = None):
+    """
+    Build the configured research cache.
+    Returns None when caching is disabled.
+    """
+    backend = backend or config.RESEARCH_CACHE_BACKEND
+    ttl_hours = config.RESEARCH_CACHE_TTL_HOURS
+    if backend == "none" or ttl_hours <= 0:
+        return None
+    if backend == "local":
+        return LocalResearchCache(config.RESEARCH_CACHE_DIR, ttl_hours)
+    if backend == "supabase":
+        if supabase is None:
+            raise ValueError("Supabase research cache needs a Supabase client")
+        return SupabaseResearchCache(supabase, ttl_hours)
+    raise ValueError(f"Unknown research cache backend: {backend}")
+
+
+def lookup(cache, key: str) -> str | None:
+    """Read from the cache, logging hit/miss. Cache errors count as a miss."""
+    if cache is None:
+        return None
+    try:
+        notes = cache.get(key)
+    except Exception as e:
+        print(f"  Research cache unavailable ({e}), skipping")
+        return None
+    print(f"  Research cache {'hit' if notes else 'miss'} ({key[:12]})")
+    return notes
+
+
+def store(cache, key: str, notes: str, model: str = None):
+    """Write to the cache. Cache errors never fail the run."""
+    if cache is None or not notes:
+        return
+    try:
+        cache.set(key, notes, model=model)
+    except Exception as e:
+        print(f"  Research cache write failed ({e})")
@@ -0,0 +1,320 @@
+"""
+Shared retry policy for Anthropic, Supabase and Kit calls.
+
+- Errors are classified as retryable (429, 408, 5xx, 529 overloaded,
+  connection and timeout errors) or fatal (everything else).
+- Server hints win: Retry-After, retry-after-ms and the Anthropic
+  rate-limit reset headers set the wait when present.
+- Otherwise waits use jittered exponential backoff, bounded by a total
+  deadline per call.
+- A per-service circuit breaker fails fast after repeated failures.
+- Every attempt is reported to registered listeners as a metrics dict.
+"""
+
+import asyncio
+import random
+import threading
+import time
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+
+RETRYABLE_STATUS = {408, 425, 429, 500, 502, 503, 504, 529}
+
+# Postgres/PostgREST error codes worth retrying: serialization failure,
+# deadlock, statement timeout, too many connections, connection failure
+RETRYABLE_PG_CODES = {"40001", "40P01", "57014", "53300", "08006"}
+
+# Exception class names (anywhere in the MRO) that mean the request never
+# completed. Matched by name so this module needs none of the SDKs.
+TRANSIENT_ERROR_NAMES = (
+    "APIConnectionError",
+    "APITimeoutError",
+    "ConnectionError",
+    "ConnectError",
+    "Timeout",
+    "TimeoutError",
+    "ReadTimeout",
+    "ConnectTimeout",
+    "RemoteProtocolError",
+    "TransportError",
+)
+
+RESET_HEADERS = (
+    "anthropic-ratelimit-requests-reset",
+    "anthropic-ratelimit-tokens-reset",
+    "anthropic-ratelimit-input-tokens-reset",
+    "anthropic-ratelimit-output-tokens-reset",
+    "x-ratelimit-reset",
+)
+
+# Numeric reset values above this are Unix timestamps, not delays (1e9 s is ~31 years)
+EPOCH_THRESHOLD = 1e9
+
+
+@dataclass(frozen=True)
+class RetryPolicy:
+    max_attempts: int = 5
+    base_delay: float = 1.0      # seconds, doubled each attempt
+    max_delay: float = 60.0      # cap for computed backoff (server hints may exceed it)
+    deadline: float = 300.0      # total seconds allowed across all attempts
+    failure_threshold: int = 5   # consecutive failures before the circuit opens
+    reset_timeout: float = 30.0  # seconds the circuit stays open
+
+
+POLICIES = {
+    "anthropic": RetryPolicy(max_attempts=5, base_delay=2.0, max_delay=60.0, deadline=600.0),
+    "supabase": RetryPolicy(max_attempts=4, base_delay=0.5, max_delay=8.0, deadline=60.0),
+    "kit": RetryPolicy(max_attempts=5, base_delay=1.0, max_delay=30.0, deadline=180.0),
+}
+DEFAULT_POLICY = RetryPolicy()
+
+
+class CircuitOpenError(RuntimeError):
+    """Raised instead of calling a service whose circuit breaker is open."""
+
+
+class CircuitBreaker:
+    """
+    Opens after N consecutive failures. After a cooldown it lets a single
+    trial call through; every other caller still fails fast until that call
+    succeeds (closed) or fails (open again).
+    """
+
+    def __init__(self, service: str, failure_threshold: int, reset_timeout: float):
+        self.service = service
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._lock = threading.Lock()
+        self._failures = 0
+        self._opened_at = None
+        self._probe_started = None  # when the half-open trial call started
+
+    def before_call(self):
+        with self._lock:
+            if self._opened_at is None:
+                return
+            now = time.monotonic()
+            # A trial call that never reported back (cancelled) stops blocking after reset_timeout
+            probing = self._probe_started is not None and now - self._probe_started < self.reset_timeout
+            if now - self._opened_at < self.reset_timeout or probing:
+                raise CircuitOpenError(
+                    f"{self.service} circuit open after {self._failures} consecutive failures"
+                )
+            # Half-open: this caller is the trial call
+            self._probe_started = now
+
+    def record_success(self):
+        with self._lock:
+            self._failures = 0
+            self._opened_at = None
+            self._probe_started = None
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            if self._failures >= self.failure_threshold or self._probe_started is not None:
+                self._opened_at = time.monotonic()
+            self._probe_started = None
+
+    def release(self):
+        """The call ended without telling whether the service is healthy (a non-retryable error)."""
+        with self._lock:
+            self._probe_started = None
+
+
+_breakers: dict[str, CircuitBreaker] = {}
+_breakers_lock = threading.Lock()
+_listeners = []
+
+
+def get_breaker(service: str) -> CircuitBreaker:
+    """Return the process-wide circuit breaker for a service."""
+    with _breakers_lock:
+        if service not in _breakers:
+            policy = POLICIES.get(service, DEFAULT_POLICY)
+            _breakers[service] = CircuitBreaker(service, policy.failure_threshold, policy.reset_timeout)
+        return _breakers[service]
+
+
+def add_listener(listener):
+    """Register a callable that receives one metrics dict per attempt."""
+    _listeners.append(listener)
+
+
+def _emit(metric: dict):
+    for listener in _listeners:
+        try:
+            listener(metric)
+        except Exception:
+            pass
+
+
+def _status_code(exc) -> int | None:
+    status = getattr(exc, "status_code", None)
+    if status is None:
+        response = getattr(exc, "response", None)
+        status = getattr(response, "status_code", None)
+    if status is None:
+        # postgrest APIError carries the HTTP status or Postgres code in .code
+        code = getattr(exc, "code", None)
+        if isinstance(code, str) and code.isdigit() and len(code) == 3:
+            status = int(code)
+    return status
+
+
+def _headers(exc):
+    response = getattr(exc, "response", None)
+    return getattr(response, "headers", None) or {}
+
+
+def retry_after_seconds(headers) -> float | None:
+    """Parse Retry-After / retry-after-ms / rate-limit reset headers into seconds."""
+    if not headers:
+        return None
+    value = headers.get("retry-after-ms")
+    if value:
+        try:
+            return max(0.0, float(value) / 1000)
+        except ValueError:
+            pass
+    value = headers.get("retry-after")
+    if value:
+        try:
+            return max(0.0, float(value))
+        except ValueError:
+            try:
+                when = parsedate_to_datetime(value)
+                return max(0.0, (when - datetime.now(timezone.utc)).total_seconds())
+            except (TypeError, ValueError):
+                pass
+    # Rate-limit reset timestamps: use the soonest one in the future
+    waits = []
+    for name in RESET_HEADERS:
+        value = headers.get(name)
+        if not value:
+            continue
+        try:
+            when = datetime.fromisoformat(value.replace("Z", "+00:00"))
+            waits.append((when - datetime.now(timezone.utc)).total_seconds())
+        except ValueError:
+            try:
+                seconds = float(value)
+            except ValueError:
+                continue
+            # x-ratelimit-reset is seconds to wait with some providers, a Unix time with others
+            waits.append(seconds - time.time() if seconds > EPOCH_THRESHOLD else seconds)
+    waits = [w for w in waits if w > 0]
+    return min(waits) if waits else None
+
+
+def classify(exc) -> tuple[bool, float | None]:
+    """Return (retryable, server-suggested wait in seconds or None)."""
+    if isinstance(exc, CircuitOpenError):
+        return False, None
+    status = _status_code(exc)
+    if status is not None:
+        return status in RETRYABLE_STATUS, retry_after_seconds(_headers(exc))
+    code = getattr(exc, "code", None)
+    if isinstance(code, str) and code in RETRYABLE_PG_CODES:
+        return True, None
+    names = {cls.__name__ for cls in type(exc).__mro__}
+    if any(name in names for name in TRANSIENT_ERROR_NAMES):
+        return True, None
+    return False, None
+
+
+def backoff_delay(policy: RetryPolicy, attempt: int) -> float:
+    """Exponential backoff with equal jitter for the given (1-based) failed attempt."""
+    ceiling = min(policy.max_delay, policy.base_delay * (2 ** (attempt - 1)))
+    return ceiling / 2 + random.uniform(0, ceiling / 2)
+
+
+def _next_delay(service, policy, attempt, started, attempt_started, exc) -> float | None:
+    """Decide whether to retry after a failed attempt. Returns the wait, or None to give up."""
+    retryable, hint = classify(exc)
+    delay = hint if hint is not None else backoff_delay(policy, attempt)
+    remaining = policy.deadline - (time.monotonic() - started)
+    give_up = not retryable or attempt >= policy.max_attempts or delay > remaining
+    _emit({
+        "service": service,
+        "attempt": attempt,
+        "outcome": "fatal" if not retryable else ("exhausted" if give_up else "retry"),
+        "error": type(exc).__name__,
+        "status": _status_code(exc),
+        "retry_after": hint,
+        "delay": None if give_up else round(delay, 2),
+        "seconds": round(time.monotonic() - attempt_started, 3),
+    })
+    if give_up:
+        return None
+    print(
+        f"  {service} call failed ({type(exc).__name__}"
+        f"{f' {_status_code(exc)}' if _status_code(exc) else ''}), "
+        f"retrying in {delay:.1f}s (attempt {attempt + 1}/{policy.max_attempts})..."
+    )
+    return delay
+
+
+def call_with_retry(func, service: str = "anthropic", policy: RetryPolicy = None):
+    """Call func() under the service's retry policy and circuit breaker."""
+    policy = policy or POLICIES.get(service, DEFAULT_POLICY)
+    breaker = get_breaker(service)
+    started = time.monotonic()
+    attempt = 0
+    while True:
+        attempt += 1
+        breaker.before_call()
+        attempt_started = time.monotonic()
+        try:
+            result = func()
+        except Exception as exc:
+            if classify(exc)[0]:
+                breaker.record_failure()
+            else:
+                breaker.release()
+            delay = _next_delay(service, policy, attempt, started, attempt_started, exc)
+            if delay is None:
+                raise
+            time.sleep(delay)
+            continue
+        breaker.record_success()
+        _emit({
+            "service": service,
+            "attempt": attempt,
+            "outcome": "ok",
+            "seconds": round(time.monotonic() - attempt_started, 3),
+        })
+        return result
+
+
+async def call_with_retry_async(func, service: str = "anthropic", policy: RetryPolicy = None):
+    """Async variant of call_with_retry: func() returns an awaitable."""
+    policy = policy or POLICIES.get(service, DEFAULT_POLICY)
+    breaker = get_breaker(service)
+    started = time.monotonic()
+    attempt = 0
+    while True:
+        attempt += 1
+        breaker.before_call()
+        attempt_started = time.monotonic()
+        try:
+            result = await func()
+        except Exception as exc:
+            if classify(exc)[0]:
+                breaker.record_failure()
+            else:
+                breaker.release()
+            delay = _next_delay(service, policy, attempt, started, attempt_started, exc)
+            if delay is None:
+                raise
+            await asyncio.sleep(delay)
+            continue
+        breaker.record_success()
+        _emit({
+            "service": service,
+            "attempt": attempt,
+            "outcome": "ok",
+            "seconds": round(time.monotonic() - attempt_started, 3),
+        })
+        return result
@@ -0,0 +1,198 @@
+"""
+Local near-duplicate index over every topic and tool the newsletter has covered.
+
+The prompts only list the last few topics and tools, so older repeats slip
+through and cost a full research + writing cycle. This index holds the whole
+history as MinHash signatures of character shingles, bucketed with LSH:
+a lookup hashes one short string, checks a handful of buckets and verifies
+candidates with exact Jaccard similarity, well under a millisecond.
+
+The index is saved as JSON (config.SIMILARITY_INDEX_PATH), pulls only rows
+used since its last sync from Supabase, and is updated as runs complete.
+"""
+
+import hashlib
+import json
+import os
+import random
+import re
+import threading
+
+from . import config
+
+_TOKEN = re.compile(r"[a-z0-9]+")
+_MERSENNE = (1 << 61) - 1
+
+
+def shingles(text: str, n: int = 3) -> set[str]:
+    """Character n-grams of the normalized text, with word boundaries marked."""
+    normalized = f" {' '.join(_TOKEN.findall((text or '').lower()))} "
+    if len(normalized) <= n:
+        return {normalized}
+    return {normalized[i:i + n] for i in range(len(normalized) - n + 1)}
+
+
+def jaccard(a: set, b: set) -> float:
+    if not a or not b:
+        return 0.0
+    return len(a & b) / len(a | b)
+
+
+def _hash64(shingle: str) -> int:
+    return int.from_bytes(hashlib.blake2b(shingle.encode("utf-8"), digest_size=8).digest(), "big")
+
+
+class SimilarityIndex:
+    """MinHash + LSH index of short texts. Not thread-safe; HistoryIndex adds the lock."""
+
+    def __init__(self, threshold: float, num_perm: int = 64, bands: int = 32, seed: int = 1):
+        if num_perm % bands:
+            raise ValueError("num_perm must be a multiple of bands")
+        self.threshold = threshold
+        self.num_perm = num_perm
+        self.bands = bands
+        self.rows = num_perm // bands
+        rng = random.Random(seed)
+        self._perms = [(rng.randrange(1, _MERSENNE), rng.randrange(0, _MERSENNE)) for _ in range(num_perm)]
+        self.texts: list[str] = []
+        self._shingles: list[set[str]] = []
+        self._buckets: list[dict[tuple, list[int]]] = [{} for _ in range(bands)]
+
+    def __len__(self) -> int:
+        return len(self.texts)
+
+    def signature(self, shingle_set: set[str]) -> list[int]:
+        hashes = [_hash64(s) for s in shingle_set]
+        return [min((a * h + b) % _MERSENNE for h in hashes) for a, b in self._perms]
+
+    def _band_keys(self, signature: list[int]):
+        for band in range(self.bands):
+            start = band * self.rows
+            yield band, tuple(signature[start:start + self.rows])
+
+    def _lookup(self, signature: list[int]) -> list[int]:
+        positions = set()
+        for band, key in self._band_keys(signature):
+            positions.update(self._buckets[band].get(key, ()))
+        return sorted(positions)
+
+    def add(self, text: str):
+        """Index text (exact repeats are ignored)."""
+        shingle_set = shingles(text)
+        signature = self.signature(shingle_set)
+        if any(self._shingles[p] == shingle_set for p in self._lookup(signature)):
+            return
+        position = len(self.texts)
+        self.texts.append(text)
+        self._shingles.append(shingle_set)
+        for band, key in self._band_keys(signature):
+            self._buckets[band].setdefault(key, []).append(position)
+
+    def query(self, text: str, threshold: float = None) -> list[tuple[str, float]]:
+        """Indexed texts at least `threshold` similar to text, most similar first."""
+        threshold = self.threshold if threshold is None else threshold
+        shingle_set = shingles(text)
+        matches = [
+            (self.texts[p], score)
+            for p in self._lookup(self.signature(shingle_set))
+            if (score := jaccard(shingle_set, self._shingles[p])) >= threshold
+        ]
+        return sorted(matches, key=lambda m: m[1], reverse=True)
+
+    def find_duplicate(self, text: str) -> tuple[str, float] | None:
+        """The closest near-duplicate of text, or None."""
+        matches = self.query(text)
+        return matches[0] if matches else None
+
+
+class HistoryIndex:
+    """Topic and featured-tool indexes, persisted locally and synced from Supabase."""
+
+    def __init__(self, path: str = None, topic_threshold: float = None, tech_threshold: float = None):
+        self.path = path or config.SIMILARITY_INDEX_PATH
+        self.topics = SimilarityIndex(topic_threshold or config.SIMILARITY_TOPIC_THRESHOLD)
+        self.tech = SimilarityIndex(tech_threshold or config.SIMILARITY_TECH_THRESHOLD)
+        self.synced_at = {"topics": None, "tech": None}  # latest used_at pulled per table
+        self._lock = threading.Lock()
+
+    @classmethod
+    def load(cls, path: str = None) -> "HistoryIndex":
+        """Load a saved index, or start empty if there is none."""
+        index = cls(path)
+        try:
+            with open(index.path, encoding="utf-8") as f:
+                saved = json.load(f)
+        except (OSError, ValueError):
+            return index
+        for text in saved.get("topics", []):
+            index.topics.add(text)
+        for text in saved.get("tech", []):
+            index.tech.add(text)
+        index.synced_at.update(saved.get("synced_at") or {})
+        return index
+
+    def save(self):
+        """Write the index (atomic replace)."""
+        with self._lock:
+            data = {"topics": self.topics.texts, "tech": self.tech.texts, "synced_at": self.synced_at}
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp_path = f"{self.path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(data, f)
+        os.replace(tmp_path, self.path)
+
+    def sync(self, client) -> int:
+        """Pull topics and tools used since the last sync. Returns how many were added."""
+        from . import supabase_client as db
+
+        topics = db.get_topic_history(client, since=self.synced_at["topics"])
+        tech = db.get_tech_history(client, since=self.synced_at["tech"])
+        with self._lock:
+            before = len(self.topics) + len(self.tech)
+            for row in topics:
+                self.topics.add(row["topic"])
+            for row in tech:
+                self.tech.add(row["name"])
+            added = len(self.topics) + len(self.tech) - before
+            if topics:
+                self.synced_at["topics"] = topics[-1]["used_at"]
+            if tech:
+                self.synced_at["tech"] = tech[-1]["used_at"]
+        return added
+
+    def add_topic(self, topic: str):
+        with self._lock:
+            self.topics.add(topic)
+
+    def add_tech(self, name: str):
+        with self._lock:
+            self.tech.add(name)
+
+    def find_topic_duplicate(self, topic: str) -> tuple[str, float] | None:
+        with self._lock:
+            return self.topics.find_duplicate(topic)
+
+    def find_tech_duplicate(self, name: str) -> tuple[str, float] | None:
+        with self._lock:
+            return self.tech.find_duplicate(name)
+
+
+def load_history(client=None, path: str = None) -> HistoryIndex | None:
+    """
+    Load the saved index and sync it with Supabase.
+    Returns None when disabled. Sync errors leave the local index as is.
+    """
+    if not config.SIMILARITY_INDEX_ENABLED:
+        return None
+    index = HistoryIndex.load(path)
+    if client is not None:
+        try:
+            added = index.sync(client)
+            if added:
+                index.save()
+        except Exception as e:
+            print(f"  Similarity index sync failed ({e}), using local copy")
+    print(f"  Similarity index: {len(index.topics)} topics, {len(index.tech)} tools")
+    return index
@@ -0,0 +1,569 @@
+"""
+Storage backends for the pipeline's database client.
+
+Every function in supabase_client takes a `client` and talks to it through
+the PostgREST query builder (table().select().eq()...execute() and rpc()),
+so that builder is the storage interface:
+
+- supabase: the Supabase client (supabase_client.get_client).
+- sqlite: SQLiteStorage, an embedded database with the same tables and
+  columns, answering the same query-builder calls. Database functions are
+  reported as missing, so supabase_client takes its per-query fallbacks.
+  For offline development, tests and benchmarks.
+
+With STORAGE_WRITE_BEHIND, the client is wrapped in WriteBehindClient: run
+updates that only touch WRITE_BEHIND_FIELDS (stage status, checkpoints,
+metrics) are queued and written on a background thread: every queued update
+for a run is coalesced into one row, and the rows of all runs go out in one
+bulk upsert per flush. Any other run update (issue number,
+broadcast key and id, completion) is sent at once together with whatever is
+still queued for that run, so the writes that guard against duplicates
+never wait behind the buffer.
+"""
+
+import atexit
+import json
+import os
+import sqlite3
+import threading
+import uuid
+from collections import defaultdict
+from datetime import datetime, timezone
+
+from . import config
+from . import supabase_client as db
+from . import telemetry
+
+# Run columns that may be written behind: losing them in a crash only means a
+# resumed run redoes a stage (research notes are also in the research cache)
+WRITE_BEHIND_FIELDS = frozenset({
+    "status", "error_message", "research_brief", "newsletter_content", "html_content",
+    "metrics", "duration_seconds", "cost_usd",
+})
+
+# The tables the pipeline uses, as they stand after supabase/migrations.
+# Column types keep their Postgres names: UUID[] and JSONB columns are stored
+# as JSON text, BOOLEAN as 0/1, TIMESTAMPTZ as ISO 8601 text.
+SQLITE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS newsletter_config (
+    id UUID PRIMARY KEY,
+    name TEXT NOT NULL DEFAULT 'FYI GTM',
+    description TEXT,
+    audience TEXT,
+    themes TEXT,
+    tone TEXT,
+    avoid TEXT,
+    starting_issue INTEGER NOT NULL DEFAULT 1,
+    created_at TIMESTAMPTZ,
+    updated_at TIMESTAMPTZ
+);
+
+CREATE TABLE IF NOT EXISTS newsletter_topics (
+    id UUID PRIMARY KEY,
+    topic TEXT NOT NULL,
+    description TEXT,
+    priority INTEGER DEFAULT 0,
+    active BOOLEAN DEFAULT 1,
+    used_at TIMESTAMPTZ,
+    claimed_by UUID,
+    claimed_until TIMESTAMPTZ,
+    created_at TIMESTAMPTZ
+);
+
+CREATE TABLE IF NOT EXISTS tech_backlog (
+    id UUID PRIMARY KEY,
+    name TEXT NOT NULL,
+    description TEXT,
+    why_relevant TEXT,
+    url TEXT,
+    used_at TIMESTAMPTZ,
+    claimed_by UUID,
+    claimed_until TIMESTAMPTZ,
+    created_at TIMESTAMPTZ,
+    name_key TEXT GENERATED ALWAYS AS (normalize_tech_name(name)) STORED
+);
+
+CREATE TABLE IF NOT EXISTS tips_backlog (
+    id UUID PRIMARY KEY,
+    tip TEXT NOT NULL,
+    context TEXT,
+    category TEXT,
+    used_at TIMESTAMPTZ,
+    claimed_by UUID,
+    claimed_until TIMESTAMPTZ,
+    created_at TIMESTAMPTZ
+);
+
+CREATE TABLE IF NOT EXISTS newsletter_runs (
+    id UUID PRIMARY KEY,
+    run_date DATE DEFAULT CURRENT_DATE,
+    topic_id UUID REFERENCES newsletter_topics(id),
+    research_brief TEXT,
+    newsletter_content TEXT,
+    beehiiv_post_id TEXT,
+    status TEXT NOT NULL DEFAULT 'pending',
+    error_message TEXT,
+    created_at TIMESTAMPTZ,
+    completed_at TIMESTAMPTZ,
+    issue_number INTEGER,
+    newsletter_id UUID REFERENCES newsletter_config(id),
+    tech_id UUID REFERENCES tech_backlog(id),
+    tip_ids UUID[],
+    html_content TEXT,
+    broadcast_key TEXT,
+    metrics JSONB,
+    duration_seconds NUMERIC,
+    cost_usd NUMERIC,
+    queued_at TIMESTAMPTZ,
+    worker_id TEXT,
+    heartbeat_at TIMESTAMPTZ,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    UNIQUE (newsletter_id, issue_number)
+);
+
+CREATE TABLE IF NOT EXISTS research_cache (
+    key TEXT PRIMARY KEY,
+    model TEXT,
+    notes TEXT NOT NULL,
+    created_at TIMESTAMPTZ
+);
+
+CREATE TABLE IF NOT EXISTS hedge_stats (
+    name TEXT PRIMARY KEY,
+    stats JSONB NOT NULL,
+    updated_at TIMESTAMPTZ
+);
+
+CREATE TABLE IF NOT EXISTS newsletter_issue_counters (
+    newsletter_id UUID PRIMARY KEY REFERENCES newsletter_config(id) ON DELETE CASCADE,
+    last_issue INTEGER NOT NULL,
+    updated_at TIMESTAMPTZ
+);
+
+CREATE INDEX IF NOT EXISTS idx_newsletter_topics_active_priority
+ON newsletter_topics(priority DESC, created_at ASC) WHERE active = 1 AND used_at IS NULL;
+CREATE INDEX IF NOT EXISTS idx_newsletter_runs_queue
+ON newsletter_runs(queued_at) WHERE queued_at IS NOT NULL AND status NOT IN ('published', 'failed');
+CREATE UNIQUE INDEX IF NOT EXISTS idx_tech_backlog_name_key ON tech_backlog(name_key);
+"""
+
+
+def _now() -> str:
+    return datetime.now(timezone.utc).isoformat()
+
+
+class MissingFunctionError(Exception):
+    """Raised by rpc() calls: SQLite has none of the database functions."""
+
+    code = "PGRST202"
+
+
+class UniqueViolationError(Exception):
+    """A UNIQUE constraint failed, with the Postgres error code PostgREST reports for it."""
+
+    code = "23505"
+
+
+class StorageResponse:
+    def __init__(self, data, count: int = None):
+        self.data = data
+        self.count = count
+
+
+class _RPC:
+    def __init__(self, name: str):
+        self.name = name
+
+    def execute(self):
+        raise MissingFunctionError(f"Could not find the function public.{self.name} (SQLite storage)")
+
+
+class _Not:
+    """query.not_.<filter>(...) negates the next filter, as in postgrest-py."""
+
+    def __init__(self, query):
+        self.query = query
+
+    def __getattr__(self, name):
+        method = getattr(self.query, name)
+
+        def negated(*args, **kwargs):
+            self.query._negate_next = True
+            return method(*args, **kwargs)
+
+        return negated
+
+
+class SQLiteQuery:
+    """The subset of the postgrest-py request builder that supabase_client uses."""
+
+    def __init__(self, storage, table: str):
+        self.storage = storage
+        self.table = table
+        self.action = "select"
+        self.columns = "*"
+        self.count = None
+        self.payload = None
+        self.on_conflict = None
+        self.filters: list[tuple[str, list]] = []
+        self.orders: list[tuple[str, bool]] = []
+        self.limit_count = None
+        self._negate_next = False
+
+    # Actions
+    def select(self, columns: str = "*", count: str = None):
+        self.action, self.columns, self.count = "select", columns, count
+        return self
+
+    def insert(self, data):
+        self.action, self.payload = "insert", data
+        return self
+
+    def upsert(self, data, on_conflict: str = None):
+        self.action, self.payload, self.on_conflict = "upsert", data, on_conflict
+        return self
+
+    def update(self, data: dict):
+        self.action, self.payload = "update", data
+        return self
+
+    def delete(self):
+        self.action = "delete"
+        return self
+
+    # Filters
+    @property
+    def not_(self):
+        return _Not(self)
+
+    def _filter(self, sql: str, params: list):
+        if self._negate_next:
+            sql, self._negate_next = f"NOT ({sql})", False
+        self.filters.append((sql, params))
+        return self
+
+    def _column(self, column: str) -> str:
+        return self.storage.quote(self.table, column)
+
+    def eq(self, column: str, value):
+        return self._filter(f"{self._column(column)} = ?", [self.storage.encode(self.table, column, value)])
+
+    def neq(self, column: str, value):
+        return self._filter(f"{self._column(column)} != ?", [self.storage.encode(self.table, column, value)])
+
+    def gt(self, column: str, value):
+        return self._filter(f"{self._column(column)} > ?", [value])
+
+    def gte(self, column: str, value):
+        return self._filter(f"{self._column(column)} >= ?", [value])
+
+    def lt(self, column: str, value):
+        return self._filter(f"{self._column(column)} < ?", [value])
+
+    def lte(self, column: str, value):
+        return self._filter(f"{self._column(column)} <= ?", [value])
+
+    def is_(self, column: str, value):
+        if value in (None, "null"):
+            return self._filter(f"{self._column(column)} IS NULL", [])
+        return self._filter(f"{self._column(column)} IS ?", [int(value in (True, "true"))])
+
+    def in_(self, column: str, values):
+        values = [self.storage.encode(self.table, column, v) for v in values]
+        placeholders = ", ".join("?" * len(values))
+        return self._filter(f"{self._column(column)} IN ({placeholders})", values)
+
+    # Modifiers
+    def order(self, column: str, desc: bool = False):
+        self.orders.append((column, desc))
+        return self
+
+    def limit(self, count: int):
+        self.limit_count = count
+        return self
+
+    def execute(self) -> StorageResponse:
+        return self.storage.run(self)
+
+
+class SQLiteStorage:
+    """Embedded storage with the Supabase schema (see SQLITE_SCHEMA), safe to share between threads."""
+
+    def __init__(self, path: str = None):
+        self.path = path or config.SQLITE_PATH
+        if self.path != ":memory:":
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+        self.conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.create_function("normalize_tech_name", 1, db.normalize_tech_name, deterministic=True)
+        self.lock = threading.Lock()
+        with self.lock:
+            if self.path != ":memory:":
+                self.conn.execute("PRAGMA journal_mode=WAL")
+            self.conn.executescript(SQLITE_SCHEMA)
+            self.types = {
+                table: {row["name"]: (row["type"].upper(), row["pk"]) for row in self.conn.execute(
+                    f'SELECT name, type, pk FROM pragma_table_xinfo("{table}") WHERE hidden != 1'
+                )}
+                for (table,) in self.conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")
+            }
+
+    def table(self, name: str) -> SQLiteQuery:
+        if name not in self.types:
+            raise ValueError(f"Unknown table: {name}")
+        return SQLiteQuery(self, name)
+
+    def rpc(self, name: str, params: dict = None) -> _RPC:
+        return _RPC(name)
+
+    def close(self):
+        with self.lock:
+            self.conn.close()
+
+    # Column handling
+    def quote(self, table: str, column: str) -> str:
+        if column not in self.types[table]:
+            raise ValueError(f"Unknown column {table}.{column}")
+        return f'"{column}"'
+
+    def encode(self, table: str, column: str, value):
+        column_type = self.types[table].get(column, ("", 0))[0]
+        if value is None:
+            return None
+        if column_type.endswith("[]") or column_type == "JSONB":
+            return json.dumps(value)
+        if column_type == "BOOLEAN":
+            return int(value in (True, "true", 1))
+        return value
+
+    def decode(self, table: str, row: sqlite3.Row) -> dict:
+        result = {}
+        for column in row.keys():
+            value = row[column]
+            column_type = self.types[table].get(column, ("", 0))[0]
+            if value is not None and (column_type.endswith("[]") or column_type == "JSONB"):
+                value = json.loads(value)
+            elif value is not None and column_type == "BOOLEAN":
+                value = bool(value)
+            result[column] = value
+        return result
+
+    def _defaults(self, table: str, record: dict) -> dict:
+        record = dict(record)
+        columns = self.types[table]
+        if "id" in columns and columns["id"][0] == "UUID" and not record.get("id"):
+            record["id"] = str(uuid.uuid4())
+        if "created_at" in columns and not record.get("created_at"):
+            record["created_at"] = _now()
+        return record
+
+    # Execution
+    def _where(self, query: SQLiteQuery) -> tuple[str, list]:
+        if not query.filters:
+            return "", []
+        sql = " WHERE " + " AND ".join(f"({clause})" for clause, _ in query.filters)
+        return sql, [p for _, params in query.filters for p in params]
+
+    def _select_columns(self, query: SQLiteQuery) -> str:
+        if query.columns.strip() == "*":
+            return "*"
+        return ", ".join(query.storage.quote(query.table, c.strip()) for c in query.columns.split(","))
+
+    def run(self, query: SQLiteQuery) -> StorageResponse:
+        with self.lock:
+            try:
+                return self._run(query)
+            except sqlite3.IntegrityError as e:
+                if str(e).startswith("UNIQUE"):
+                    raise UniqueViolationError(str(e)) from e
+                raise
+
+    def _run(self, query: SQLiteQuery) -> StorageResponse:
+        if query.action == "select":
+            return self._run_select(query)
+        if query.action in ("insert", "upsert"):
+            return self._run_insert(query)
+        where, params = self._where(query)
+        if query.action == "update":
+            if not query.payload:
+                return StorageResponse([])
+            assignments = ", ".join(f"{self.quote(query.table, c)} = ?" for c in query.payload)
+            values = [self.encode(query.table, c, v) for c, v in query.payload.items()]
+            rows = self.conn.execute(
+                f'UPDATE "{query.table}" SET {assignments}{where} RETURNING *', values + params
+            ).fetchall()
+        else:
+            rows = self.conn.execute(f'DELETE FROM "{query.table}"{where} RETURNING *', params).fetchall()
+        return StorageResponse([self.decode(query.table, row) for row in rows])
+
+    def _run_select(self, query: SQLiteQuery) -> StorageResponse:
+        where, params = self._where(query)
+        sql = f'SELECT {self._select_columns(query)} FROM "{query.table}"{where}'
+        if query.orders:
+            # Postgres order: NULLs last ascending, first descending
+            terms = []
+            for column, desc in query.orders:
+                quoted = self.quote(query.table, column)
+                terms.append(f"{quoted} IS NULL {'DESC' if desc else 'ASC'}, {quoted} {'DESC' if desc else 'ASC'}")
+            sql += " ORDER BY " + ", ".join(terms)
+        if query.limit_count is not None:
+            sql += f" LIMIT {int(query.limit_count)}"
+        rows = [self.decode(query.table, row) for row in self.conn.execute(sql, params)]
+        count = None
+        if query.count:
+            count = self.conn.execute(f'SELECT COUNT(*) FROM "{query.table}"{where}', params).fetchone()[0]
+        return StorageResponse(rows, count)
+
+    def _run_insert(self, query: SQLiteQuery) -> StorageResponse:
+        records = query.payload if isinstance(query.payload, list) else [query.payload]
+        inserted = []
+        for record in records:
+            given = set(record)
+            record = self._defaults(query.table, record)
+            columns = list(record)
+            sql = (
+                f'INSERT INTO "{query.table}" ({", ".join(self.quote(query.table, c) for c in columns)}) '
+                f'VALUES ({", ".join("?" * len(columns))})'
+            )
+            if query.action == "upsert":
+                conflict = query.on_conflict or next(
+                    c for c, (_, pk) in self.types[query.table].items() if pk
+                )
+                # Like PostgREST, a conflict updates only the columns sent, not the filled-in defaults
+                updates = ", ".join(f'"{c}" = excluded."{c}"' for c in columns if c != conflict and c in given)
+                sql += f' ON CONFLICT ("{conflict}") DO ' + (f"UPDATE SET {updates}" if updates else "NOTHING")
+            values = [self.encode(query.table, c, record[c]) for c in columns]
+            inserted.extend(self.conn.execute(sql + " RETURNING *", values).fetchall())
+        return StorageResponse([self.decode(query.table, row) for row in inserted])
+
+
+class RunWriteBuffer:
+    """
+    Run updates queued per run and written on a background thread. Updates
+    queued while a write is waiting (up to `interval` seconds) or in flight
+    are merged into one row per run, and a flush upserts the rows of every
+    run at once (on id), so N concurrent runs cost one request, not N. Rows
+    are grouped by the columns they set, since a bulk upsert writes NULL into
+    a column a row leaves out; runs at the same stage share a group.
+    """
+
+    fields = WRITE_BEHIND_FIELDS
+
+    def __init__(self, client, interval: float = None):
+        self.client = client
+        self.interval = config.WRITE_BEHIND_INTERVAL_SECONDS if interval is None else interval
+        self.pending: dict[str, dict] = {}
+        self.failed: dict[str, dict] = {}
+        self.in_flight: set[str] = set()
+        self.cond = threading.Condition()
+        self.flush_now = False
+        self.closed = False
+        self.thread = threading.Thread(target=self._loop, name="run-write-behind", daemon=True)
+        self.thread.start()
+
+    def submit(self, run_id: str, updates: dict) -> dict:
+        with self.cond:
+            self.pending.setdefault(run_id, {}).update(updates)
+            self.cond.notify_all()
+        telemetry.incr("storage.write_behind.queued")
+        return {"id": run_id, **updates}
+
+    def take(self, run_id: str) -> dict:
+        """Remove and return everything still queued for a run (waits out a write in flight)."""
+        with self.cond:
+            self.cond.wait_for(lambda: run_id not in self.in_flight)
+            return {**self.failed.pop(run_id, {}), **self.pending.pop(run_id, {})}
+
+    def restore(self, run_id: str, updates: dict):
+        """Put taken updates back under anything queued since (a synchronous write failed)."""
+        with self.cond:
+            self.pending[run_id] = {**updates, **self.pending.get(run_id, {})}
+            self.cond.notify_all()
+
+    def flush(self):
+        """Block until every queued update has been attempted."""
+        with self.cond:
+            self.flush_now = True
+            self.cond.notify_all()
+            self.cond.wait_for(lambda: not self.pending and not self.in_flight)
+
+    def close(self):
+        if self.closed:
+            return
+        self.flush()
+        with self.cond:
+            self.closed = True
+            self.cond.notify_all()
+        self.thread.join()
+        if self.failed:
+            print(f"  Write-behind: {len(self.failed)} run update(s) could not be written")
+
+    def _loop(self):
+        while True:
+            with self.cond:
+                self.cond.wait_for(lambda: self.pending or self.closed)
+                if not self.pending:
+                    return
+                # Give a burst of updates a moment to coalesce
+                self.cond.wait_for(lambda: self.flush_now or self.closed, timeout=self.interval)
+                batch, self.pending = self.pending, {}
+                self.in_flight = set(batch)
+                self.flush_now = False
+            groups = defaultdict(list)
+            for run_id, updates in batch.items():
+                groups[frozenset(updates)].append(run_id)
+            for run_ids in groups.values():
+                rows = [{"id": run_id, **batch[run_id]} for run_id in run_ids]
+                try:
+                    db.execute(self.client.table("newsletter_runs").upsert(rows, on_conflict="id"))
+                    telemetry.incr("storage.write_behind.flushed", len(rows))
+                except Exception as e:
+                    print(f"  Write-behind update for {len(rows)} run(s) failed ({e}), sending it with the next write")
+                    with self.cond:
+                        for run_id in run_ids:
+                            self.failed[run_id] = {**self.failed.get(run_id, {}), **batch[run_id]}
+            with self.cond:
+                self.in_flight = set()
+                self.cond.notify_all()
+
+
+class WriteBehindClient:
+    """A storage client whose run updates go through a RunWriteBuffer (see supabase_client.update_run)."""
+
+    def __init__(self, client, interval: float = None):
+        self.client = client
+        self.run_buffer = RunWriteBuffer(client, interval)
+
+    def __getattr__(self, name):
+        return getattr(self.client, name)
+
+    def close(self):
+        self.run_buffer.close()
+
+
+def get_client(backend: str = None, write_behind: bool = None):
+    """
+    Build the configured storage client: STORAGE_BACKEND ("supabase" or
+    "sqlite"), wrapped for write-behind when STORAGE_WRITE_BEHIND is set.
+    """
+    backend = backend or config.STORAGE_BACKEND
+    write_behind = config.STORAGE_WRITE_BEHIND if write_behind is None else write_behind
+    if backend == "supabase":
+        client = db.get_client()
+    elif backend == "sqlite":
+        client = SQLiteStorage()
+    else:
+        raise ValueError(f"Unknown storage backend: {backend}")
+    if write_behind:
+        client = WriteBehindClient(client)
+        atexit.register(client.close)
+    return client
+
+
+def flush(client):
+    """Write out anything a write-behind client still has queued (no-op otherwise)."""
+    buffer = getattr(client, "run_buffer", None)
+    if buffer is not None:
+        buffer.flush()
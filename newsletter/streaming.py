@@ -0,0 +1,84 @@
+"""
+Incremental processing of the streamed writing step.
+
+NewsletterStreamProcessor consumes text deltas as Sonnet produces them and
+works line by line: it drops any preamble before the first section heading,
+reports each section as it starts, picks up the Spotlight tool name as soon
+as its bold line arrives, and raises StructureError the moment the output
+clearly breaks the newsletter structure so the stream can be aborted.
+"""
+
+from .document import DocumentParser, NewsletterDocument
+
+# Characters allowed before the first "## " heading before we give up
+MAX_PREAMBLE_CHARS = 1500
+
+
+class StructureError(ValueError):
+    """Raised when streamed output clearly breaks the newsletter structure."""
+
+
+class DuplicateSpotlightError(StructureError):
+    """Raised when the Spotlight features a tool from a past issue."""
+
+    def __init__(self, name: str, match: str):
+        super().__init__(f"Spotlight {name} repeats past tool {match}")
+        self.name = name
+        self.match = match
+
+
+class NewsletterStreamProcessor:
+    """Line-oriented processor for streamed newsletter markdown, built on DocumentParser."""
+
+    def __init__(self, on_section=None, on_featured_tech=None):
+        self.on_section = on_section or (lambda heading: print(f"  Writing section: {heading}"))
+        self.on_featured_tech = on_featured_tech or (lambda name: print(f"  Spotlight: {name}"))
+        self.sections: list[str] = []
+        self.featured_tech: str | None = None
+        self.document: NewsletterDocument | None = None  # set by close()
+        self._parser = DocumentParser(on_section=self._start_section, on_spotlight=self._spotlight)
+        self._partial = ""
+        self._last_ordinal = 0
+
+    @property
+    def text(self) -> str:
+        """Content received so far, with any preamble removed."""
+        parser = self._parser
+        lines = parser.doc.lines if parser.started else parser.lead
+        return "\n".join(lines + ([self._partial] if self._partial else []))
+
+    def feed(self, delta: str):
+        """Consume a text delta. Raises StructureError on a clear structural break."""
+        self._partial += delta
+        *complete, self._partial = self._partial.split("\n")
+        for line in complete:
+            self._parser.feed_line(line)
+        if not self._parser.started and self._parser.lead_chars + len(self._partial) > MAX_PREAMBLE_CHARS:
+            raise StructureError(f"No section heading in the first {MAX_PREAMBLE_CHARS} characters")
+
+    def close(self) -> str:
+        """Flush the final partial line and return the processed content."""
+        if self._partial:
+            line, self._partial = self._partial, ""
+            self._parser.feed_line(line)
+        if not self._parser.started:
+            raise StructureError("Output contains no section headings")
+        text = self.text
+        self.document = self._parser.finish()
+        return text
+
+    def _start_section(self, section):
+        heading = section.heading
+        if heading in self.sections:
+            raise StructureError(f"Section repeated: {heading}")
+        ordinal = section.ordinal
+        if ordinal is not None:
+            if ordinal <= self._last_ordinal:
+                raise StructureError(f"Section out of order: {heading}")
+            self._last_ordinal = ordinal
+        self.sections.append(heading)
+        self.on_section(heading)
+
+    def _spotlight(self, spotlight):
+        self.featured_tech = spotlight.name
+        self.on_featured_tech(spotlight.name)
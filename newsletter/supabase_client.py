@@ -1,98 +1,220 @@
-from supabase import create_client
+import re
 from datetime import datetime, timezone, timedelta
 
+from . import retry
 from .config import SUPABASE_URL, SUPABASE_SERVICE_ROLE_KEY
 
+_NON_ALNUM = re.compile(r"[\W_]+")
+
+CLAIM_SCAN_ROWS = 50  # candidates read past the ones wanted, to skip rows other runs hold
+ABANDONED_RUN_HOURS = 24  # an unfinished, unqueued run this old is treated as abandoned
+
 
 def get_client():
     """Create and return Supabase client."""
+    from supabase import create_client  # deferred: slow to import, unused by --preflight
+
     return create_client(SUPABASE_URL, SUPABASE_SERVICE_ROLE_KEY)
 
 
+def execute(query):
+    """Execute a PostgREST query under the shared retry policy."""
+    return retry.call_with_retry(query.execute, service="supabase")
+
+
+def is_missing_function(error: Exception) -> bool:
+    """True if a PostgREST error means the database function is not installed."""
+    return getattr(error, "code", None) in ("PGRST202", "42883")
+
+
 def get_newsletter_config(client) -> dict | None:
     """Fetch the newsletter configuration/context."""
-    result = client.table("newsletter_config").select("*").limit(1).execute()
+    result = execute(client.table("newsletter_config").select("*").limit(1))
     return result.data[0] if result.data else None
 
 
-def get_next_topic(client) -> dict | None:
+def get_newsletter_configs(client) -> list[dict]:
+    """Fetch every newsletter configuration (one per branded newsletter)."""
+    result = execute(
+        client.table("newsletter_config")
+        .select("*")
+        .order("created_at", desc=False)
+    )
+    return result.data if result.data else []
+
+
+def get_newsletter_config_by_id(client, newsletter_id: str) -> dict | None:
+    """Fetch one newsletter configuration by id."""
+    result = execute(
+        client.table("newsletter_config")
+        .select("*")
+        .eq("id", newsletter_id)
+        .limit(1)
+    )
+    return result.data[0] if result.data else None
+
+
+def _exclude(query, ids):
+    """Exclude already-reserved backlog ids from a query."""
+    if ids:
+        query = query.not_.in_("id", list(ids))
+    return query
+
+
+def get_next_topic(client, exclude_ids=None) -> dict | None:
     """
     Fetch the next available topic (highest priority, not yet used).
     Returns None if no topics available.
     """
-    result = (
+    query = (
         client.table("newsletter_topics")
         .select("*")
         .eq("active", True)
         .is_("used_at", "null")
+    )
+    result = execute(
+        _exclude(query, exclude_ids)
         .order("priority", desc=True)
         .order("created_at", desc=False)
         .limit(1)
-        .execute()
     )
     return result.data[0] if result.data else None
 
 
-def get_next_tech(client) -> dict | None:
+def get_next_tech(client, exclude_ids=None) -> dict | None:
     """Fetch the next unused tech from the backlog."""
-    result = (
-        client.table("tech_backlog")
-        .select("*")
-        .is_("used_at", "null")
+    query = client.table("tech_backlog").select("*").is_("used_at", "null")
+    result = execute(
+        _exclude(query, exclude_ids)
         .order("created_at", desc=False)
         .limit(1)
-        .execute()
     )
     return result.data[0] if result.data else None
 
 
-def get_next_tips(client, count: int = 2) -> list:
+def get_next_tips(client, count: int = 2, exclude_ids=None) -> list:
     """Fetch the next unused tips from the backlog."""
-    result = (
-        client.table("tips_backlog")
-        .select("*")
-        .is_("used_at", "null")
+    query = client.table("tips_backlog").select("*").is_("used_at", "null")
+    result = execute(
+        _exclude(query, exclude_ids)
         .order("created_at", desc=False)
         .limit(count)
-        .execute()
     )
     return result.data if result.data else []
 
 
+def get_topic(client, topic_id: str) -> dict | None:
+    """Fetch a topic by id."""
+    result = execute(client.table("newsletter_topics").select("*").eq("id", topic_id).limit(1))
+    return result.data[0] if result.data else None
+
+
+def get_tech(client, tech_id: str) -> dict | None:
+    """Fetch a tech backlog item by id."""
+    result = execute(client.table("tech_backlog").select("*").eq("id", tech_id).limit(1))
+    return result.data[0] if result.data else None
+
+
+def get_tips(client, tip_ids: list) -> list:
+    """Fetch tips by id, preserving the given order."""
+    if not tip_ids:
+        return []
+    result = execute(client.table("tips_backlog").select("*").in_("id", list(tip_ids)))
+    by_id = {row["id"]: row for row in result.data or []}
+    return [by_id[tip_id] for tip_id in tip_ids if tip_id in by_id]
+
+
+def mark_used(client, table: str, ids: list):
+    """Mark any number of backlog rows as used with a single bulk update."""
+    ids = [i for i in ids if i]
+    if not ids:
+        return
+    execute(client.table(table).update(
+        {"used_at": datetime.now(timezone.utc).isoformat()}
+    ).in_("id", ids))
+
+
 def mark_topic_used(client, topic_id: str):
     """Mark a topic as used so it won't be selected again."""
-    client.table("newsletter_topics").update(
-        {"used_at": datetime.now(timezone.utc).isoformat()}
-    ).eq("id", topic_id).execute()
+    mark_used(client, "newsletter_topics", [topic_id])
 
 
 def get_recent_topic_names(client, limit: int = 8) -> list[str]:
     """Fetch the most recently used topic names for avoidance context."""
-    result = (
+    result = execute(
         client.table("newsletter_topics")
         .select("topic")
         .eq("active", True)
         .not_.is_("used_at", "null")
         .order("used_at", desc=True)
         .limit(limit)
-        .execute()
     )
     return [row["topic"] for row in result.data] if result.data else []
 
 
 def get_recent_tech_names(client, limit: int = 8) -> list[str]:
     """Fetch the most recently featured tech names for avoidance context."""
-    result = (
+    result = execute(
         client.table("tech_backlog")
         .select("name")
         .not_.is_("used_at", "null")
         .order("used_at", desc=True)
         .limit(limit)
-        .execute()
     )
     return [row["name"] for row in result.data] if result.data else []
 
 
+def _used_history(client, table: str, column: str, since: str = None, page_size: int = 1000) -> list[dict]:
+    """All rows of table used at or after since, oldest first, paged by (used_at, id)."""
+    rows = []
+    after = (since, None) if since else None
+    for page in keyset_pages(client, table, "used_at", after, page_size, select=f"id, {column}, used_at"):
+        rows.extend(page)
+    return rows
+
+
+def keyset_pages(client, table: str, column: str, after: tuple = None, page_size: int = 500, select: str = "*"):
+    """
+    Yield pages of the rows of table that have `column` set, ordered by
+    (column, id) and starting after the (value, id) cursor; a (value, None)
+    cursor starts at value, inclusive. Each page resumes from the last row of
+    the previous one, so deep pages cost the same as the first and only one
+    page is held at a time. select must include id and column.
+    """
+    value, last_id = after or (None, None)
+    while True:
+        page = []
+        if value is not None and last_id is not None:
+            # Rest of the rows that share the cursor value
+            page = execute(
+                client.table(table)
+                .select(select)
+                .eq(column, value)
+                .gt("id", last_id)
+                .order("id")
+                .limit(page_size)
+            ).data or []
+        if len(page) < page_size:
+            query = client.table(table).select(select).not_.is_(column, "null")
+            if value is not None:
+                query = query.gt(column, value) if last_id is not None else query.gte(column, value)
+            page += execute(query.order(column).order("id").limit(page_size - len(page))).data or []
+        if not page:
+            return
+        yield page
+        value, last_id = page[-1][column], page[-1]["id"]
+
+
+def get_topic_history(client, since: str = None) -> list[dict]:
+    """Every used topic (topic, used_at) since the given used_at, oldest first."""
+    return _used_history(client, "newsletter_topics", "topic", since)
+
+
+def get_tech_history(client, since: str = None) -> list[dict]:
+    """Every featured tool (name, used_at) since the given used_at, oldest first."""
+    return _used_history(client, "tech_backlog", "name", since)
+
+
 def create_topic(client, topic: str, description: str = None, auto_generated: bool = False) -> dict:
     """
     Create a new topic in the newsletter_topics table.
@@ -106,86 +228,538 @@ def create_topic(client, topic: str, description: str = None, auto_generated: bo
     if description:
         data["description"] = description
 
-    result = client.table("newsletter_topics").insert(data).execute()
+    result = execute(client.table("newsletter_topics").insert(data))
     return result.data[0] if result.data else None
 
 
+def normalize_tech_name(name: str) -> str:
+    """
+    Normalize a tool name the way the tech_backlog.name_key column does:
+    text before any colon, lowercased, alphanumerics only.
+    """
+    return _NON_ALNUM.sub("", name.split(":")[0]).lower()
+
+
 def record_featured_tech(client, name: str):
     """Record a tool that was featured in a newsletter so future runs can avoid it."""
+    record_featured_techs(client, [name])
+
+
+def record_featured_techs(client, names: list[str]):
+    """
+    Record featured tools in one round-trip (record_featured_tech database
+    function). Names matching an existing row's normalized name bump its
+    used_at; new names are inserted as already used.
+    """
+    names = [n.strip() for n in names if n and normalize_tech_name(n)]
+    if not names:
+        return
+    try:
+        execute(client.rpc("record_featured_tech", {"p_names": names}))
+    except Exception as e:
+        if not is_missing_function(e):
+            raise
+        for name in names:
+            _record_featured_tech_fallback(client, name)
+
+
+def _record_featured_tech_fallback(client, name: str):
+    """Select-then-write path for databases without record_featured_tech."""
     now = datetime.now(timezone.utc).isoformat()
     # Check if this tool already exists in the backlog
-    existing = (
+    existing = execute(
         client.table("tech_backlog")
         .select("id")
         .eq("name", name)
         .limit(1)
-        .execute()
     )
     if existing.data:
         # Update existing entry's used_at
-        client.table("tech_backlog").update(
+        execute(client.table("tech_backlog").update(
             {"used_at": now}
-        ).eq("id", existing.data[0]["id"]).execute()
+        ).eq("id", existing.data[0]["id"]))
     else:
         # Insert new entry as already used
-        client.table("tech_backlog").insert(
-            {"name": name, "used_at": now}
-        ).execute()
+        try:
+            execute(client.table("tech_backlog").insert(
+                {"name": name, "used_at": now}
+            ))
+        except Exception as e:
+            # Another spelling of a tool already in the backlog (unique name_key,
+            # migration 011): bump that row instead, as record_featured_tech does
+            if getattr(e, "code", None) != "23505":
+                raise
+            execute(client.table("tech_backlog").update(
+                {"used_at": now}
+            ).eq("name_key", normalize_tech_name(name)))
 
 
 def mark_tech_used(client, tech_id: str):
     """Mark a tech item as used."""
-    client.table("tech_backlog").update(
-        {"used_at": datetime.now(timezone.utc).isoformat()}
-    ).eq("id", tech_id).execute()
+    mark_used(client, "tech_backlog", [tech_id])
 
 
 def mark_tips_used(client, tip_ids: list):
-    """Mark tips as used."""
-    for tip_id in tip_ids:
-        client.table("tips_backlog").update(
-            {"used_at": datetime.now(timezone.utc).isoformat()}
-        ).eq("id", tip_id).execute()
+    """Mark tips as used (one request for all of them)."""
+    mark_used(client, "tips_backlog", tip_ids)
 
 
-def get_next_issue_number(client) -> int:
+def claim_backlog(client, run_id: str, tip_count: int = 2, lease_seconds: int = 3600) -> dict:
     """
-    Get the next newsletter issue number.
-    Counts completed runs and adds to the starting issue number.
+    Atomically claim the next topic, tech and tips for a run (claim_backlog
+    database function). Rows locked or leased by other runs are skipped, and
+    the claimed ids are written to the run row.
+    Returns {"topic": dict | None, "tech": dict | None, "tips": list}.
+    """
+    try:
+        result = execute(client.rpc("claim_backlog", {
+            "p_run_id": run_id,
+            "p_tip_count": tip_count,
+            "p_lease_seconds": lease_seconds,
+        }))
+    except Exception as e:
+        if not is_missing_function(e):
+            raise
+        return _claim_backlog_fallback(client, run_id, tip_count, lease_seconds)
+    claimed = result.data or {}
+    return {
+        "topic": claimed.get("topic"),
+        "tech": claimed.get("tech"),
+        "tips": claimed.get("tips") or [],
+    }
+
+
+def _claim_rows(client, table: str, query, run_id: str, count: int, until: str) -> list[dict]:
+    """Claim up to count of the candidate rows, each with a compare-and-set on claimed_until."""
+    now = datetime.now(timezone.utc)
+    claimed = []
+    for row in execute(query.limit(count + CLAIM_SCAN_ROWS)).data:
+        if len(claimed) == count:
+            break
+        held = row.get("claimed_until")
+        if held and row.get("claimed_by") != run_id and datetime.fromisoformat(held) >= now:
+            continue
+        update = client.table(table).update({"claimed_by": run_id, "claimed_until": until}).eq("id", row["id"])
+        update = update.eq("claimed_until", held) if held else update.is_("claimed_until", "null")
+        result = execute(update)
+        if result.data:
+            claimed.append(result.data[0])
+    return claimed
+
+
+def _claim_backlog_fallback(client, run_id: str, tip_count: int, lease_seconds: int) -> dict:
     """
-    STARTING_ISSUE = 86  # Newsletter issues started before this system
+    claim_backlog without the database function. Each row is claimed with a
+    conditional update, so two runs can never both claim it; the topic, tech
+    and tips are claimed one after another rather than in one transaction.
+    """
+    until = (datetime.now(timezone.utc) + timedelta(seconds=lease_seconds)).isoformat()
+    topics = _claim_rows(client, "newsletter_topics", (
+        client.table("newsletter_topics").select("*").eq("active", True).is_("used_at", "null")
+        .order("priority", desc=True).order("created_at", desc=False)
+    ), run_id, 1, until)
+    tech = _claim_rows(client, "tech_backlog", (
+        client.table("tech_backlog").select("*").is_("used_at", "null").order("created_at", desc=False)
+    ), run_id, 1, until)
+    tips = _claim_rows(client, "tips_backlog", (
+        client.table("tips_backlog").select("*").is_("used_at", "null").order("created_at", desc=False)
+    ), run_id, tip_count, until)
+    update_run(
+        client, run_id,
+        topic_id=topics[0]["id"] if topics else None,
+        tech_id=tech[0]["id"] if tech else None,
+        tip_ids=[t["id"] for t in tips],
+    )
+    return {"topic": topics[0] if topics else None, "tech": tech[0] if tech else None, "tips": tips}
+
+
+def release_backlog_claims(client, run_id: str):
+    """Return a run's unused backlog claims to the pool before their lease expires."""
+    try:
+        execute(client.rpc("release_backlog_claims", {"p_run_id": run_id}))
+        return
+    except Exception as e:
+        if not is_missing_function(e):
+            raise
+    for table in ("newsletter_topics", "tech_backlog", "tips_backlog"):
+        execute(
+            client.table(table)
+            .update({"claimed_by": None, "claimed_until": None})
+            .eq("claimed_by", run_id)
+            .is_("used_at", "null")
+        )
+
 
-    result = (
+STARTING_ISSUE = 86  # Newsletter issues started before this system
+
+
+def get_next_issue_number(client, newsletter_id: str = None, starting_issue: int = STARTING_ISSUE) -> int:
+    """
+    Get the next newsletter issue number.
+    Counts completed runs (for one newsletter, if given) and adds to the starting issue number.
+    Fallback for databases without issue counters; see create_numbered_run.
+    """
+    query = (
         client.table("newsletter_runs")
         .select("id", count="exact")
         .eq("status", "published")
-        .execute()
     )
-    return STARTING_ISSUE + (result.count or 0)
+    if newsletter_id:
+        query = query.eq("newsletter_id", newsletter_id)
+    result = execute(query)
+    return starting_issue + (result.count or 0)
+
+
+def get_run_snapshot(
+    client,
+    newsletter_id: str = None,
+    tip_count: int = 2,
+    recent_limit: int = 8,
+    exclude_topic_ids=None,
+    exclude_tech_ids=None,
+    exclude_tip_ids=None,
+) -> dict:
+    """
+    Fetch everything a run needs before its first model call in one round-trip
+    (newsletter_run_snapshot database function): config, topic, tech, tips,
+    recent_topics, recent_tech and next_issue_number.
+    """
+    result = execute(client.rpc("newsletter_run_snapshot", {
+        "p_newsletter_id": newsletter_id,
+        "p_tip_count": tip_count,
+        "p_recent_limit": recent_limit,
+        "p_exclude_topic_ids": list(exclude_topic_ids or []),
+        "p_exclude_tech_ids": list(exclude_tech_ids or []),
+        "p_exclude_tip_ids": list(exclude_tip_ids or []),
+    }))
+    return result.data
+
+
+def get_run_snapshot_fallback(
+    client,
+    newsletter_id: str = None,
+    tip_count: int = 2,
+    recent_limit: int = 8,
+    exclude_topic_ids=None,
+    exclude_tech_ids=None,
+    exclude_tip_ids=None,
+) -> dict:
+    """Build the same snapshot as get_run_snapshot with one query per item."""
+    if newsletter_id:
+        newsletter_config = get_newsletter_config_by_id(client, newsletter_id)
+    else:
+        newsletter_config = get_newsletter_config(client)
+    starting_issue = (newsletter_config or {}).get("starting_issue") or STARTING_ISSUE
+    return {
+        "config": newsletter_config,
+        "topic": get_next_topic(client, exclude_ids=exclude_topic_ids),
+        "tech": get_next_tech(client, exclude_ids=exclude_tech_ids),
+        "tips": get_next_tips(client, count=tip_count, exclude_ids=exclude_tip_ids),
+        "recent_topics": get_recent_topic_names(client, limit=recent_limit),
+        "recent_tech": get_recent_tech_names(client, limit=recent_limit),
+        "next_issue_number": get_next_issue_number(
+            client, (newsletter_config or {}).get("id"), starting_issue
+        ),
+    }
 
 
-def create_run(client, topic_id: str = None, issue_number: int = None) -> dict:
-    """Create a new newsletter run record."""
+def load_run_snapshot(client, newsletter_id: str = None, **kwargs) -> dict:
+    """
+    Fetch the run snapshot, falling back to per-item queries only if the
+    database function is not installed; other errors are raised, since the
+    fallback would hide them and is not a single consistent read.
+    """
+    try:
+        return get_run_snapshot(client, newsletter_id, **kwargs)
+    except Exception as e:
+        if not is_missing_function(e):
+            raise
+        print(f"  Snapshot function unavailable ({e}), using per-item queries")
+        return get_run_snapshot_fallback(client, newsletter_id, **kwargs)
+
+
+def create_run(
+    client,
+    topic_id: str = None,
+    issue_number: int = None,
+    newsletter_id: str = None,
+    tech_id: str = None,
+    tip_ids: list = None,
+) -> dict:
+    """Create a new newsletter run record, remembering the backlog items it uses."""
     data = {"status": "pending"}
     if topic_id:
         data["topic_id"] = topic_id
     if issue_number:
         data["issue_number"] = issue_number
-    result = client.table("newsletter_runs").insert(data).execute()
+    if newsletter_id:
+        data["newsletter_id"] = newsletter_id
+    if tech_id:
+        data["tech_id"] = tech_id
+    if tip_ids:
+        data["tip_ids"] = tip_ids
+    result = execute(client.table("newsletter_runs").insert(data))
     return result.data[0]
 
 
-def update_run(client, run_id: str, **updates) -> dict:
-    """Update a newsletter run with new data."""
-    result = (
+def create_numbered_run(
+    client,
+    newsletter_id: str,
+    topic_id: str = None,
+    tech_id: str = None,
+    tip_ids: list = None,
+    next_issue_number: int = None,
+) -> dict:
+    """
+    Create a run with its issue number allocated atomically (create_newsletter_run
+    database function): an abandoned run's number is reused before the
+    newsletter's counter is advanced, so failures leave no gaps.
+
+    The call is not retried: a timeout after the commit would allocate a
+    second number. Without the function the number is found with plain
+    queries (next_issue_number, if given, saves counting published runs).
+    """
+    try:
+        result = client.rpc("create_newsletter_run", {
+            "p_newsletter_id": newsletter_id,
+            "p_topic_id": topic_id,
+            "p_tech_id": tech_id,
+            "p_tip_ids": tip_ids or None,
+        }).execute()
+        return result.data
+    except Exception as e:
+        if not is_missing_function(e):
+            raise
+        print(f"  Issue counter unavailable ({e}), counting published runs")
+    issue_number = take_abandoned_issue_number(client, newsletter_id)
+    if issue_number is None:
+        issue_number = next_issue_number
+    if issue_number is None:
+        newsletter_config = get_newsletter_config_by_id(client, newsletter_id) or {}
+        issue_number = get_next_issue_number(
+            client, newsletter_id, newsletter_config.get("starting_issue") or STARTING_ISSUE
+        )
+    return create_run(
+        client, topic_id=topic_id, issue_number=issue_number,
+        newsletter_id=newsletter_id, tech_id=tech_id, tip_ids=tip_ids,
+    )
+
+
+def take_abandoned_issue_number(client, newsletter_id: str) -> int | None:
+    """
+    The create_newsletter_run reuse rule without the database function: take
+    the lowest issue number held by an abandoned run (failed, or unfinished
+    for ABANDONED_RUN_HOURS outside the worker queue) above the latest
+    published issue. The run gives the number up and its claims are released.
+    """
+    published = execute(
+        client.table("newsletter_runs")
+        .select("issue_number")
+        .eq("newsletter_id", newsletter_id)
+        .eq("status", "published")
+        .not_.is_("issue_number", "null")
+        .order("issue_number", desc=True)
+        .limit(1)
+    )
+    latest = published.data[0]["issue_number"] if published.data else 0
+    result = execute(
+        client.table("newsletter_runs")
+        .select("*")
+        .eq("newsletter_id", newsletter_id)
+        .neq("status", "published")
+        .gt("issue_number", latest)
+        .order("issue_number", desc=False)
+        .limit(20)
+    )
+    stale_before = datetime.now(timezone.utc) - timedelta(hours=ABANDONED_RUN_HOURS)
+    for run in result.data:
+        if run["status"] != "failed" and (
+            run.get("queued_at") or datetime.fromisoformat(run["created_at"]) >= stale_before
+        ):
+            continue
+        # Compare-and-set, so two runs never take over the same number
+        taken = execute(
+            client.table("newsletter_runs")
+            .update({"issue_number": None, "status": "failed", "error_message": run.get("error_message") or "Abandoned"})
+            .eq("id", run["id"])
+            .eq("issue_number", run["issue_number"])
+        )
+        if taken.data:
+            release_backlog_claims(client, run["id"])
+            return run["issue_number"]
+    return None
+
+
+def get_run(client, run_id: str) -> dict | None:
+    """Fetch a newsletter run by id."""
+    result = execute(client.table("newsletter_runs").select("*").eq("id", run_id).limit(1))
+    return result.data[0] if result.data else None
+
+
+def get_latest_failed_run(client, newsletter_id: str = None) -> dict | None:
+    """
+    Fetch the most recent failed run that can still be resumed (for one newsletter, if given).
+    Failed runs whose issue number a newer run took over are skipped.
+    """
+    query = client.table("newsletter_runs").select("*").eq("status", "failed").not_.is_("issue_number", "null")
+    if newsletter_id:
+        query = query.eq("newsletter_id", newsletter_id)
+    result = execute(query.order("created_at", desc=True).limit(1))
+    return result.data[0] if result.data else None
+
+
+def enqueue_run(client, newsletter_id: str, topic_id: str = None) -> dict:
+    """
+    Queue a run for the worker (enqueue_newsletter_run database function).
+    The issue number is allocated now, as for create_numbered_run (and, like
+    it, the call is not retried).
+    """
+    try:
+        result = client.rpc("enqueue_newsletter_run", {
+            "p_newsletter_id": newsletter_id,
+            "p_topic_id": topic_id,
+        }).execute()
+        return result.data
+    except Exception as e:
+        if not is_missing_function(e):
+            raise
+    run = create_numbered_run(client, newsletter_id, topic_id=topic_id)
+    return update_run(client, run["id"], queued_at=datetime.now(timezone.utc).isoformat(), attempts=0)
+
+
+def claim_queued_run(client, worker_id: str, stale_seconds: int = 120) -> dict | None:
+    """
+    Claim the oldest queued run that no live worker holds (claim_newsletter_run
+    database function). Returns the run row, or None if the queue is empty.
+    """
+    try:
+        result = execute(client.rpc("claim_newsletter_run", {
+            "p_worker_id": worker_id,
+            "p_stale_seconds": stale_seconds,
+        }))
+        return result.data or None
+    except Exception as e:
+        if not is_missing_function(e):
+            raise
+    return _claim_queued_run_fallback(client, worker_id, stale_seconds)
+
+
+def _claim_queued_run_fallback(client, worker_id: str, stale_seconds: int) -> dict | None:
+    """Claim without the database function: a compare-and-set on the attempts counter."""
+    result = execute(
+        client.table("newsletter_runs")
+        .select("*")
+        .not_.is_("queued_at", "null")
+        .not_.in_("status", ["published", "failed"])
+        .order("queued_at")
+        .limit(20)
+    )
+    stale_before = datetime.now(timezone.utc) - timedelta(seconds=stale_seconds)
+    for run in result.data:
+        heartbeat = run.get("heartbeat_at")
+        if run.get("worker_id") and heartbeat and datetime.fromisoformat(heartbeat) >= stale_before:
+            continue
+        attempts = run.get("attempts") or 0
+        claimed = execute(
+            client.table("newsletter_runs")
+            .update({
+                "worker_id": worker_id,
+                "heartbeat_at": datetime.now(timezone.utc).isoformat(),
+                "attempts": attempts + 1,
+            })
+            .eq("id", run["id"])
+            .eq("attempts", attempts)
+        )
+        if claimed.data:
+            return claimed.data[0]
+    return None
+
+
+def heartbeat_runs(client, worker_id: str, run_ids: list) -> set:
+    """Refresh the heartbeat on runs this worker holds; returns the ids it still holds."""
+    if not run_ids:
+        return set()
+    result = execute(
+        client.table("newsletter_runs")
+        .update({"heartbeat_at": datetime.now(timezone.utc).isoformat()})
+        .eq("worker_id", worker_id)
+        .in_("id", list(run_ids))
+    )
+    return {row["id"] for row in result.data}
+
+
+def release_runs(client, worker_id: str, run_ids: list):
+    """
+    Hand unfinished runs back to the queue so another worker resumes them right
+    away. The claim's attempt is taken back as well: a graceful release is not
+    a crash and must not count towards WORKER_MAX_ATTEMPTS.
+    """
+    if not run_ids:
+        return
+    held = execute(
         client.table("newsletter_runs")
-        .update(updates)
-        .eq("id", run_id)
-        .execute()
+        .select("id, attempts")
+        .eq("worker_id", worker_id)
+        .in_("id", list(run_ids))
     )
+    for run in held.data:
+        execute(
+            client.table("newsletter_runs")
+            .update({"worker_id": None, "heartbeat_at": None, "attempts": max(0, (run["attempts"] or 0) - 1)})
+            .eq("id", run["id"])
+            .eq("worker_id", worker_id)
+        )
+
+
+def update_run(client, run_id: str, **updates) -> dict:
+    """
+    Update a newsletter run with new data.
+    On a write-behind client (storage.WriteBehindClient), updates that only
+    touch storage.WRITE_BEHIND_FIELDS are queued and return at once; any
+    other update is sent together with whatever is still queued for the run.
+    """
+    buffer = getattr(client, "run_buffer", None)
+    queued = {}
+    if buffer is not None:
+        if all(field in buffer.fields for field in updates):
+            return buffer.submit(run_id, updates)
+        queued = buffer.take(run_id)
+    try:
+        result = execute(
+            client.table("newsletter_runs")
+            .update({**queued, **updates})
+            .eq("id", run_id)
+        )
+    except Exception:
+        if queued:
+            buffer.restore(run_id, queued)
+        raise
     return result.data[0]
 
 
+def get_broadcast_id_by_key(client, broadcast_key: str) -> str | None:
+    """Return the Kit broadcast id already recorded for this content, if any."""
+    result = execute(
+        client.table("newsletter_runs")
+        .select("beehiiv_post_id")
+        .eq("broadcast_key", broadcast_key)
+        .not_.is_("beehiiv_post_id", "null")
+        .limit(1)
+    )
+    return result.data[0]["beehiiv_post_id"] if result.data else None
+
+
+def save_run_metrics(client, run_id: str, metrics: dict):
+    """Store the run's telemetry summary (see telemetry.RunTelemetry.summary)."""
+    update_run(
+        client,
+        run_id,
+        metrics=metrics,
+        duration_seconds=metrics.get("total_seconds"),
+        cost_usd=metrics.get("cost_usd"),
+    )
+
+
 def complete_run(client, run_id: str, broadcast_id: str):
     """Mark a run as successfully completed."""
     update_run(
@@ -0,0 +1,240 @@
+"""
+Per-run timing, token and cost telemetry.
+
+    with telemetry.collect(newsletter="FYI GTM") as metrics:
+        with telemetry.span("research"):
+            ...
+        metrics.summary()
+
+collect() makes a RunTelemetry current for the calling thread (a context
+variable, so concurrent batch runs never mix). Spans time pipeline stages,
+claude_client.log_usage records token usage from every response.usage,
+and retry attempts are counted through retry.add_listener. The summary is
+stored in newsletter_runs.metrics and, when config.TELEMETRY_JSON_LOG is
+set, every span and model call is also written as one JSON line.
+"""
+
+import contextvars
+import json
+import sys
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from datetime import datetime, timezone
+
+from . import config, retry
+
+# USD per million tokens: (input, output, cache write, cache read)
+PRICES = {
+    "claude-haiku-4-5": (1.00, 5.00, 1.25, 0.10),
+    "claude-sonnet-4": (3.00, 15.00, 3.75, 0.30),
+    "claude-opus-4": (15.00, 75.00, 18.75, 1.50),
+}
+WEB_SEARCH_PRICE = 0.01  # USD per search
+
+_current = contextvars.ContextVar("newsletter_telemetry", default=None)
+_log_lock = threading.Lock()
+
+
+def model_prices(model: str | None) -> tuple | None:
+    """Price row for a model id ("claude-sonnet-4-20250514" → the claude-sonnet-4 row)."""
+    for prefix, prices in PRICES.items():
+        if model and model.startswith(prefix):
+            return prices
+    return None
+
+
+def cost_usd(model: str | None, usage: dict) -> float | None:
+    """Estimated cost of one call, or None for a model without a price."""
+    prices = model_prices(model)
+    if prices is None:
+        return None
+    input_price, output_price, write_price, read_price = prices
+    cost = (
+        usage["input_tokens"] * input_price
+        + usage["output_tokens"] * output_price
+        + usage["cache_write_tokens"] * write_price
+        + usage["cache_read_tokens"] * read_price
+    ) / 1_000_000
+    return round(cost + usage["web_search_requests"] * WEB_SEARCH_PRICE, 6)
+
+
+def usage_from_response(response) -> dict | None:
+    """Token counts from an Anthropic response's usage block."""
+    usage = getattr(response, "usage", None)
+    if usage is None:
+        return None
+    server_tools = getattr(usage, "server_tool_use", None)
+    return {
+        "input_tokens": getattr(usage, "input_tokens", None) or 0,
+        "output_tokens": getattr(usage, "output_tokens", None) or 0,
+        "cache_read_tokens": getattr(usage, "cache_read_input_tokens", None) or 0,
+        "cache_write_tokens": getattr(usage, "cache_creation_input_tokens", None) or 0,
+        "web_search_requests": getattr(server_tools, "web_search_requests", None) or 0,
+    }
+
+
+class RunTelemetry:
+    """Spans, counters and model calls for one pipeline run."""
+
+    def __init__(self, **labels):
+        self.labels = labels
+        self.started_at = datetime.now(timezone.utc).isoformat()
+        self._started = time.perf_counter()
+        self.spans: list[dict] = []
+        self.counters: dict[str, int] = defaultdict(int)
+        self.calls: list[dict] = []
+        self._lock = threading.Lock()
+
+    def elapsed(self) -> float:
+        return time.perf_counter() - self._started
+
+    def add_span(self, name: str, seconds: float, **attrs):
+        span = {"name": name, "start": round(self.elapsed() - seconds, 3), "seconds": round(seconds, 3), **attrs}
+        with self._lock:
+            self.spans.append(span)
+        emit("span", self.labels, span)
+
+    def incr(self, name: str, n: int = 1):
+        with self._lock:
+            self.counters[name] += n
+
+    def add_call(self, call: dict):
+        with self._lock:
+            self.calls.append(call)
+        emit("model_call", self.labels, call)
+
+    def stages(self) -> dict[str, float]:
+        """Total seconds per span name."""
+        totals = defaultdict(float)
+        with self._lock:
+            for span in self.spans:
+                totals[span["name"]] += span["seconds"]
+        return {name: round(seconds, 3) for name, seconds in totals.items()}
+
+    def tokens(self) -> dict[str, int]:
+        totals = defaultdict(int)
+        with self._lock:
+            for call in self.calls:
+                for key, value in call["usage"].items():
+                    totals[key] += value
+        return dict(totals)
+
+    def cost(self) -> float:
+        with self._lock:
+            return round(sum(call["cost_usd"] or 0 for call in self.calls), 6)
+
+    def summary(self) -> dict:
+        """JSON-ready breakdown, as stored in newsletter_runs.metrics."""
+        with self._lock:
+            spans, calls, counters = list(self.spans), list(self.calls), dict(self.counters)
+        return {
+            **self.labels,
+            "started_at": self.started_at,
+            "total_seconds": round(self.elapsed(), 3),
+            "stages": self.stages(),
+            "tokens": self.tokens(),
+            "cost_usd": self.cost(),
+            "counters": counters,
+            "spans": spans,
+            "calls": calls,
+        }
+
+    def describe(self) -> str:
+        """One-line summary for the console."""
+        stages = ", ".join(f"{name} {seconds:.1f}s" for name, seconds in self.stages().items())
+        tokens = self.tokens()
+        return (
+            f"{stages or 'no stages'}; {tokens.get('input_tokens', 0)} in / "
+            f"{tokens.get('output_tokens', 0)} out tokens, ~${self.cost():.4f}"
+        )
+
+
+def current() -> RunTelemetry | None:
+    return _current.get()
+
+
+@contextmanager
+def collect(**labels):
+    """Make a new RunTelemetry current for the duration of the block."""
+    metrics = RunTelemetry(**labels)
+    token = _current.set(metrics)
+    try:
+        yield metrics
+    finally:
+        _current.reset(token)
+
+
+@contextmanager
+def span(name: str, **attrs):
+    """Time a block as a named span of the current run (no-op outside collect())."""
+    metrics = current()
+    if metrics is None:
+        yield
+        return
+    started = time.perf_counter()
+    try:
+        yield
+    except BaseException as e:
+        metrics.add_span(name, time.perf_counter() - started, error=type(e).__name__, **attrs)
+        raise
+    metrics.add_span(name, time.perf_counter() - started, **attrs)
+
+
+def incr(name: str, n: int = 1):
+    metrics = current()
+    if metrics is not None:
+        metrics.incr(name, n)
+
+
+def record_usage(label: str, response) -> dict | None:
+    """Record one model call's usage and estimated cost on the current run."""
+    usage = usage_from_response(response)
+    if usage is None:
+        return None
+    model = getattr(response, "model", None)
+    call = {"label": label, "model": model, "usage": usage, "cost_usd": cost_usd(model, usage)}
+    metrics = current()
+    if metrics is not None:
+        metrics.add_call(call)
+    return call
+
+
+def emit(event: str, labels: dict, data: dict):
+    """Write one JSON log line if config.TELEMETRY_JSON_LOG is set ("-" = stderr)."""
+    target = config.TELEMETRY_JSON_LOG
+    if not target:
+        return
+    line = json.dumps({
+        "ts": datetime.now(timezone.utc).isoformat(),
+        "event": event,
+        **labels,
+        **data,
+    }, default=str)
+    with _log_lock:
+        if target == "-":
+            print(line, file=sys.stderr)
+        else:
+            with open(target, "a", encoding="utf-8") as f:
+                f.write(line + "\n")
+
+
+def persist(client, run_id: str, metrics: RunTelemetry, **extra):
+    """Store the run's summary on newsletter_runs.metrics. Never raises."""
+    from . import supabase_client as db
+
+    summary = {**metrics.summary(), **extra}
+    emit("run", {}, {key: value for key, value in summary.items() if key not in ("spans", "calls")})
+    try:
+        db.save_run_metrics(client, run_id, summary)
+    except Exception as e:
+        print(f"  Could not store run metrics ({e})")
+
+
+def _on_retry_attempt(metric: dict):
+    """retry listener: count attempts per service and outcome (anthropic.ok, supabase.retry, ...)."""
+    incr(f"{metric['service']}.{metric['outcome']}")
+
+
+retry.add_listener(_on_retry_attempt)
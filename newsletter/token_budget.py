@@ -0,0 +1,118 @@
+"""
+Token budgets for the writing step.
+
+- Input: the research notes are the only part of the Sonnet prompt that
+  grows without bound. fit_notes() estimates the prompt size locally,
+  confirms with the count_tokens endpoint when it is close to
+  WRITING_INPUT_BUDGET, and trims the notes (longest sections first,
+  from the end) until the prompt fits.
+- Output: output_budget() sizes max_tokens from the number of sections in
+  the configured structure instead of one fixed cap.
+- Continuation: when a response still stops at max_tokens, the writing step
+  sends the text so far back as an assistant prefill and keeps streaming
+  (see claude_client.run_writing_step), instead of rerunning from scratch.
+"""
+
+import math
+import re
+
+from . import config
+
+CHARS_PER_TOKEN = 3.5  # conservative for English prose and markdown
+EXACT_COUNT_RATIO = 0.8  # call count_tokens only when the estimate is above this share of the budget
+_SECTION = re.compile(r'^##\s+', re.MULTILINE)
+
+
+def estimate_tokens(text: str) -> int:
+    return math.ceil(len(text or "") / CHARS_PER_TOKEN)
+
+
+def _request_text(request: dict) -> str:
+    parts = []
+    system = request.get("system")
+    if isinstance(system, str):
+        parts.append(system)
+    else:
+        parts.extend(block.get("text", "") for block in system or [])
+    for message in request.get("messages", []):
+        content = message["content"]
+        parts.append(content if isinstance(content, str) else " ".join(b.get("text", "") for b in content))
+    return "\n".join(parts)
+
+
+def estimate_request_tokens(request: dict) -> int:
+    return estimate_tokens(_request_text(request))
+
+
+def count_request_tokens(client, request: dict) -> int:
+    """Exact input tokens from the count_tokens endpoint; the local estimate if that fails."""
+    try:
+        result = client.messages.count_tokens(
+            model=request["model"], system=request.get("system"), messages=request["messages"],
+        )
+        return result.input_tokens
+    except Exception as e:
+        print(f"  Token count unavailable ({type(e).__name__}), using estimate")
+        return estimate_request_tokens(request)
+
+
+def _split_sections(notes: str) -> list[list[str]]:
+    """Lines grouped by "## " heading (a heading stays first in its group)."""
+    sections = [[]]
+    for line in notes.splitlines():
+        if _SECTION.match(line) and sections[-1]:
+            sections.append([])
+        sections[-1].append(line)
+    return sections
+
+
+def trim_notes(notes: str, max_tokens: int) -> str:
+    """
+    Shorten notes to about max_tokens: blank lines are collapsed, then lines
+    are dropped from the end of whichever section is longest, so every
+    section keeps its heading and first facts.
+    """
+    notes = re.sub(r'\n{3,}', '\n\n', notes.strip())
+    if estimate_tokens(notes) <= max_tokens:
+        return notes
+    sections = _split_sections(notes)
+    sizes = [sum(len(line) + 1 for line in section) for section in sections]
+    budget_chars = max_tokens * CHARS_PER_TOKEN
+    while sum(sizes) > budget_chars:
+        longest = max(range(len(sections)), key=lambda i: sizes[i])
+        if len(sections[longest]) <= 2:
+            break
+        sizes[longest] -= len(sections[longest].pop()) + 1
+    trimmed = "\n".join("\n".join(section).strip() for section in sections if section)
+    return trimmed[:int(budget_chars)].rstrip()
+
+
+def fit_notes(client, request_for, notes: str, budget: int = None) -> str:
+    """
+    Return notes trimmed so that request_for(notes) fits in `budget` input
+    tokens (default WRITING_INPUT_BUDGET). request_for builds the full
+    messages.create arguments around the notes.
+    """
+    budget = budget or config.WRITING_INPUT_BUDGET
+    total = estimate_request_tokens(request_for(notes))
+    if total <= budget * EXACT_COUNT_RATIO:
+        return notes
+    if client is not None:
+        total = count_request_tokens(client, request_for(notes))
+    if total <= budget:
+        return notes
+    over = total - budget
+    before = estimate_tokens(notes)
+    trimmed = trim_notes(notes, max(0, before - math.ceil(over * 1.1)))
+    print(
+        f"  Research notes trimmed from ~{before} to ~{estimate_tokens(trimmed)} tokens "
+        f"(prompt {total} > {budget}-token budget)"
+    )
+    return trimmed
+
+
+def output_budget(structure: str) -> int:
+    """max_tokens for a newsletter with this structure: a base plus a share per "## " section."""
+    sections = len(_SECTION.findall(structure or "")) or 4
+    tokens = config.WRITING_BASE_TOKENS + sections * config.WRITING_TOKENS_PER_SECTION
+    return max(config.MIN_WRITING_TOKENS, min(config.MAX_WRITING_TOKENS, tokens))
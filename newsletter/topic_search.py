@@ -0,0 +1,163 @@
+"""
+Speculative topic generation: request several topics at once and keep the best.
+
+generate_topic makes one call and falls back to a canned topic when the
+answer is unparseable, generic or a repeat. Here K requests go out
+concurrently (AsyncAnthropic), each nudged toward a different GTM area so
+the candidates differ. Answers are scored locally as they arrive: the first
+to reach TOPIC_GOOD_ENOUGH_SCORE wins and the outstanding requests are
+cancelled. Otherwise the best candidate scoring at least TOPIC_MIN_SCORE is
+used, and the canned fallback only when none qualifies.
+"""
+
+import asyncio
+import random
+
+from . import config
+from . import claude_client as claude
+from . import retry
+from . import telemetry
+from .similarity import jaccard, shingles
+
+# Words that make a topic a category label rather than a concrete subject
+VAGUE_WORDS = {
+    "tips", "trends", "trend", "strategies", "strategy", "insights", "update", "updates",
+    "news", "roundup", "best", "practices", "guide", "things", "overview", "future",
+    "state", "essentials", "basics", "everything", "matters", "world",
+}
+
+
+def score_topic(candidate: dict, recent_topics: list[str] = None, is_duplicate=None) -> tuple[float, str]:
+    """
+    Score a {"topic", "description"} candidate from 0 to 1:
+    30% length (3-6 words), 40% specificity (no vague words, a real
+    description), 30% novelty against recent topics. Generic phrases and
+    near-duplicates of past topics score 0. Returns (score, note).
+    """
+    topic = (candidate.get("topic") or "").strip()
+    if not topic:
+        return 0.0, "empty"
+    if claude.is_generic_topic(topic):
+        return 0.0, "generic"
+    duplicate = is_duplicate(topic) if is_duplicate else None
+    if duplicate:
+        return 0.0, f"repeats {duplicate[0]!r}"
+
+    words = topic.split()
+    distance = 3 - len(words) if len(words) < 3 else max(0, len(words) - 6)
+    length = max(0.0, 1 - 0.25 * distance)
+
+    vague = [w for w in words if w.lower().strip(":,.-") in VAGUE_WORDS]
+    specificity = max(0.0, 1 - 0.35 * len(vague))
+    if len(candidate.get("description") or "") < 40:
+        specificity *= 0.8
+
+    topic_shingles = shingles(topic)
+    overlap = max((jaccard(topic_shingles, shingles(t)) for t in recent_topics or []), default=0.0)
+    novelty = 1 - overlap
+
+    notes = []
+    if distance:
+        notes.append(f"{len(words)} words")
+    if vague:
+        notes.append("vague: " + ", ".join(vague))
+    if overlap >= 0.3:
+        notes.append(f"{overlap:.2f} overlap with a recent topic")
+    return round(0.3 * length + 0.4 * specificity + 0.3 * novelty, 3), "; ".join(notes)
+
+
+def candidate_focuses(candidates: int) -> list[str | None]:
+    """No focus for the first candidate, a different GTM area for each of the rest."""
+    areas = random.sample(claude.TOPIC_AREAS, min(candidates - 1, len(claude.TOPIC_AREAS)))
+    return ([None] + areas + [None] * candidates)[:candidates]
+
+
+async def _request_candidate(client, prompt: str, index: int) -> dict | None:
+    async def make_request():
+        return await client.messages.create(**claude.topic_request(prompt))
+
+    response = await retry.call_with_retry_async(make_request, service="anthropic")
+    claude.log_usage(f"Topic candidate {index}", response)
+    return claude.parse_topic_response(response)
+
+
+async def generate_topic_async(
+    newsletter_config: dict | None = None,
+    recent_topics: list[str] = None,
+    is_duplicate=None,
+    candidates: int = None,
+    good_enough: float = None,
+    min_score: float = None,
+    timeout: float = None,
+    client=None,
+) -> dict:
+    """
+    Request `candidates` topics concurrently and return the best one (see module docstring).
+    timeout bounds the whole search; client defaults to claude.get_async_client().
+    """
+    candidates = candidates or max(2, config.TOPIC_CANDIDATES)
+    good_enough = config.TOPIC_GOOD_ENOUGH_SCORE if good_enough is None else good_enough
+    min_score = config.TOPIC_MIN_SCORE if min_score is None else min_score
+
+    print(f"  Requesting {candidates} topic candidates...")
+    own_client = client is None
+    client = client or claude.get_async_client()
+    tasks = [
+        asyncio.create_task(_request_candidate(
+            client, claude.build_topic_prompt(newsletter_config, recent_topics, focus), i + 1,
+        ))
+        for i, focus in enumerate(candidate_focuses(candidates))
+    ]
+    best_score, best = -1.0, None
+    try:
+        for next_done in asyncio.as_completed(tasks, timeout=timeout):
+            try:
+                result = await next_done
+            except Exception as e:
+                print(f"  Topic candidate failed: {e}")
+                continue
+            if result is None:
+                continue
+            score, note = score_topic(result, recent_topics, is_duplicate)
+            print(f"  Candidate: {result['topic']} (score {score:.2f}{f'; {note}' if note else ''})")
+            if score > best_score:
+                best_score, best = score, result
+            if score >= good_enough:
+                break
+    except TimeoutError:
+        print(f"  Topic search timed out after {timeout}s")
+    finally:
+        pending = [t for t in tasks if not t.done()]
+        for task in pending:
+            task.cancel()
+        await asyncio.gather(*pending, return_exceptions=True)
+        if pending:
+            print(f"  Cancelled {len(pending)} outstanding topic request(s)")
+            telemetry.incr("topic.cancelled", len(pending))
+        if own_client:
+            await client.close()
+
+    if best is not None and best_score >= min_score:
+        print(f"  Generated topic: {best['topic']} (score {best_score:.2f})")
+        return best
+    return claude.fallback_topic(is_duplicate)
+
+
+def generate_topic_speculative(
+    newsletter_config: dict | None = None,
+    recent_topics: list[str] = None,
+    is_duplicate=None,
+    candidates: int = None,
+    good_enough: float = None,
+    min_score: float = None,
+    timeout: float = None,
+    runner=None,
+) -> dict:
+    """Blocking wrapper around generate_topic_async (on runner's loop and client when given)."""
+    return claude.run_async(
+        lambda client: generate_topic_async(
+            newsletter_config, recent_topics, is_duplicate, candidates, good_enough, min_score, timeout,
+            client=client,
+        ),
+        runner,
+    )
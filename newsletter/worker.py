@@ -0,0 +1,329 @@
+"""
+Worker mode: a long-running process that generates queued issues.
+
+    python -m newsletter.worker                   # run until SIGTERM / Ctrl-C
+    python -m newsletter.worker --once            # drain the queue, then exit
+    python -m newsletter.worker --enqueue all     # queue one run per newsletter
+
+A queued run is a newsletter_runs row with queued_at set (enqueue_run, or
+the enqueue_newsletter_run database function from the admin UI). The
+worker claims queued runs (claim_newsletter_run, FOR UPDATE SKIP LOCKED),
+at most WORKER_CONCURRENCY at a time, and runs them through generate_issue
+with the Supabase and Anthropic clients, research cache and similarity
+index it created at startup, so a job starts in seconds with warm
+connections instead of a fresh Actions runner. The async Anthropic calls
+(parallel research, topic search, hedged requests) of every run share one
+event loop and client (claude.AsyncRunner), so they keep their connections
+warm too.
+
+While a run is in progress its heartbeat_at is refreshed every
+WORKER_HEARTBEAT_SECONDS. If the worker dies, the heartbeat goes stale and
+another worker reclaims the run and resumes it from its last checkpoint.
+A worker that finds its run reclaimed (it was only slow) stops that run
+before its next stage. SIGTERM stops claiming, waits up to
+WORKER_SHUTDOWN_GRACE_SECONDS for in-flight runs, then hands any unfinished
+ones back to the queue without counting the attempt.
+"""
+
+import argparse
+import os
+import signal
+import socket
+import sys
+import threading
+import time
+import uuid
+
+from . import config
+from . import supabase_client as db
+from . import claude_client as claude
+from . import hedging
+from . import research_cache
+from . import similarity
+from . import storage
+from .main import RunCancelled, generate_issue, release_claims
+
+HISTORY_SYNC_SECONDS = 600  # how often an idle worker pulls new topics/tools into the similarity index
+
+
+class Worker:
+    """Claims queued runs and generates them on up to `concurrency` threads."""
+
+    def __init__(self, supabase, anthropic, concurrency: int = None, cache=None, history=None,
+                 worker_id: str = None, runner=None):
+        self.supabase = supabase
+        self.anthropic = anthropic
+        self.cache = cache
+        self.history = history
+        self.runner = runner
+        self.concurrency = max(1, concurrency or config.WORKER_CONCURRENCY)
+        self.worker_id = worker_id or f"{socket.gethostname()}-{os.getpid()}-{uuid.uuid4().hex[:6]}"
+        self.slots = threading.BoundedSemaphore(self.concurrency)
+        self.active: dict[str, threading.Thread] = {}
+        self.cancelled: dict[str, threading.Event] = {}  # set when another worker takes the run over
+        self.lock = threading.Lock()
+        self.stopping = threading.Event()
+        self.results: list[dict] = []
+        self._history_synced = time.monotonic()
+
+    def stop(self):
+        """Stop claiming new runs; in-flight runs carry on."""
+        if not self.stopping.is_set():
+            print(f"[worker {self.worker_id}] Stopping, {len(self.active)} run(s) in progress")
+        self.stopping.set()
+
+    def claim(self) -> dict | None:
+        """Claim the next queued run, or None when the queue is empty."""
+        return db.claim_queued_run(self.supabase, self.worker_id, stale_seconds=config.WORKER_STALE_SECONDS)
+
+    def start(self, run_record: dict):
+        """Process a claimed run on its own thread (the caller holds a slot)."""
+        thread = threading.Thread(
+            target=self._process, args=(run_record,),
+            name=f"run-{run_record['id'][:8]}", daemon=True,
+        )
+        with self.lock:
+            self.active[run_record["id"]] = thread
+            self.cancelled[run_record["id"]] = threading.Event()
+        thread.start()
+
+    def _process(self, run_record: dict):
+        run_id = run_record["id"]
+        started = time.monotonic()
+        try:
+            result = self._generate(run_record)
+            result["status"] = "ok"
+        except RunCancelled as e:
+            result = {"run_id": run_id, "status": "cancelled", "error": str(e)}
+        except Exception as e:
+            result = {"run_id": run_id, "status": "failed", "error": str(e)}
+        result["seconds"] = round(time.monotonic() - started, 1)
+        with self.lock:
+            self.results.append(result)
+            self.active.pop(run_id, None)
+            self.cancelled.pop(run_id, None)
+        self.slots.release()
+
+    def _generate(self, run_record: dict) -> dict:
+        run_id = run_record["id"]
+        attempts = run_record.get("attempts") or 1
+        if attempts > config.WORKER_MAX_ATTEMPTS:
+            message = f"Gave up after {attempts - 1} attempts (worker stopped heartbeating each time)"
+            print(f"[worker] Run {run_id}: {message}")
+            release_claims(self.supabase, run_id)
+            db.fail_run(self.supabase, run_id, message)
+            raise RuntimeError(message)
+
+        newsletter_id = run_record.get("newsletter_id")
+        if newsletter_id:
+            newsletter_config = db.get_newsletter_config_by_id(self.supabase, newsletter_id)
+        else:
+            newsletter_config = db.get_newsletter_config(self.supabase)
+        run_record = claim_run_backlog(self.supabase, run_record)
+        return generate_issue(
+            self.supabase, self.anthropic, newsletter_config,
+            run_record=run_record, cache=self.cache, history=self.history,
+            cancelled=self.cancelled.get(run_id), runner=self.runner,
+        )
+
+    def heartbeat(self):
+        """
+        Refresh the heartbeat on in-flight runs. A run another worker took over
+        (our heartbeat went stale) is cancelled: it stops before its next stage,
+        so two workers never both publish it.
+        """
+        with self.lock:
+            run_ids = list(self.active)
+        if not run_ids:
+            return
+        try:
+            held = db.heartbeat_runs(self.supabase, self.worker_id, run_ids)
+        except Exception as e:
+            print(f"[worker] Heartbeat failed ({e})")
+            return
+        for run_id in set(run_ids) - held:
+            with self.lock:
+                cancelled = self.cancelled.get(run_id)
+            if cancelled is not None and not cancelled.is_set():
+                print(f"[worker] Run {run_id} is no longer held by this worker (heartbeat went stale), cancelling it")
+                cancelled.set()
+
+    def _heartbeat_loop(self, done: threading.Event):
+        while not done.wait(config.WORKER_HEARTBEAT_SECONDS):
+            self.heartbeat()
+
+    def _sync_history(self):
+        """Pull issues published elsewhere into the similarity index, between runs only."""
+        if self.history is None or time.monotonic() - self._history_synced < HISTORY_SYNC_SECONDS:
+            return
+        self._history_synced = time.monotonic()
+        try:
+            if self.history.sync(self.supabase):
+                self.history.save()
+        except Exception as e:
+            print(f"  Similarity index sync failed ({e})")
+
+    def run(self, once: bool = False) -> list[dict]:
+        """
+        Claim and process runs until stop() (or, with once, until the queue is
+        empty). Returns one result dict per run processed.
+        """
+        print(f"[worker {self.worker_id}] Waiting for queued runs (concurrency {self.concurrency})")
+        heartbeat_done = threading.Event()
+        heartbeat = threading.Thread(target=self._heartbeat_loop, args=(heartbeat_done,), daemon=True)
+        heartbeat.start()
+        delay = config.WORKER_POLL_SECONDS
+        try:
+            while not self.stopping.is_set():
+                if not self.slots.acquire(timeout=config.WORKER_POLL_SECONDS):
+                    continue
+                if not self.active:
+                    self._sync_history()
+                try:
+                    run_record = None if self.stopping.is_set() else self.claim()
+                except Exception as e:
+                    print(f"[worker] Claim failed ({e})")
+                    run_record = None
+                if run_record:
+                    print(f"[worker] Claimed run {run_record['id']} (attempt {run_record.get('attempts') or 1})")
+                    self.start(run_record)
+                    delay = config.WORKER_POLL_SECONDS
+                    continue
+                self.slots.release()
+                if once and not self.active:
+                    break
+                # Back off while the queue stays empty
+                self.stopping.wait(delay)
+                delay = min(delay * 2, config.WORKER_MAX_POLL_SECONDS)
+        finally:
+            unfinished = self.drain(config.WORKER_SHUTDOWN_GRACE_SECONDS if not once else None)
+            heartbeat_done.set()
+            if unfinished:
+                print(f"[worker] Handing {len(unfinished)} unfinished run(s) back to the queue")
+                with self.lock:
+                    for run_id in unfinished:
+                        self.cancelled[run_id].set()
+                try:
+                    db.release_runs(self.supabase, self.worker_id, unfinished)
+                except Exception as e:
+                    print(f"[worker] Release failed ({e}), runs will be reclaimed once their heartbeat is stale")
+        return self.results
+
+    def drain(self, timeout: float = None) -> list[str]:
+        """Wait for in-flight runs (up to timeout seconds); returns the ids still running."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            with self.lock:
+                threads = list(self.active.values())
+            if not threads:
+                return []
+            remaining = None if deadline is None else deadline - time.monotonic()
+            if remaining is not None and remaining <= 0:
+                with self.lock:
+                    return list(self.active)
+            threads[0].join(timeout=remaining)
+
+
+def claim_run_backlog(supabase, run_record: dict) -> dict:
+    """
+    Claim backlog items for a queued run that has none yet (db.claim_backlog
+    writes their ids to the run). Runs queued with a topic, or reclaimed after
+    they already claimed, keep what they have. Workers run concurrently, so
+    a failed claim fails the run rather than falling back to unclaimed items.
+    """
+    if run_record.get("topic_id") or run_record.get("tech_id") or run_record.get("tip_ids"):
+        return run_record
+    claimed = db.claim_backlog(
+        supabase, run_record["id"], lease_seconds=config.BACKLOG_LEASE_MINUTES * 60
+    )
+    return {
+        **run_record,
+        "topic_id": claimed["topic"]["id"] if claimed["topic"] else None,
+        "tech_id": claimed["tech"]["id"] if claimed["tech"] else None,
+        "tip_ids": [t["id"] for t in claimed["tips"]],
+    }
+
+
+def enqueue(supabase, target: str) -> list[dict]:
+    """Queue one run for a newsletter id, or for every newsletter with "all"."""
+    if target == "all":
+        newsletter_ids = [c["id"] for c in db.get_newsletter_configs(supabase)]
+    else:
+        newsletter_ids = [target]
+    runs = [db.enqueue_run(supabase, newsletter_id) for newsletter_id in newsletter_ids]
+    for run in runs:
+        print(f"Queued run {run['id']} (Issue #{run.get('issue_number')})")
+    return runs
+
+
+def install_signal_handlers(worker: Worker):
+    """SIGTERM/SIGINT stop the worker gracefully; a second signal exits at once."""
+    def handle(signum, frame):
+        if worker.stopping.is_set():
+            print("[worker] Second signal, exiting without waiting")
+            with worker.lock:
+                unfinished = list(worker.active)
+            try:
+                db.release_runs(worker.supabase, worker.worker_id, unfinished)
+            finally:
+                os._exit(1)
+        worker.stop()
+
+    signal.signal(signal.SIGTERM, handle)
+    signal.signal(signal.SIGINT, handle)
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Generate queued newsletter runs as they arrive.")
+    parser.add_argument(
+        "--concurrency", type=int, default=config.WORKER_CONCURRENCY,
+        help=f"Maximum runs processed at once (default {config.WORKER_CONCURRENCY})",
+    )
+    parser.add_argument("--once", action="store_true", help="Exit once the queue is empty")
+    parser.add_argument(
+        "--enqueue", metavar="NEWSLETTER_ID",
+        help='Queue a run for this newsletter ("all" = every newsletter) and exit',
+    )
+    parser.add_argument(
+        "--no-cache", action="store_true",
+        help="Always run the research step instead of reusing cached research notes",
+    )
+    return parser.parse_args(argv)
+
+
+def run(argv=None):
+    args = parse_args(argv)
+    try:
+        config.validate_config()
+    except ValueError as e:
+        print(f"Configuration error: {e}")
+        sys.exit(1)
+
+    supabase = storage.get_client()
+    if args.enqueue:
+        enqueue(supabase, args.enqueue)
+        return
+
+    anthropic = claude.get_client()
+    cache = None if args.no_cache else research_cache.get_cache(supabase)
+    history = similarity.load_history(supabase)
+    hedging.configure(supabase)
+    runner = claude.AsyncRunner()
+    worker = Worker(supabase, anthropic, args.concurrency, cache=cache, history=history, runner=runner)
+    install_signal_handlers(worker)
+    try:
+        results = worker.run(once=args.once)
+    finally:
+        with worker.lock:
+            unfinished = bool(worker.active)
+        if not unfinished:
+            # Runs handed back to the queue may still be finishing a call on
+            # the loop; they stop at their next stage, and exit ends them
+            runner.close()
+
+    ok = sum(1 for r in results if r["status"] == "ok")
+    print(f"[worker {worker.worker_id}] Stopped: {ok}/{len(results)} runs generated")
+
+
+if __name__ == "__main__":
+    run()
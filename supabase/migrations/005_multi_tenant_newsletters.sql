@@ -0,0 +1,23 @@
+-- Multi-Tenant Newsletters
+-- Each newsletter_config row is a separately branded newsletter. Runs are
+-- tagged with the newsletter they belong to so issue numbers and history
+-- stay per-newsletter. Backlogs (topics, tech, tips) remain a shared pool.
+
+-- Issue numbering offset per newsletter (issues published before this system)
+ALTER TABLE newsletter_config ADD COLUMN IF NOT EXISTS starting_issue INTEGER NOT NULL DEFAULT 1;
+
+ALTER TABLE newsletter_runs ADD COLUMN IF NOT EXISTS issue_number INTEGER;
+ALTER TABLE newsletter_runs ADD COLUMN IF NOT EXISTS newsletter_id UUID REFERENCES newsletter_config(id);
+
+-- Index for per-newsletter run history and issue counting
+CREATE INDEX IF NOT EXISTS idx_newsletter_runs_newsletter_status
+ON newsletter_runs(newsletter_id, status);
+
+-- Backfill: existing runs and numbering belong to the original FYI GTM newsletter
+UPDATE newsletter_config SET starting_issue = 86
+WHERE id = (SELECT id FROM newsletter_config ORDER BY created_at ASC LIMIT 1);
+
+UPDATE newsletter_runs SET newsletter_id = (
+    SELECT id FROM newsletter_config ORDER BY created_at ASC LIMIT 1
+)
+WHERE newsletter_id IS NULL;
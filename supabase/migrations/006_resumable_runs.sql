@@ -0,0 +1,18 @@
+-- Resumable Runs
+-- Every pipeline stage checkpoints its output on the run row so a failed run
+-- can be resumed from the first unfinished stage:
+--   topic_id            → topic chosen or generated
+--   research_brief      → research notes (Haiku + web search)
+--   newsletter_content  → written newsletter (Sonnet)
+--   html_content        → rendered email HTML
+--   beehiiv_post_id     → Kit broadcast id
+-- tech_id and tip_ids record the backlog items the run was started with.
+
+ALTER TABLE newsletter_runs ADD COLUMN IF NOT EXISTS tech_id UUID REFERENCES tech_backlog(id);
+ALTER TABLE newsletter_runs ADD COLUMN IF NOT EXISTS tip_ids UUID[];
+ALTER TABLE newsletter_runs ADD COLUMN IF NOT EXISTS html_content TEXT;
+
+-- Index for finding the latest failed run to resume
+CREATE INDEX IF NOT EXISTS idx_newsletter_runs_failed
+ON newsletter_runs(newsletter_id, created_at DESC)
+WHERE status = 'failed';
@@ -0,0 +1,12 @@
+-- Research Cache
+-- Research notes keyed by a hash of the research model and exact prompt.
+-- Entries older than RESEARCH_CACHE_TTL_HOURS are ignored and overwritten.
+CREATE TABLE IF NOT EXISTS research_cache (
+    key TEXT PRIMARY KEY,           -- sha256(model + prompt)
+    model TEXT,
+    notes TEXT NOT NULL,
+    created_at TIMESTAMPTZ DEFAULT NOW()
+);
+
+-- Index for pruning stale entries
+CREATE INDEX IF NOT EXISTS idx_research_cache_created ON research_cache(created_at);
@@ -0,0 +1,91 @@
+-- Run Snapshot
+-- Everything the pipeline reads before its first model call, returned as one
+-- JSON document so a run starts with a single round-trip:
+--   config, topic, tech, tips, recent_topics, recent_tech, next_issue_number
+-- The exclude arrays skip backlog items already reserved by concurrent runs.
+CREATE OR REPLACE FUNCTION newsletter_run_snapshot(
+    p_newsletter_id UUID DEFAULT NULL,
+    p_tip_count INTEGER DEFAULT 2,
+    p_recent_limit INTEGER DEFAULT 8,
+    p_exclude_topic_ids UUID[] DEFAULT '{}',
+    p_exclude_tech_ids UUID[] DEFAULT '{}',
+    p_exclude_tip_ids UUID[] DEFAULT '{}'
+)
+RETURNS JSONB
+LANGUAGE plpgsql
+STABLE
+AS $$
+DECLARE
+    v_config newsletter_config;
+BEGIN
+    SELECT * INTO v_config
+    FROM newsletter_config
+    WHERE p_newsletter_id IS NULL OR id = p_newsletter_id
+    ORDER BY created_at ASC
+    LIMIT 1;
+
+    RETURN jsonb_build_object(
+        'config', CASE WHEN v_config.id IS NULL THEN NULL ELSE to_jsonb(v_config) END,
+
+        'topic', (
+            SELECT to_jsonb(t)
+            FROM newsletter_topics t
+            WHERE t.active = true
+              AND t.used_at IS NULL
+              AND NOT (t.id = ANY(p_exclude_topic_ids))
+            ORDER BY t.priority DESC, t.created_at ASC
+            LIMIT 1
+        ),
+
+        'tech', (
+            SELECT to_jsonb(b)
+            FROM tech_backlog b
+            WHERE b.used_at IS NULL
+              AND NOT (b.id = ANY(p_exclude_tech_ids))
+            ORDER BY b.created_at ASC
+            LIMIT 1
+        ),
+
+        'tips', COALESCE((
+            SELECT jsonb_agg(to_jsonb(x) ORDER BY x.created_at)
+            FROM (
+                SELECT *
+                FROM tips_backlog
+                WHERE used_at IS NULL
+                  AND NOT (id = ANY(p_exclude_tip_ids))
+                ORDER BY created_at ASC
+                LIMIT p_tip_count
+            ) x
+        ), '[]'::jsonb),
+
+        'recent_topics', COALESCE((
+            SELECT jsonb_agg(r.topic ORDER BY r.used_at DESC)
+            FROM (
+                SELECT topic, used_at
+                FROM newsletter_topics
+                WHERE active = true AND used_at IS NOT NULL
+                ORDER BY used_at DESC
+                LIMIT p_recent_limit
+            ) r
+        ), '[]'::jsonb),
+
+        'recent_tech', COALESCE((
+            SELECT jsonb_agg(r.name ORDER BY r.used_at DESC)
+            FROM (
+                SELECT name, used_at
+                FROM tech_backlog
+                WHERE used_at IS NOT NULL
+                ORDER BY used_at DESC
+                LIMIT p_recent_limit
+            ) r
+        ), '[]'::jsonb),
+
+        'next_issue_number', COALESCE(v_config.starting_issue, 86) + (
+            SELECT count(*)
+            FROM newsletter_runs
+            WHERE status = 'published'
+              AND (v_config.id IS NULL OR newsletter_id = v_config.id)
+        )
+    );
+END;
+$$;
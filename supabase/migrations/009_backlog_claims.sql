@@ -0,0 +1,184 @@
+-- Backlog Claims
+-- Concurrent runs reserve backlog items atomically instead of reading them
+-- and marking them used minutes later. A claim is a lease: if the run
+-- crashes, the items return to the pool once claimed_until passes.
+
+ALTER TABLE newsletter_topics ADD COLUMN IF NOT EXISTS claimed_by UUID;
+ALTER TABLE newsletter_topics ADD COLUMN IF NOT EXISTS claimed_until TIMESTAMPTZ;
+ALTER TABLE tech_backlog ADD COLUMN IF NOT EXISTS claimed_by UUID;
+ALTER TABLE tech_backlog ADD COLUMN IF NOT EXISTS claimed_until TIMESTAMPTZ;
+ALTER TABLE tips_backlog ADD COLUMN IF NOT EXISTS claimed_by UUID;
+ALTER TABLE tips_backlog ADD COLUMN IF NOT EXISTS claimed_until TIMESTAMPTZ;
+
+-- Claim the next topic, tech and tips for a run in one transaction.
+-- FOR UPDATE SKIP LOCKED lets concurrent callers claim different rows
+-- without blocking each other. The claimed ids are also written to the run.
+CREATE OR REPLACE FUNCTION claim_backlog(
+    p_run_id UUID,
+    p_tip_count INTEGER DEFAULT 2,
+    p_lease_seconds INTEGER DEFAULT 3600
+)
+RETURNS JSONB
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    v_until TIMESTAMPTZ := NOW() + make_interval(secs => p_lease_seconds);
+    v_topic JSONB;
+    v_tech JSONB;
+    v_tips JSONB;
+BEGIN
+    UPDATE newsletter_topics t
+    SET claimed_by = p_run_id, claimed_until = v_until
+    WHERE t.id = (
+        SELECT id FROM newsletter_topics
+        WHERE active = true
+          AND used_at IS NULL
+          AND (claimed_until IS NULL OR claimed_until < NOW() OR claimed_by = p_run_id)
+        ORDER BY priority DESC, created_at ASC
+        LIMIT 1
+        FOR UPDATE SKIP LOCKED
+    )
+    RETURNING to_jsonb(t) INTO v_topic;
+
+    UPDATE tech_backlog b
+    SET claimed_by = p_run_id, claimed_until = v_until
+    WHERE b.id = (
+        SELECT id FROM tech_backlog
+        WHERE used_at IS NULL
+          AND (claimed_until IS NULL OR claimed_until < NOW() OR claimed_by = p_run_id)
+        ORDER BY created_at ASC
+        LIMIT 1
+        FOR UPDATE SKIP LOCKED
+    )
+    RETURNING to_jsonb(b) INTO v_tech;
+
+    WITH claimed AS (
+        UPDATE tips_backlog t
+        SET claimed_by = p_run_id, claimed_until = v_until
+        WHERE t.id IN (
+            SELECT id FROM tips_backlog
+            WHERE used_at IS NULL
+              AND (claimed_until IS NULL OR claimed_until < NOW() OR claimed_by = p_run_id)
+            ORDER BY created_at ASC
+            LIMIT p_tip_count
+            FOR UPDATE SKIP LOCKED
+        )
+        RETURNING t.*
+    )
+    SELECT COALESCE(jsonb_agg(to_jsonb(claimed) ORDER BY claimed.created_at), '[]'::jsonb)
+    INTO v_tips
+    FROM claimed;
+
+    UPDATE newsletter_runs
+    SET topic_id = (v_topic->>'id')::UUID,
+        tech_id = (v_tech->>'id')::UUID,
+        tip_ids = ARRAY(SELECT (tip->>'id')::UUID FROM jsonb_array_elements(v_tips) tip)
+    WHERE id = p_run_id;
+
+    RETURN jsonb_build_object('topic', v_topic, 'tech', v_tech, 'tips', v_tips);
+END;
+$$;
+
+-- Return a run's unused claims to the pool early
+CREATE OR REPLACE FUNCTION release_backlog_claims(p_run_id UUID)
+RETURNS VOID
+LANGUAGE sql
+AS $$
+    UPDATE newsletter_topics SET claimed_by = NULL, claimed_until = NULL
+    WHERE claimed_by = p_run_id AND used_at IS NULL;
+    UPDATE tech_backlog SET claimed_by = NULL, claimed_until = NULL
+    WHERE claimed_by = p_run_id AND used_at IS NULL;
+    UPDATE tips_backlog SET claimed_by = NULL, claimed_until = NULL
+    WHERE claimed_by = p_run_id AND used_at IS NULL;
+$$;
+
+-- The snapshot previews only items nobody holds a live claim on
+CREATE OR REPLACE FUNCTION newsletter_run_snapshot(
+    p_newsletter_id UUID DEFAULT NULL,
+    p_tip_count INTEGER DEFAULT 2,
+    p_recent_limit INTEGER DEFAULT 8,
+    p_exclude_topic_ids UUID[] DEFAULT '{}',
+    p_exclude_tech_ids UUID[] DEFAULT '{}',
+    p_exclude_tip_ids UUID[] DEFAULT '{}'
+)
+RETURNS JSONB
+LANGUAGE plpgsql
+STABLE
+AS $$
+DECLARE
+    v_config newsletter_config;
+BEGIN
+    SELECT * INTO v_config
+    FROM newsletter_config
+    WHERE p_newsletter_id IS NULL OR id = p_newsletter_id
+    ORDER BY created_at ASC
+    LIMIT 1;
+
+    RETURN jsonb_build_object(
+        'config', CASE WHEN v_config.id IS NULL THEN NULL ELSE to_jsonb(v_config) END,
+
+        'topic', (
+            SELECT to_jsonb(t)
+            FROM newsletter_topics t
+            WHERE t.active = true
+              AND t.used_at IS NULL
+              AND (t.claimed_until IS NULL OR t.claimed_until < NOW())
+              AND NOT (t.id = ANY(p_exclude_topic_ids))
+            ORDER BY t.priority DESC, t.created_at ASC
+            LIMIT 1
+        ),
+
+        'tech', (
+            SELECT to_jsonb(b)
+            FROM tech_backlog b
+            WHERE b.used_at IS NULL
+              AND (b.claimed_until IS NULL OR b.claimed_until < NOW())
+              AND NOT (b.id = ANY(p_exclude_tech_ids))
+            ORDER BY b.created_at ASC
+            LIMIT 1
+        ),
+
+        'tips', COALESCE((
+            SELECT jsonb_agg(to_jsonb(x) ORDER BY x.created_at)
+            FROM (
+                SELECT *
+                FROM tips_backlog
+                WHERE used_at IS NULL
+                  AND (claimed_until IS NULL OR claimed_until < NOW())
+                  AND NOT (id = ANY(p_exclude_tip_ids))
+                ORDER BY created_at ASC
+                LIMIT p_tip_count
+            ) x
+        ), '[]'::jsonb),
+
+        'recent_topics', COALESCE((
+            SELECT jsonb_agg(r.topic ORDER BY r.used_at DESC)
+            FROM (
+                SELECT topic, used_at
+                FROM newsletter_topics
+                WHERE active = true AND used_at IS NOT NULL
+                ORDER BY used_at DESC
+                LIMIT p_recent_limit
+            ) r
+        ), '[]'::jsonb),
+
+        'recent_tech', COALESCE((
+            SELECT jsonb_agg(r.name ORDER BY r.used_at DESC)
+            FROM (
+                SELECT name, used_at
+                FROM tech_backlog
+                WHERE used_at IS NOT NULL
+                ORDER BY used_at DESC
+                LIMIT p_recent_limit
+            ) r
+        ), '[]'::jsonb),
+
+        'next_issue_number', COALESCE(v_config.starting_issue, 86) + (
+            SELECT count(*)
+            FROM newsletter_runs
+            WHERE status = 'published'
+              AND (v_config.id IS NULL OR newsletter_id = v_config.id)
+        )
+    );
+END;
+$$;
@@ -0,0 +1,178 @@
+-- Issue Counters
+-- Issue numbers are allocated from a per-newsletter counter when the run is
+-- created, instead of counting every published run. Allocation is a single
+-- row update (constant time) and the row lock makes it race-free, so
+-- concurrent runs can never share a number. A run keeps its number if it
+-- fails, so --resume publishes it under the same issue.
+
+CREATE TABLE IF NOT EXISTS newsletter_issue_counters (
+    newsletter_id UUID PRIMARY KEY REFERENCES newsletter_config(id) ON DELETE CASCADE,
+    last_issue INTEGER NOT NULL,    -- Highest issue number handed out
+    updated_at TIMESTAMPTZ DEFAULT NOW()
+);
+
+-- Backfill counters: the higher of the largest number already assigned and
+-- what the old count-based scheme would hand out next, minus one
+INSERT INTO newsletter_issue_counters (newsletter_id, last_issue)
+SELECT
+    c.id,
+    GREATEST(
+        COALESCE(MAX(r.issue_number), 0),
+        c.starting_issue - 1 + COUNT(r.id) FILTER (WHERE r.status = 'published')
+    )
+FROM newsletter_config c
+LEFT JOIN newsletter_runs r ON r.newsletter_id = c.id
+GROUP BY c.id, c.starting_issue
+ON CONFLICT (newsletter_id) DO NOTHING;
+
+-- The old scheme reused numbers after failures, and two runs racing could
+-- both publish under the same number. Keep each number on one run and clear
+-- it from the others: the earliest published run, or if none was published
+-- the latest attempt. Later published duplicates go out with no number (the
+-- broadcast already carries it) rather than a number readers never saw.
+UPDATE newsletter_runs r
+SET issue_number = NULL
+FROM (
+    SELECT
+        id,
+        ROW_NUMBER() OVER (
+            PARTITION BY newsletter_id, issue_number
+            ORDER BY
+                (status = 'published') DESC,
+                CASE WHEN status = 'published' THEN created_at END ASC,
+                created_at DESC,
+                id
+        ) AS keep_rank
+    FROM newsletter_runs
+    WHERE newsletter_id IS NOT NULL
+      AND issue_number IS NOT NULL
+) ranked
+WHERE r.id = ranked.id
+  AND ranked.keep_rank > 1;
+
+ALTER TABLE newsletter_runs
+ADD CONSTRAINT newsletter_runs_newsletter_issue_unique UNIQUE (newsletter_id, issue_number);
+
+-- Allocate the next issue number and create the run in one transaction
+CREATE OR REPLACE FUNCTION create_newsletter_run(
+    p_newsletter_id UUID,
+    p_topic_id UUID DEFAULT NULL,
+    p_tech_id UUID DEFAULT NULL,
+    p_tip_ids UUID[] DEFAULT NULL
+)
+RETURNS JSONB
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    v_issue INTEGER;
+    v_run newsletter_runs;
+BEGIN
+    INSERT INTO newsletter_issue_counters (newsletter_id, last_issue)
+    SELECT id, starting_issue FROM newsletter_config WHERE id = p_newsletter_id
+    ON CONFLICT (newsletter_id) DO UPDATE
+        SET last_issue = newsletter_issue_counters.last_issue + 1,
+            updated_at = NOW()
+    RETURNING last_issue INTO v_issue;
+
+    IF v_issue IS NULL THEN
+        RAISE EXCEPTION 'Unknown newsletter: %', p_newsletter_id;
+    END IF;
+
+    INSERT INTO newsletter_runs (status, newsletter_id, issue_number, topic_id, tech_id, tip_ids)
+    VALUES ('pending', p_newsletter_id, v_issue, p_topic_id, p_tech_id, p_tip_ids)
+    RETURNING * INTO v_run;
+
+    RETURN to_jsonb(v_run);
+END;
+$$;
+
+-- Snapshot reads the next issue number from the counter
+CREATE OR REPLACE FUNCTION newsletter_run_snapshot(
+    p_newsletter_id UUID DEFAULT NULL,
+    p_tip_count INTEGER DEFAULT 2,
+    p_recent_limit INTEGER DEFAULT 8,
+    p_exclude_topic_ids UUID[] DEFAULT '{}',
+    p_exclude_tech_ids UUID[] DEFAULT '{}',
+    p_exclude_tip_ids UUID[] DEFAULT '{}'
+)
+RETURNS JSONB
+LANGUAGE plpgsql
+STABLE
+AS $$
+DECLARE
+    v_config newsletter_config;
+    v_last_issue INTEGER;
+BEGIN
+    SELECT * INTO v_config
+    FROM newsletter_config
+    WHERE p_newsletter_id IS NULL OR id = p_newsletter_id
+    ORDER BY created_at ASC
+    LIMIT 1;
+
+    SELECT last_issue INTO v_last_issue
+    FROM newsletter_issue_counters
+    WHERE newsletter_id = v_config.id;
+
+    RETURN jsonb_build_object(
+        'config', CASE WHEN v_config.id IS NULL THEN NULL ELSE to_jsonb(v_config) END,
+
+        'topic', (
+            SELECT to_jsonb(t)
+            FROM newsletter_topics t
+            WHERE t.active = true
+              AND t.used_at IS NULL
+              AND (t.claimed_until IS NULL OR t.claimed_until < NOW())
+              AND NOT (t.id = ANY(p_exclude_topic_ids))
+            ORDER BY t.priority DESC, t.created_at ASC
+            LIMIT 1
+        ),
+
+        'tech', (
+            SELECT to_jsonb(b)
+            FROM tech_backlog b
+            WHERE b.used_at IS NULL
+              AND (b.claimed_until IS NULL OR b.claimed_until < NOW())
+              AND NOT (b.id = ANY(p_exclude_tech_ids))
+            ORDER BY b.created_at ASC
+            LIMIT 1
+        ),
+
+        'tips', COALESCE((
+            SELECT jsonb_agg(to_jsonb(x) ORDER BY x.created_at)
+            FROM (
+                SELECT *
+                FROM tips_backlog
+                WHERE used_at IS NULL
+                  AND (claimed_until IS NULL OR claimed_until < NOW())
+                  AND NOT (id = ANY(p_exclude_tip_ids))
+                ORDER BY created_at ASC
+                LIMIT p_tip_count
+            ) x
+        ), '[]'::jsonb),
+
+        'recent_topics', COALESCE((
+            SELECT jsonb_agg(r.topic ORDER BY r.used_at DESC)
+            FROM (
+                SELECT topic, used_at
+                FROM newsletter_topics
+                WHERE active = true AND used_at IS NOT NULL
+                ORDER BY used_at DESC
+                LIMIT p_recent_limit
+            ) r
+        ), '[]'::jsonb),
+
+        'recent_tech', COALESCE((
+            SELECT jsonb_agg(r.name ORDER BY r.used_at DESC)
+            FROM (
+                SELECT name, used_at
+                FROM tech_backlog
+                WHERE used_at IS NOT NULL
+                ORDER BY used_at DESC
+                LIMIT p_recent_limit
+            ) r
+        ), '[]'::jsonb),
+
+        'next_issue_number', COALESCE(v_last_issue + 1, v_config.starting_issue, 86)
+    );
+END;
+$$;
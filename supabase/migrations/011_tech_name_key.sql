@@ -0,0 +1,72 @@
+-- Tech Name Keys
+-- Tool names arrive in many spellings ("HubSpot", "Hubspot: Breeze",
+-- "Hub-Spot"). name_key normalizes them (text before any colon, lowercase,
+-- alphanumerics only) and a unique index keeps one row per tool, so the
+-- avoidance list stays meaningful as the archive grows.
+--
+-- Merge rule: existing duplicates are merged below (see the comment there).
+-- From then on a second spelling of a known tool is never a new row:
+-- record_featured_tech upserts onto the existing row, and a plain insert or
+-- rename (the admin tech API) fails with a unique violation (23505), which
+-- the API returns as 409 with the existing row.
+
+CREATE OR REPLACE FUNCTION normalize_tech_name(p_name TEXT)
+RETURNS TEXT
+LANGUAGE sql
+IMMUTABLE
+AS $$
+    SELECT lower(regexp_replace(split_part(p_name, ':', 1), '[^[:alnum:]]+', '', 'g'))
+$$;
+
+ALTER TABLE tech_backlog
+ADD COLUMN IF NOT EXISTS name_key TEXT GENERATED ALWAYS AS (normalize_tech_name(name)) STORED;
+
+-- Merge existing duplicates into one survivor per name_key: prefer rows with
+-- a description (curated backlog entries), then the oldest. The survivor
+-- keeps the latest used_at, and runs pointing at a duplicate are re-pointed.
+CREATE TEMP TABLE tech_backlog_merge ON COMMIT DROP AS
+SELECT
+    id,
+    first_value(id) OVER (
+        PARTITION BY name_key
+        ORDER BY (description IS NULL), created_at, id
+    ) AS keep_id
+FROM tech_backlog;
+
+UPDATE tech_backlog t
+SET used_at = m.used_at
+FROM (
+    SELECT mm.keep_id, MAX(b.used_at) AS used_at
+    FROM tech_backlog_merge mm
+    JOIN tech_backlog b ON b.id = mm.id
+    GROUP BY mm.keep_id
+) m
+WHERE t.id = m.keep_id AND m.used_at IS NOT NULL;
+
+UPDATE newsletter_runs r
+SET tech_id = m.keep_id
+FROM tech_backlog_merge m
+WHERE r.tech_id = m.id AND m.id <> m.keep_id;
+
+DELETE FROM tech_backlog t
+USING tech_backlog_merge m
+WHERE t.id = m.id AND m.id <> m.keep_id;
+
+CREATE UNIQUE INDEX IF NOT EXISTS idx_tech_backlog_name_key ON tech_backlog(name_key);
+
+-- Record featured tools in one statement: insert new names as used, or bump
+-- used_at on the existing row for the same name_key. Accepts any number of names.
+CREATE OR REPLACE FUNCTION record_featured_tech(p_names TEXT[])
+RETURNS INTEGER
+LANGUAGE sql
+AS $$
+    WITH upserted AS (
+        INSERT INTO tech_backlog (name, used_at)
+        SELECT DISTINCT ON (normalize_tech_name(n)) trim(n), NOW()
+        FROM unnest(p_names) AS n
+        WHERE normalize_tech_name(n) <> ''
+        ON CONFLICT (name_key) DO UPDATE SET used_at = EXCLUDED.used_at
+        RETURNING 1
+    )
+    SELECT count(*)::INTEGER FROM upserted;
+$$;
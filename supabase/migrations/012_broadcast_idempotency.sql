@@ -0,0 +1,11 @@
+-- Broadcast Idempotency
+-- broadcast_key is a hash of the broadcast subject and rendered HTML. It is
+-- written before the Kit call and the broadcast id (beehiiv_post_id) right
+-- after, so a retried run updates its existing broadcast instead of
+-- scheduling a second one.
+
+ALTER TABLE newsletter_runs ADD COLUMN IF NOT EXISTS broadcast_key TEXT;
+
+CREATE INDEX IF NOT EXISTS idx_newsletter_runs_broadcast_key
+    ON newsletter_runs(broadcast_key)
+    WHERE broadcast_key IS NOT NULL;
@@ -0,0 +1,13 @@
+-- Run Telemetry
+-- metrics holds the per-run breakdown written by newsletter/telemetry.py:
+-- seconds per stage, spans, token usage and estimated cost per model call,
+-- and retry counters. duration_seconds and cost_usd are copied out of it so
+-- they can be charted and aggregated without unpacking the JSON.
+
+ALTER TABLE newsletter_runs ADD COLUMN IF NOT EXISTS metrics JSONB;
+ALTER TABLE newsletter_runs ADD COLUMN IF NOT EXISTS duration_seconds NUMERIC;
+ALTER TABLE newsletter_runs ADD COLUMN IF NOT EXISTS cost_usd NUMERIC(10, 6);
+
+CREATE INDEX IF NOT EXISTS idx_newsletter_runs_completed_metrics
+    ON newsletter_runs(completed_at DESC)
+    WHERE metrics IS NOT NULL;
@@ -0,0 +1,75 @@
+-- Run Queue
+-- newsletter_runs doubles as the job queue for the long-running worker
+-- (python -m newsletter.worker). A queued run is a run row with queued_at
+-- set; runs created by the cron pipeline leave it NULL and are never picked
+-- up. worker_id and heartbeat_at record which worker holds the run: a run
+-- whose heartbeat is older than the stale window is reclaimed by another
+-- worker and resumed from its last checkpoint.
+
+ALTER TABLE newsletter_runs ADD COLUMN IF NOT EXISTS queued_at TIMESTAMPTZ;
+ALTER TABLE newsletter_runs ADD COLUMN IF NOT EXISTS worker_id TEXT;
+ALTER TABLE newsletter_runs ADD COLUMN IF NOT EXISTS heartbeat_at TIMESTAMPTZ;
+ALTER TABLE newsletter_runs ADD COLUMN IF NOT EXISTS attempts INTEGER NOT NULL DEFAULT 0;
+
+-- Index for the claim query: unfinished queued runs, oldest first
+CREATE INDEX IF NOT EXISTS idx_newsletter_runs_queue
+ON newsletter_runs(queued_at)
+WHERE queued_at IS NOT NULL AND status NOT IN ('published', 'failed');
+
+-- Queue a run: allocates its issue number like create_newsletter_run
+CREATE OR REPLACE FUNCTION enqueue_newsletter_run(
+    p_newsletter_id UUID,
+    p_topic_id UUID DEFAULT NULL
+)
+RETURNS JSONB
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    v_run JSONB;
+BEGIN
+    v_run := create_newsletter_run(p_newsletter_id, p_topic_id);
+
+    UPDATE newsletter_runs
+    SET queued_at = NOW()
+    WHERE id = (v_run->>'id')::UUID
+    RETURNING to_jsonb(newsletter_runs) INTO v_run;
+
+    RETURN v_run;
+END;
+$$;
+
+-- Claim the oldest queued run nobody holds (or whose worker stopped
+-- heartbeating). FOR UPDATE SKIP LOCKED lets workers claim concurrently
+-- without blocking each other or taking the same run.
+CREATE OR REPLACE FUNCTION claim_newsletter_run(
+    p_worker_id TEXT,
+    p_stale_seconds INTEGER DEFAULT 120
+)
+RETURNS JSONB
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    v_run JSONB;
+BEGIN
+    UPDATE newsletter_runs r
+    SET worker_id = p_worker_id,
+        heartbeat_at = NOW(),
+        attempts = r.attempts + 1
+    WHERE r.id = (
+        SELECT id FROM newsletter_runs
+        WHERE queued_at IS NOT NULL
+          AND status NOT IN ('published', 'failed')
+          AND (
+              worker_id IS NULL
+              OR heartbeat_at IS NULL
+              OR heartbeat_at < NOW() - make_interval(secs => p_stale_seconds)
+          )
+        ORDER BY queued_at ASC
+        LIMIT 1
+        FOR UPDATE SKIP LOCKED
+    )
+    RETURNING to_jsonb(r) INTO v_run;
+
+    RETURN v_run;
+END;
+$$;
@@ -0,0 +1,69 @@
+-- Reuse Failed Issue Numbers
+-- A failed run kept its issue number forever, so the next fresh run was
+-- numbered one higher and readers saw a gap. create_newsletter_run now
+-- hands a new run the number of an abandoned run first: a failed run (or
+-- one stuck unfinished for a day that no worker queue owns) numbered above
+-- the latest published issue. The abandoned run gives the number up
+-- (issue_number is cleared, so it can no longer be resumed) and its backlog
+-- claims are released. Only when there is none is the counter advanced.
+-- --resume still publishes a failed run under its number as long as no new
+-- run has taken it over.
+
+CREATE OR REPLACE FUNCTION create_newsletter_run(
+    p_newsletter_id UUID,
+    p_topic_id UUID DEFAULT NULL,
+    p_tech_id UUID DEFAULT NULL,
+    p_tip_ids UUID[] DEFAULT NULL
+)
+RETURNS JSONB
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    v_issue INTEGER;
+    v_abandoned UUID;
+    v_run newsletter_runs;
+BEGIN
+    -- SKIP LOCKED: concurrent callers never take over the same run
+    SELECT r.id, r.issue_number INTO v_abandoned, v_issue
+    FROM newsletter_runs r
+    WHERE r.newsletter_id = p_newsletter_id
+      AND r.issue_number IS NOT NULL
+      AND (
+          r.status = 'failed'
+          OR (r.status <> 'published' AND r.queued_at IS NULL AND r.created_at < NOW() - INTERVAL '1 day')
+      )
+      AND r.issue_number > COALESCE((
+          SELECT MAX(p.issue_number) FROM newsletter_runs p
+          WHERE p.newsletter_id = p_newsletter_id AND p.status = 'published'
+      ), 0)
+    ORDER BY r.issue_number ASC
+    LIMIT 1
+    FOR UPDATE SKIP LOCKED;
+
+    IF v_abandoned IS NOT NULL THEN
+        UPDATE newsletter_runs
+        SET issue_number = NULL,
+            status = 'failed',
+            error_message = COALESCE(error_message, 'Abandoned')
+        WHERE id = v_abandoned;
+        PERFORM release_backlog_claims(v_abandoned);
+    ELSE
+        INSERT INTO newsletter_issue_counters (newsletter_id, last_issue)
+        SELECT id, starting_issue FROM newsletter_config WHERE id = p_newsletter_id
+        ON CONFLICT (newsletter_id) DO UPDATE
+            SET last_issue = newsletter_issue_counters.last_issue + 1,
+                updated_at = NOW()
+        RETURNING last_issue INTO v_issue;
+
+        IF v_issue IS NULL THEN
+            RAISE EXCEPTION 'Unknown newsletter: %', p_newsletter_id;
+        END IF;
+    END IF;
+
+    INSERT INTO newsletter_runs (status, newsletter_id, issue_number, topic_id, tech_id, tip_ids)
+    VALUES ('pending', p_newsletter_id, v_issue, p_topic_id, p_tech_id, p_tip_ids)
+    RETURNING * INTO v_run;
+
+    RETURN to_jsonb(v_run);
+END;
+$$;
@@ -0,0 +1,10 @@
+-- Hedge Stats
+-- Latency samples and recent hedge decisions for hedged Anthropic requests
+-- (newsletter/hedging.py), kept in one row so every runner shares them:
+-- GitHub Actions runners start with an empty disk, so a local stats file
+-- never had enough history to set a threshold or allow a hedge.
+CREATE TABLE IF NOT EXISTS hedge_stats (
+    name TEXT PRIMARY KEY,          -- 'default'
+    stats JSONB NOT NULL,           -- {"latency": {step: [seconds]}, "calls": [0|1]}
+    updated_at TIMESTAMPTZ DEFAULT NOW()
+);
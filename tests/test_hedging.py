@@ -0,0 +1,101 @@
+"""Hedge thresholds, budget and stats persistence (newsletter/hedging.py)."""
+
+import asyncio
+
+import pytest
+
+from newsletter import claude_client as claude
+from newsletter import hedging, retry, storage
+
+
+@pytest.fixture(autouse=True)
+def fresh_breakers(monkeypatch):
+    monkeypatch.setattr(retry, "_breakers", {})
+
+
+@pytest.fixture
+def cold(monkeypatch, tmp_path):
+    """A process with no saved stats, as on a fresh CI runner."""
+    tracker = hedging.LatencyTracker(path=str(tmp_path / "latency.json"))
+    monkeypatch.setattr(hedging, "tracker", tracker)
+    monkeypatch.setattr(hedging, "budget", hedging.HedgeBudget(0.1, tracker))
+    monkeypatch.setattr(hedging, "_stats", hedging.defaultdict(lambda: hedging.defaultdict(int)))
+    return tracker
+
+
+def test_cold_budget_allows_one_hedge(cold):
+    hedging.budget.record_call()
+    assert hedging.budget.try_acquire() is True
+    hedging.budget.record_call()
+    assert hedging.budget.try_acquire() is False
+
+
+def test_budget_holds_the_ratio_with_history(cold):
+    allowed = 0
+    for _ in range(100):
+        hedging.budget.record_call()
+        allowed += hedging.budget.try_acquire()
+    assert allowed == 10
+
+
+def test_cold_process_hedges_a_slow_call(cold):
+    calls = []
+
+    async def attempt(client, ready):
+        calls.append(len(calls))
+        if len(calls) == 1:
+            await asyncio.sleep(5)  # the original hangs
+            return "original"
+        return "hedge"
+
+    result = asyncio.run(hedging.race("topic", attempt, client=None, delay=0.05))
+    assert result == "hedge"
+    assert hedging.stats()["topic"] == {"calls": 1, "hedged": 1, "hedge_won": 1}
+    assert len(cold.samples["topic"]) == 2  # the winner, and the original's wait as a lower bound
+
+
+def test_stats_are_shared_through_supabase():
+    client = storage.SQLiteStorage(":memory:")
+    first = hedging.LatencyTracker(client=client)
+    budget = hedging.HedgeBudget(0.1, first)
+    for seconds in (1.0, 2.0, 3.0):
+        budget.record_call()
+        first.record("writing", seconds)
+    assert budget.try_acquire()
+    first.flush()
+
+    second = hedging.LatencyTracker(client=client)
+    second.threshold("writing")
+    assert list(second.samples["writing"]) == [1.0, 2.0, 3.0]
+    assert list(second.calls) == [0, 0, 1]
+
+
+def test_flush_without_changes_writes_nothing():
+    client = storage.SQLiteStorage(":memory:")
+    hedging.LatencyTracker(client=client).flush()
+    assert client.table("hedge_stats").select("name").execute().data == []
+
+
+class FakeAsyncClient:
+    closed = False
+
+    async def close(self):
+        self.closed = True
+
+
+def test_calls_share_the_runner_loop_and_client(cold):
+    client = FakeAsyncClient()
+    runner = claude.AsyncRunner(client=client)
+    seen = []
+
+    async def attempt(async_client, ready):
+        seen.append((async_client, asyncio.get_running_loop()))
+        return "ok"
+
+    try:
+        assert hedging.call("topic", attempt, delay=5, runner=runner) == "ok"
+        assert hedging.call("topic", attempt, delay=5, runner=runner) == "ok"
+    finally:
+        runner.close()
+    assert seen == [(client, runner.loop)] * 2
+    assert client.closed
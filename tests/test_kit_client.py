@@ -0,0 +1,225 @@
+"""KitClient and AsyncKitClient against the local Kit stub (newsletter/devtools/kit_stub.py)."""
+
+import asyncio
+
+import httpx
+import pytest
+
+from newsletter import kit_client as kit
+from newsletter import retry
+from newsletter.devtools.kit_stub import KitStubServer
+
+
+@pytest.fixture
+def stub():
+    with KitStubServer() as server:
+        yield server
+
+
+@pytest.fixture(autouse=True)
+def fresh_breakers(monkeypatch):
+    """Each test starts with closed circuit breakers."""
+    monkeypatch.setattr(retry, "_breakers", {})
+
+
+@pytest.fixture
+def sleeps(monkeypatch):
+    """Record retry waits instead of sleeping."""
+    waits = []
+
+    async def async_sleep(seconds):
+        waits.append(seconds)
+
+    monkeypatch.setattr(retry.time, "sleep", waits.append)
+    monkeypatch.setattr(retry.asyncio, "sleep", async_sleep)
+    return waits
+
+
+def client_for(stub) -> kit.KitClient:
+    return kit.KitClient(api_key="stub", base_url=stub.base_url)
+
+
+def async_client_for(stub) -> kit.AsyncKitClient:
+    return kit.AsyncKitClient(api_key="stub", base_url=stub.base_url)
+
+
+def run(coro):
+    return asyncio.run(coro)
+
+
+# Rate limits and server errors
+
+def test_429_waits_for_retry_after(stub, sleeps):
+    stub.fail_next(429, times=2, retry_after=7)
+    with client_for(stub) as client:
+        broadcast = client.get_broadcast(client.create_broadcast({"subject": "A"})["broadcast"]["id"])
+    assert broadcast["broadcast"]["subject"] == "A"
+    assert sleeps == [7, 7]
+    assert len(stub.broadcasts) == 1
+
+
+def test_async_429_waits_for_retry_after(stub, sleeps):
+    async def scenario():
+        async with async_client_for(stub) as client:
+            stub.fail_next(429, retry_after=3)
+            return await client.list_broadcasts()
+
+    assert run(scenario())["broadcasts"] == []
+    assert sleeps == [3]
+
+
+def test_5xx_is_retried(stub, sleeps):
+    created = stub.create({"subject": "A"})
+    stub.fail_next(503, times=2)
+    with client_for(stub) as client:
+        assert client.get_broadcast(created["id"])["broadcast"]["subject"] == "A"
+    assert len(sleeps) == 2
+    assert stub.requests.count(("GET", f"/v4/broadcasts/{created['id']}")) == 3
+
+
+def test_async_5xx_is_retried(stub, sleeps):
+    async def scenario():
+        async with async_client_for(stub) as client:
+            stub.fail_next(502)
+            return await client.create_broadcast({"subject": "A"})
+
+    assert run(scenario())["broadcast"]["subject"] == "A"
+    assert len(sleeps) == 1
+    assert len(stub.broadcasts) == 1
+
+
+def test_client_errors_are_not_retried(stub, sleeps):
+    with client_for(stub) as client:
+        with pytest.raises(httpx.HTTPStatusError) as error:
+            client.get_broadcast(404404)
+    assert error.value.response.status_code == 404
+    assert sleeps == []
+
+
+def test_create_after_ambiguous_5xx_does_not_duplicate(stub, sleeps):
+    stub.fail_next(504, applied=True)
+    with client_for(stub) as client:
+        broadcast = client.create_broadcast({"subject": "NL #5: topic"})["broadcast"]
+    assert len(stub.broadcasts) == 1
+    assert str(broadcast["id"]) in stub.broadcasts
+
+
+def test_async_create_after_ambiguous_5xx_does_not_duplicate(stub, sleeps):
+    async def scenario():
+        async with async_client_for(stub) as client:
+            stub.fail_next(502, applied=True)
+            return await client.create_broadcast({"subject": "NL #5: topic"})
+
+    run(scenario())
+    assert len(stub.broadcasts) == 1
+
+
+# Pagination
+
+def test_iter_broadcasts_follows_cursor(stub):
+    for i in range(7):
+        stub.create({"subject": f"B{i}"})
+    with client_for(stub) as client:
+        subjects = [b["subject"] for b in client.iter_broadcasts(per_page=3)]
+    assert subjects == [f"B{i}" for i in reversed(range(7))]
+    assert stub.requests.count(("GET", "/v4/broadcasts")) == 3
+
+
+def test_async_iter_broadcasts_follows_cursor(stub):
+    for i in range(5):
+        stub.create({"subject": f"B{i}"})
+
+    async def scenario():
+        async with async_client_for(stub) as client:
+            return [b["subject"] async for b in client.iter_broadcasts(per_page=2)]
+
+    assert run(scenario()) == [f"B{i}" for i in reversed(range(5))]
+    assert stub.requests.count(("GET", "/v4/broadcasts")) == 3
+
+
+def test_list_broadcasts_returns_cursor(stub):
+    for i in range(3):
+        stub.create({"subject": f"B{i}"})
+    with client_for(stub) as client:
+        first = client.list_broadcasts(per_page=2)
+        second = client.list_broadcasts(per_page=2, after=first["pagination"]["end_cursor"])
+    assert first["pagination"]["has_next_page"] is True
+    assert [b["subject"] for b in second["broadcasts"]] == ["B0"]
+    assert second["pagination"]["has_next_page"] is False
+
+
+def test_subject_search_reads_only_the_newest_page(stub):
+    for i in range(250):
+        stub.create({"subject": f"NL #{i}: topic"})
+    with client_for(stub) as client:
+        assert kit.find_broadcast(client, subject_prefix="NL #249:")["subject"] == "NL #249: topic"
+        assert kit.find_broadcast(client, subject_prefix="NL #250:") is None
+        assert client.find_broadcast(lambda b: b["subject"] == "NL #0: topic", pages=3) is not None
+    assert stub.requests.count(("GET", "/v4/broadcasts")) == 5
+
+
+# Update and delete
+
+def test_update_and_delete(stub):
+    with client_for(stub) as client:
+        broadcast_id = client.create_broadcast({"subject": "Old", "content": "<p>a</p>"})["broadcast"]["id"]
+        updated = client.update_broadcast(broadcast_id, {"subject": "New"})["broadcast"]
+        assert updated["subject"] == "New"
+        assert updated["content"] == "<p>a</p>"
+        assert client.delete_broadcast(broadcast_id) is None
+        with pytest.raises(httpx.HTTPStatusError):
+            client.get_broadcast(broadcast_id)
+    assert stub.broadcasts == {}
+
+
+def test_async_update_and_delete(stub):
+    async def scenario():
+        async with async_client_for(stub) as client:
+            broadcast_id = (await client.create_broadcast({"subject": "Old"}))["broadcast"]["id"]
+            updated = (await client.update_broadcast(broadcast_id, {"subject": "New"}))["broadcast"]
+            await client.delete_broadcast(broadcast_id)
+            return updated
+
+    assert run(scenario())["subject"] == "New"
+    assert stub.broadcasts == {}
+
+
+def test_publish_broadcast_updates_existing_issue(stub):
+    with client_for(stub) as client:
+        first = kit.publish_broadcast(
+            "NL #5: topic A", "a", html_content="<p>a</p>", subject_prefix="NL #5:", client=client,
+        )
+        second = kit.publish_broadcast(
+            "NL #5: topic B", "b", html_content="<p>b</p>", subject_prefix="NL #5:", client=client,
+        )
+    assert second["id"] == first["id"]
+    assert stub.broadcasts[str(first["id"])]["subject"] == "NL #5: topic B"
+    assert len(stub.broadcasts) == 1
+
+
+# Connection reuse
+
+def test_requests_share_one_connection(stub):
+    with client_for(stub) as client:
+        for i in range(5):
+            client.create_broadcast({"subject": f"B{i}"})
+        list(client.iter_broadcasts(per_page=2))
+    assert len(stub.connections) == 1
+
+
+def test_async_requests_share_one_connection(stub):
+    async def scenario():
+        async with async_client_for(stub) as client:
+            for i in range(5):
+                await client.create_broadcast({"subject": f"B{i}"})
+            await client.list_broadcasts()
+
+    run(scenario())
+    assert len(stub.connections) == 1
+
+
+def test_auth_header_is_sent(stub):
+    with kit.KitClient(api_key="wrong", base_url=stub.base_url) as client:
+        with pytest.raises(httpx.HTTPStatusError) as error:
+            client.list_broadcasts()
+    assert error.value.response.status_code == 401
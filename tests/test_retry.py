@@ -0,0 +1,78 @@
+"""Retry hints and the circuit breaker (newsletter/retry.py)."""
+
+import threading
+import time
+
+import pytest
+
+from newsletter import retry
+
+
+def test_reset_header_as_delay():
+    assert retry.retry_after_seconds({"x-ratelimit-reset": "12"}) == 12
+
+
+def test_reset_header_as_unix_time():
+    wait = retry.retry_after_seconds({"x-ratelimit-reset": str(int(time.time()) + 20)})
+    assert 15 < wait <= 21
+
+
+def test_reset_header_in_the_past_is_ignored():
+    assert retry.retry_after_seconds({"x-ratelimit-reset": str(int(time.time()) - 5)}) is None
+
+
+def open_breaker(monkeypatch) -> retry.CircuitBreaker:
+    """A breaker that opened an hour ago (cooldown over, so the next call is the trial call)."""
+    breaker = retry.CircuitBreaker("test", failure_threshold=2, reset_timeout=30)
+    breaker.record_failure()
+    breaker.record_failure()
+    opened_at = breaker._opened_at
+    monkeypatch.setattr(retry.time, "monotonic", lambda: opened_at + 3600)
+    return breaker
+
+
+def test_half_open_lets_one_trial_call_through(monkeypatch):
+    breaker = open_breaker(monkeypatch)
+    results = []
+
+    def call():
+        try:
+            breaker.before_call()
+            results.append("called")
+        except retry.CircuitOpenError:
+            results.append("refused")
+
+    threads = [threading.Thread(target=call) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert sorted(results) == ["called"] + ["refused"] * 7
+
+
+def test_trial_success_closes_the_circuit(monkeypatch):
+    breaker = open_breaker(monkeypatch)
+    breaker.before_call()
+    breaker.record_success()
+    breaker.before_call()
+    breaker.before_call()
+
+
+def test_trial_failure_reopens_the_circuit(monkeypatch):
+    breaker = open_breaker(monkeypatch)
+    breaker.before_call()
+    breaker.record_failure()
+    with pytest.raises(retry.CircuitOpenError):
+        breaker.before_call()
+
+
+def test_fatal_error_on_trial_call_frees_the_probe(monkeypatch):
+    breaker = open_breaker(monkeypatch)
+    monkeypatch.setattr(retry, "_breakers", {"test": breaker})
+
+    def bad_request():
+        raise ValueError("not retryable")
+
+    with pytest.raises(ValueError):
+        retry.call_with_retry(bad_request, service="test")
+    assert retry.call_with_retry(lambda: "ok", service="test") == "ok"